@@ -0,0 +1,340 @@
+"""Servidor local que imita as telas e a API do Zendesk usadas pelo exportador.
+
+Serve o formulário de login, a busca de clientes (People) com tabela paginada
+no tfoot, o perfil com a aba Tickets, as páginas /tickets/{id}/print e os
+endpoints da API (users/me, users/search, tickets requested/ccd com cursor),
+com latência e volume configuráveis. Só usa a stdlib.
+
+    python benchmarks/fake_zendesk.py --port 8765 --assessores 5 --tickets 40
+"""
+import argparse
+import base64
+import html
+import json
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+EMAIL_PADRAO = "bench@example.com"
+SENHA_PADRAO = "bench"
+LOREM = ("Cliente relata divergência no extrato e solicita revisão das operações do período. "
+         "Atendimento confirma o recebimento e encaminha para a área responsável. ")
+
+
+# ===================== Dados =====================
+class Dados:
+    """Assessores, usuários e tickets sintéticos e determinísticos (mesma seed, mesmos dados)."""
+
+    def __init__(self, assessores: int = 5, tickets: int = 40, seed: int = 42, sem_usuario: int = 0):
+        rnd = random.Random(seed)
+        self.codigos = [f"A{1000 + i}" for i in range(assessores)]
+        self.usuarios: dict[str, int] = {}
+        self.tickets: dict[int, list[int]] = {}
+        self.ccd: dict[int, list[int]] = {}
+        proximo = 100000
+        for i, cod in enumerate(self.codigos):
+            if sem_usuario and i % sem_usuario == sem_usuario - 1:
+                continue  # código sem usuário: exercita o caminho "nenhum resultado"
+            uid = 500000 + i
+            self.usuarios[cod] = uid
+            # volume por assessor varia em torno da média, como na base real
+            n = max(1, int(tickets * rnd.uniform(0.5, 1.5)))
+            self.tickets[uid] = list(range(proximo, proximo + n))
+            proximo += n
+        # alguns tickets aparecem em cópia (CC) de outro assessor
+        uids = list(self.tickets)
+        for uid in uids:
+            outro = rnd.choice(uids)
+            self.ccd[uid] = rnd.sample(self.tickets[outro], k=min(2, len(self.tickets[outro]))) if outro != uid else []
+
+    @property
+    def total_tickets(self) -> int:
+        return len({t for ids in [*self.tickets.values(), *self.ccd.values()] for t in ids})
+
+
+# ===================== HTML =====================
+def _pagina(titulo: str, corpo: str, nav: bool = True) -> str:
+    menu = ""
+    if nav:
+        menu = ("<nav><ul>"
+                "<li><button onclick=\"location.href='/agent/dashboard'\">Início</button></li>"
+                "<li><button onclick=\"location.href='/agent/dashboard'\">Visualizações</button></li>"
+                "<li><button onclick=\"location.href='/agent/customers'\">Clientes</button></li>"
+                "</ul></nav>")
+    return (f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(titulo)}</title></head>"
+            f"<body>{menu}<main>{corpo}</main></body></html>")
+
+
+def _paginador(pagina: int, total: int, url) -> str:
+    if total <= 1:
+        return ""
+    inicio = " class='disabled' aria-disabled='true'" if pagina == 1 else ""
+    fim = " class='disabled' aria-disabled='true'" if pagina == total else ""
+    itens = [f"<li{inicio}><a href='{url(1)}'>«</a></li>", f"<li{inicio}><a href='{url(max(1, pagina - 1))}'>‹</a></li>"]
+    # janela de 5 números em volta da página atual, como no Zendesk
+    ini = max(1, min(pagina - 2, total - 4))
+    for n in range(ini, min(total, ini + 4) + 1):
+        classe = " class='active' aria-current='page'" if n == pagina else ""
+        itens.append(f"<li{classe}><a href='{url(n)}'>{n}</a></li>")
+    itens += [f"<li{fim}><a href='{url(min(total, pagina + 1))}'>›</a></li>", f"<li{fim}><a href='{url(total)}'>»</a></li>"]
+    return "<tfoot><tr><td colspan='3'><ul>" + "".join(itens) + "</ul></td></tr></tfoot>"
+
+
+def _pagina_impressao(tid: int, kb: int) -> str:
+    paragrafo = f"<p>[#{tid}] {LOREM}</p>"
+    n = max(1, kb * 1024 // len(paragrafo))
+    comentarios = "".join(
+        f"<div class='comment'><h3>Comentário {i + 1}</h3>{paragrafo}</div>" for i in range(n)
+    )
+    return _pagina(f"Ticket #{tid}", f"<h1>Ticket #{tid}</h1>{comentarios}", nav=False)
+
+
+# ===================== Servidor =====================
+class FakeZendesk(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, dados: Dados, latencia_s: float = 0.03, latencia_print_s: float = 0.15,
+                 print_kb: int = 60, itens_por_pagina: int = 15, limite_por_min: int = 0,
+                 email: str = EMAIL_PADRAO, senha: str = SENHA_PADRAO):
+        super().__init__(endereco, Handler)
+        self.dados = dados
+        self.latencia_s = latencia_s
+        self.latencia_print_s = latencia_print_s
+        self.print_kb = print_kb
+        self.itens_por_pagina = itens_por_pagina
+        self.limite_por_min = limite_por_min
+        self.email = email
+        self.senha = senha
+
+        self.lock = threading.Lock()
+        self.sessoes: set[str] = set()
+        self._prints: deque[float] = deque()
+        self.stats = {"requests": 0, "prints": 0, "logins": 0, "429": 0, "bytes": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def contar(self, chave: str, n: int = 1):
+        with self.lock:
+            self.stats[chave] += n
+
+    def limitado(self) -> bool:
+        # janela deslizante de 60 s nas páginas de impressão
+        if not self.limite_por_min:
+            return False
+        agora = time.monotonic()
+        with self.lock:
+            while self._prints and self._prints[0] < agora - 60:
+                self._prints.popleft()
+            if len(self._prints) >= self.limite_por_min:
+                self.stats["429"] += 1
+                return True
+            self._prints.append(agora)
+            return False
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: FakeZendesk
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    # ---------- respostas ----------
+    def _enviar(self, status: int, corpo: str | bytes, tipo: str = "text/html; charset=utf-8", headers=None):
+        data = corpo.encode("utf-8") if isinstance(corpo, str) else corpo
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+        self.server.contar("bytes", len(data))
+
+    def _json(self, obj: dict, status: int = 200):
+        self._enviar(status, json.dumps(obj), "application/json; charset=utf-8")
+
+    def _redirecionar(self, destino: str, headers=None):
+        self._enviar(302, "", headers={"Location": destino, **(headers or {})})
+
+    # ---------- autenticação ----------
+    def _cookie(self) -> str | None:
+        for parte in (self.headers.get("Cookie") or "").split(";"):
+            nome, _, valor = parte.strip().partition("=")
+            if nome == "_fake_zendesk_session":
+                return valor
+        return None
+
+    def _autenticado(self) -> bool:
+        if self._cookie() in self.server.sessoes:
+            return True
+        auth = self.headers.get("Authorization") or ""
+        if auth.startswith("Basic "):
+            usuario, _, segredo = base64.b64decode(auth[6:]).decode("utf-8", "replace").partition(":")
+            return usuario.removesuffix("/token") == self.server.email and segredo == self.server.senha
+        return False
+
+    # ---------- rotas ----------
+    def do_POST(self):
+        self.server.contar("requests")
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(tamanho).decode("utf-8"))
+        if urlparse(self.path).path != "/auth/v2/login/signin":
+            return self._enviar(404, _pagina("404", "não encontrado"))
+        time.sleep(self.server.latencia_s)
+        if form.get("email", [""])[0] != self.server.email or form.get("password", [""])[0] != self.server.senha:
+            return self._enviar(200, _pagina("Entrar", "<p>Credenciais inválidas</p>" + FORM_LOGIN, nav=False))
+        token = secrets.token_hex(16)
+        with self.server.lock:
+            self.server.sessoes.add(token)
+        self.server.contar("logins")
+        self._redirecionar("/agent/dashboard", {"Set-Cookie": f"_fake_zendesk_session={token}; Path=/; HttpOnly"})
+
+    def do_GET(self):
+        self.server.contar("requests")
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        time.sleep(self.server.latencia_s)
+
+        if url.path == "/auth/v2/login/signin":
+            return self._enviar(200, _pagina("Entrar", FORM_LOGIN, nav=False))
+        if partes[:2] == ["api", "v2"]:
+            return self._api(partes[2:], query)
+        if not self._autenticado():
+            return self._redirecionar("/auth/v2/login/signin")
+
+        d = self.server.dados
+        if partes in ([], ["agent"], ["agent", "dashboard"]):
+            return self._enviar(200, _pagina("Zendesk", "<h1>Painel</h1>"))
+
+        if partes == ["agent", "customers"]:
+            termo = (query.get("query") or [""])[0].strip().upper()
+            form = ("<form method='get' action='/agent/customers'>"
+                    "<input type='text' name='query' data-test-id='customer-lists-search-box' "
+                    "placeholder='Pesquisar clientes'></form>")
+            if not termo:
+                return self._enviar(200, _pagina("Clientes", form))
+            uid = d.usuarios.get(termo)
+            if uid is None:
+                return self._enviar(200, _pagina("Clientes", form + "<p>Nenhum resultado encontrado</p>"))
+            linha = (f"<tr><td data-test-id='customer-row-cell-name'><a href='/agent/users/{uid}'>Cliente {termo}</a></td>"
+                     f"<td>{termo.lower()}@example.com</td></tr>")
+            return self._enviar(200, _pagina("Clientes", form + f"<table><tbody>{linha}</tbody></table>"))
+
+        if len(partes) >= 3 and partes[:2] == ["agent", "users"] and partes[2].isdigit():
+            uid = int(partes[2])
+            if uid not in d.tickets:
+                return self._enviar(404, _pagina("404", "usuário não encontrado"))
+            abas = f"<div role='tablist'><a href='/agent/users/{uid}'>Perfil</a> <a href='/agent/users/{uid}/requested_tickets'>Tickets</a></div>"
+            if len(partes) == 3:
+                return self._enviar(200, _pagina(f"Usuário {uid}", abas + "<h2>Perfil</h2>"))
+            return self._enviar(200, self._tabela_tickets(uid, abas, query))
+
+        if len(partes) == 3 and partes[:2] == ["agent", "tickets"] and partes[2].isdigit():
+            return self._enviar(200, _pagina(f"Ticket #{partes[2]}", f"<h1>Ticket #{partes[2]}</h1>"))
+
+        if len(partes) == 3 and partes[0] == "tickets" and partes[1].isdigit() and partes[2] == "print":
+            if self.server.limitado():
+                return self._enviar(429, _pagina("429 Too Many Requests", "<h1>Too Many Requests</h1>", nav=False),
+                                    headers={"Retry-After": "10"})
+            time.sleep(self.server.latencia_print_s)
+            self.server.contar("prints")
+            return self._enviar(200, _pagina_impressao(int(partes[1]), self.server.print_kb))
+
+        self._enviar(404, _pagina("404", "não encontrado"))
+
+    def _tabela_tickets(self, uid: int, abas: str, query: dict) -> str:
+        ids = sorted(set(self.server.dados.tickets[uid]) | set(self.server.dados.ccd[uid]))
+        por_pagina = self.server.itens_por_pagina
+        total = max(1, -(-len(ids) // por_pagina))
+        try:
+            pagina = min(max(1, int((query.get("page") or ["1"])[0])), total)
+        except ValueError:
+            pagina = 1
+        linhas = "".join(
+            f"<tr><td><a href='/agent/tickets/{t}'>#{t}</a></td><td>Assunto do ticket {t}</td><td>Aberto</td></tr>"
+            for t in ids[(pagina - 1) * por_pagina:pagina * por_pagina]
+        )
+        tfoot = _paginador(pagina, total, lambda n: f"/agent/users/{uid}/requested_tickets?page={n}")
+        return _pagina(f"Usuário {uid}", f"{abas}<table><tbody>{linhas}</tbody>{tfoot}</table>")
+
+    def _api(self, partes: list[str], query: dict):
+        if not self._autenticado():
+            return self._json({"error": "Couldn't authenticate you"}, 401)
+        d = self.server.dados
+        if partes == ["users", "me.json"]:
+            return self._json({"user": {"id": 1, "email": self.server.email, "name": "Benchmark"}})
+        if partes == ["users", "search.json"]:
+            termo = (query.get("query") or [""])[0].strip().upper()
+            uid = d.usuarios.get(termo)
+            return self._json({"users": [{"id": uid, "name": f"Cliente {termo}"}] if uid else []})
+        if len(partes) == 4 and partes[0] == "users" and partes[2] == "tickets" and partes[1].isdigit():
+            uid = int(partes[1])
+            fonte = {"requested.json": d.tickets, "ccd.json": d.ccd}.get(partes[3])
+            if fonte is None or uid not in fonte:
+                return self._json({"error": "RecordNotFound"}, 404)
+            return self._json(self._pagina_api(fonte[uid], query, f"/api/v2/users/{uid}/tickets/{partes[3]}"))
+        self._json({"error": "InvalidEndpoint"}, 404)
+
+    def _pagina_api(self, ids: list[int], query: dict, caminho: str) -> dict:
+        # paginação por cursor: o cursor é simplesmente o índice do próximo item
+        tamanho = int((query.get("page[size]") or ["100"])[0])
+        inicio = int((query.get("page[after]") or ["0"])[0])
+        fatia = ids[inicio:inicio + tamanho]
+        mais = inicio + tamanho < len(ids)
+        links = {"next": f"{self.server.url}{caminho}?{urlencode({'page[size]': tamanho, 'page[after]': inicio + tamanho})}" if mais else None}
+        return {"tickets": [{"id": t, "subject": f"Assunto do ticket {t}"} for t in fatia],
+                "meta": {"has_more": mais}, "links": links}
+
+
+FORM_LOGIN = ("<form method='post' action='/auth/v2/login/signin'>"
+              "<input type='email' name='email' id='user_email'>"
+              "<input type='password' name='password' id='user_password'>"
+              "<button type='submit' name='commit'>Entrar</button></form>")
+
+
+def iniciar(dados: Dados, host: str = "127.0.0.1", porta: int = 0, **opcoes) -> FakeZendesk:
+    """Sobe o servidor numa thread daemon; porta 0 = porta livre qualquer."""
+    srv = FakeZendesk((host, porta), dados, **opcoes)
+    threading.Thread(target=srv.serve_forever, name="fake-zendesk", daemon=True).start()
+    return srv
+
+
+def main():
+    p = argparse.ArgumentParser(description="Zendesk falso para benchmarks e testes manuais.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--assessores", type=int, default=5)
+    p.add_argument("--tickets", type=int, default=40, help="média de tickets por assessor")
+    p.add_argument("--sem-usuario", type=int, default=0, help="a cada N códigos, um sem usuário (0 = nenhum)")
+    p.add_argument("--latencia-ms", type=float, default=30)
+    p.add_argument("--print-latencia-ms", type=float, default=150)
+    p.add_argument("--print-kb", type=int, default=60)
+    p.add_argument("--itens-por-pagina", type=int, default=15)
+    p.add_argument("--limite-por-min", type=int, default=0, help="429 acima de N impressões/min (0 = sem limite)")
+    a = p.parse_args()
+
+    dados = Dados(a.assessores, a.tickets, sem_usuario=a.sem_usuario)
+    srv = FakeZendesk((a.host, a.port), dados, latencia_s=a.latencia_ms / 1000,
+                      latencia_print_s=a.print_latencia_ms / 1000, print_kb=a.print_kb,
+                      itens_por_pagina=a.itens_por_pagina, limite_por_min=a.limite_por_min)
+    print(f"Zendesk falso em {srv.url} ({len(dados.codigos)} códigos, {dados.total_tickets} tickets); "
+          f"login {srv.email} / {srv.senha}")
+    print("Códigos: " + ", ".join(dados.codigos))
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Benchmark ponta a ponta do export_all contra o Zendesk falso (fake_zendesk.py).
+
+Cada cenário roda num subprocesso próprio (Chrome headless, saída em pasta
+temporária) e reporta tickets/min, p50/p95 por etapa (das métricas do
+exportador), pico de RSS da árvore de processos e bytes gravados.
+
+    python benchmarks/run_benchmark.py --chromedriver /usr/bin/chromedriver
+    python benchmarks/run_benchmark.py --chromedriver ... --cenarios sequencial cdp --json depois.json --baseline antes.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_zendesk import Dados, iniciar  # noqa: E402
+
+# sobreposições do ExporterConfig por cenário; novos engines/modos entram aqui
+CENARIOS: dict[str, dict] = {
+    "sequencial": {},
+    "prefetch": {"prefetch": True},
+    "workers2": {"workers": 2},
+    "pipeline": {"pipeline": True, "workers": 2},
+    "cdp": {"engine": "cdp", "cdp_concurrency": 4},
+    "api": {"discovery": "api"},
+    "adaptativo": {"throttle_mode": "adaptive", "rate_initial_per_min": 60, "rate_max_per_min": 600},
+    "archive_zst": {"archive": True, "archive_format": "tar.zst"},
+}
+ETAPAS_TABELA = ("page_load", "print_to_pdf", "write")
+
+
+# ===================== Subprocesso (um cenário) =====================
+def _rodar_cenario(params: dict):
+    from zendesk_ticket_exporter.exporter import ExporterConfig, export_all
+    from zendesk_ticket_exporter.logging_config import setup_logging
+    from zendesk_ticket_exporter.metrics import METRICAS
+
+    setup_logging(params["log_level"])
+    out_dir = Path(params["out_dir"])
+    # credenciais do servidor falso têm prioridade sobre um .env do desenvolvedor
+    os.environ["ZENDESK_EMAIL"] = params["email"]
+    os.environ["ZENDESK_PASS"] = params["senha"]
+
+    cfg = ExporterConfig(
+        subdomain=params["url"],
+        excel_codigos=Path(params["codigos"]),
+        output_dir=out_dir,
+        chrome_driver_path=Path(params["chromedriver"]),
+        headless=True,
+        keep_browser_open=False,
+        reset_checkpoint=True,
+        between_tickets_min_s=0.0,
+        between_tickets_max_s=0.0,
+        after_print_min_s=0.0,
+        after_print_max_s=0.0,
+        max_pages=1000,
+        retry_create_driver=1,
+        max_tickets_per_assessor=None,
+        metrics=True,
+        metrics_interval_s=5.0,
+        **params["overrides"],
+    )
+    t0 = time.monotonic()
+    export_all(cfg, {"email": params["email"], "password": params["senha"]})
+    duracao = time.monotonic() - t0
+
+    snap = METRICAS.snapshot()
+    ok = sum(v for k, v in snap["counters"].items() if k == 'tickets_total{status="ok"}')
+    falhas = sum(v for k, v in snap["counters"].items() if k.startswith("failures_total"))
+    gravados = sum(v for k, v in snap["counters"].items() if k.startswith("bytes_written_total"))
+    resultado = {
+        "duracao_s": round(duracao, 2),
+        "tickets": int(ok),
+        "falhas": int(falhas),
+        "tickets_por_min": round(ok / (duracao / 60), 2) if duracao else 0.0,
+        "bytes_gravados": int(gravados),
+        "etapas": snap["histograms"],
+    }
+    (out_dir / "benchmark_resultado.json").write_text(json.dumps(resultado, indent=2), encoding="utf-8")
+
+
+# ===================== Processo principal =====================
+def _monitorar_rss(pid: int, pico: list[int], parar: threading.Event):
+    from zendesk_ticket_exporter.watchdog import rss_arvore
+
+    while not parar.is_set():
+        rss = rss_arvore(pid)
+        if rss is not None:
+            pico[0] = max(pico[0], rss)
+        parar.wait(0.25)
+
+
+def executar(nome: str, overrides: dict, base: dict, tmp: Path) -> dict:
+    out_dir = tmp / nome
+    params = {**base, "out_dir": str(out_dir), "overrides": overrides}
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    proc = subprocess.Popen([sys.executable, __file__, "--_cenario", json.dumps(params)])
+    pico, parar = [0], threading.Event()
+    monitor = threading.Thread(target=_monitorar_rss, args=(proc.pid, pico, parar), daemon=True)
+    monitor.start()
+    codigo = proc.wait()
+    parar.set()
+    monitor.join()
+
+    arq = out_dir / "benchmark_resultado.json"
+    if codigo != 0 or not arq.exists():
+        return {"cenario": nome, "erro": f"saída {codigo}", "overrides": overrides}
+    res = json.loads(arq.read_text(encoding="utf-8"))
+    return {"cenario": nome, "overrides": overrides, "pico_rss_bytes": pico[0] or None, **res}
+
+
+def _etapa(res: dict, etapa: str, campo: str) -> float | None:
+    # soma engines/labels da mesma etapa pela maior amostra (normalmente só há uma série)
+    series = [h for k, h in res.get("etapas", {}).items() if f'stage="{etapa}"' in k]
+    if not series:
+        return None
+    return max(series, key=lambda h: h["count"])[campo]
+
+
+def _fmt(v, fmt="{:.2f}") -> str:
+    return "-" if v is None else fmt.format(v)
+
+
+def imprimir(resultados: list[dict], baseline: dict[str, dict]):
+    cab = f"{'cenário':<14}{'tickets':>8}{'falhas':>7}{'t/min':>9}{'Δ base':>8}"
+    for e in ETAPAS_TABELA:
+        cab += f"{e + ' p50/p95':>24}"
+    cab += f"{'RSS MB':>9}{'MB':>8}"
+    print(cab)
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['cenario']:<14}  ERRO ({r['erro']})")
+            continue
+        antes = baseline.get(r["cenario"], {}).get("tickets_por_min")
+        delta = f"{100 * (r['tickets_por_min'] / antes - 1):+.0f}%" if antes else "-"
+        linha = f"{r['cenario']:<14}{r['tickets']:>8}{r['falhas']:>7}{r['tickets_por_min']:>9.1f}{delta:>8}"
+        for e in ETAPAS_TABELA:
+            linha += f"{_fmt(_etapa(r, e, 'p50_s')) + '/' + _fmt(_etapa(r, e, 'p95_s')) + ' s':>24}"
+        rss = r.get("pico_rss_bytes")
+        linha += f"{_fmt(rss / 1e6 if rss else None, '{:.0f}'):>9}{r['bytes_gravados'] / 1e6:>8.1f}"
+        print(linha)
+
+
+def _valor(texto: str):
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark do exportador contra um Zendesk falso local.")
+    p.add_argument("--_cenario", help=argparse.SUPPRESS)
+    p.add_argument("--chromedriver", default=os.getenv("CHROMEDRIVER"), help="caminho do chromedriver (ou $CHROMEDRIVER)")
+    p.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS), default=list(CENARIOS))
+    p.add_argument("--set", action="append", default=[], metavar="CAMPO=VALOR",
+                   help="sobrepõe um campo do ExporterConfig em todos os cenários (ex.: workers=4)")
+    p.add_argument("--assessores", type=int, default=5)
+    p.add_argument("--tickets", type=int, default=40, help="média de tickets por assessor")
+    p.add_argument("--latencia-ms", type=float, default=30)
+    p.add_argument("--print-latencia-ms", type=float, default=150)
+    p.add_argument("--print-kb", type=int, default=60)
+    p.add_argument("--itens-por-pagina", type=int, default=15)
+    p.add_argument("--limite-por-min", type=int, default=0)
+    p.add_argument("--json", help="grava os resultados completos neste arquivo")
+    p.add_argument("--baseline", help="resultados de uma execução anterior (--json) para comparar tickets/min")
+    p.add_argument("--log-level", default="WARNING")
+    a = p.parse_args()
+
+    if a._cenario:
+        _rodar_cenario(json.loads(a._cenario))
+        return
+    if not a.chromedriver:
+        p.error("informe --chromedriver ou a variável CHROMEDRIVER")
+
+    extras = {}
+    for item in a.set:
+        campo, _, valor = item.partition("=")
+        extras[campo.strip()] = _valor(valor)
+
+    dados = Dados(a.assessores, a.tickets)
+    srv = iniciar(dados, latencia_s=a.latencia_ms / 1000, latencia_print_s=a.print_latencia_ms / 1000,
+                  print_kb=a.print_kb, itens_por_pagina=a.itens_por_pagina, limite_por_min=a.limite_por_min)
+    print(f"Zendesk falso em {srv.url}: {len(dados.codigos)} assessores, {dados.total_tickets} tickets")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="zendesk_bench_") as tmp:
+        tmp = Path(tmp)
+        codigos = tmp / "codigos.csv"
+        codigos.write_text("Código XP\n" + "\n".join(dados.codigos) + "\n", encoding="utf-8")
+        base = {"url": srv.url, "codigos": str(codigos), "chromedriver": a.chromedriver,
+                "email": srv.email, "senha": srv.senha, "log_level": a.log_level}
+        for nome in a.cenarios:
+            print(f"-> {nome}", flush=True)
+            resultados.append(executar(nome, {**CENARIOS[nome], **extras}, base, tmp))
+    srv.shutdown()
+
+    baseline = {}
+    if a.baseline:
+        baseline = {r["cenario"]: r for r in json.loads(Path(a.baseline).read_text(encoding="utf-8"))["resultados"]}
+    print()
+    imprimir(resultados, baseline)
+
+    if a.json:
+        info = {"gerado_em": time.strftime("%Y-%m-%d %H:%M:%S"), "servidor": srv.stats,
+                "parametros": {k: v for k, v in vars(a).items() if not k.startswith("_")},
+                "resultados": resultados}
+        Path(a.json).write_text(json.dumps(info, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import argparse
 import sys
 from pathlib import Path
 
@@ -8,22 +7,8 @@ SRC_DIR = PROJECT_ROOT / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
-from zendesk_ticket_exporter.app import run
-
-
-def parse_args():
-    p = argparse.ArgumentParser(
-        description="Exportador de tickets do Zendesk em PDF com checkpoint e inventário."
-    )
-    p.add_argument(
-        "--config",
-        required=True,
-        help="Caminho do arquivo config.json (baseado em config.example.json).",
-    )
-    return p.parse_args()
+from zendesk_ticket_exporter.__main__ import main
 
 
 if __name__ == "__main__":
-    args = parse_args()
-    run(config_path=args.config)
-
+    main()
@@ -1,21 +1,74 @@
 import argparse
-from .app import run
+import sys
+
+from .app import dossier, plan, report, retry_failed, run, status, verify
 
 
 def parse_args():
     p = argparse.ArgumentParser(
         description="Exportador de tickets do Zendesk em PDF com checkpoint e inventário."
     )
+    p.add_argument(
+        "comando",
+        nargs="?",
+        default="run",
+        choices=["run", "retry-failed", "verify", "dossier", "status", "report", "plan"],
+        help="run: exporta os tickets (padrão); retry-failed: reexporta só os tickets do failed.csv "
+             "que ainda faltam, sem descoberta; verify: confere os PDFs gravados; "
+             "dossier: monta um PDF por assessor; status: progresso e ritmo; "
+             "report: resumo por assessor e erros; plan: o que a próxima execução fará.",
+    )
     p.add_argument(
         "--config",
         required=True,
         help="Caminho do arquivo config.json (baseado em config.example.json).",
     )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="verify: número de threads de verificação (padrão 8); dossier: número de processos.",
+    )
+    p.add_argument(
+        "--no-hash",
+        action="store_true",
+        help="verify: não recalcula o sha256 (só tamanho, cabeçalho e trailer).",
+    )
+    p.add_argument(
+        "--force",
+        action="store_true",
+        help="dossier: remonta todos os assessores, mesmo sem mudanças.",
+    )
+    p.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="report/plan: quantas linhas listar.",
+    )
+    p.add_argument(
+        "--json",
+        action="store_true",
+        help="status/report/plan: saída em JSON.",
+    )
     return p.parse_args()
 
 
 def main():
     args = parse_args()
+    if args.comando == "verify":
+        ruins = verify(config_path=args.config, workers=args.workers or 8, check_hash=not args.no_hash)
+        sys.exit(1 if ruins else 0)
+    if args.comando == "status":
+        return status(config_path=args.config, como_json=args.json)
+    if args.comando == "report":
+        return report(config_path=args.config, top=args.top, como_json=args.json)
+    if args.comando == "plan":
+        return plan(config_path=args.config, top=args.top, como_json=args.json)
+    if args.comando == "dossier":
+        falhas = dossier(config_path=args.config, workers=args.workers, forcar=args.force)
+        sys.exit(1 if falhas else 0)
+    if args.comando == "retry-failed":
+        return retry_failed(config_path=args.config)
     run(config_path=args.config)
 
 
@@ -1,19 +1,19 @@
+import json
 import logging
 
 from .config import Config
 from .logging_config import setup_logging
-from .exporter import ExporterConfig, export_all
+from .dossier import montar_dossies
+from .manifest import verificar
 
 logger = logging.getLogger("zendesk_ticket_exporter")
 
 
-def run(config_path: str):
-    cfg = Config.load(config_path)
-    setup_logging(cfg.log_level)
+def _exporter_config(cfg: Config):
+    # selenium/dotenv só são importados quando uma exportação de fato começa
+    from .exporter import ExporterConfig
 
-    logger.info("Iniciando exportador de tickets do Zendesk (PDF)")
-
-    exporter_cfg = ExporterConfig(
+    return ExporterConfig(
         subdomain=cfg.subdomain,
         excel_codigos=cfg.excel_codigos,
         output_dir=cfg.output_dir,
@@ -25,9 +25,135 @@ def run(config_path: str):
         between_tickets_max_s=cfg.between_tickets_max_s,
         after_print_min_s=cfg.after_print_min_s,
         after_print_max_s=cfg.after_print_max_s,
+        throttle_mode=cfg.throttle_mode,
+        rate_initial_per_min=cfg.rate_initial_per_min,
+        rate_min_per_min=cfg.rate_min_per_min,
+        rate_max_per_min=cfg.rate_max_per_min,
+        rate_slow_latency_s=cfg.rate_slow_latency_s,
         max_pages=cfg.max_pages,
         retry_create_driver=cfg.retry_create_driver,
         max_tickets_per_assessor=cfg.max_tickets_per_assessor,
+        workers=cfg.workers,
+        engine=cfg.engine,
+        cdp_concurrency=cfg.cdp_concurrency,
+        pipeline=cfg.pipeline,
+        pipeline_queue_size=cfg.pipeline_queue_size,
+        prefetch=cfg.prefetch,
+        prefetch_workers=cfg.prefetch_workers,
+        prefetch_window=cfg.prefetch_window,
+        discovery=cfg.discovery,
+        discovery_fallback=cfg.discovery_fallback,
+        api_token=cfg.api_token,
+        include_ccd=cfg.include_ccd,
+        sync_mode=cfg.sync_mode,
+        store=cfg.store,
+        store_link=cfg.store_link,
+        profile_reuse=cfg.profile_reuse,
+        profile_max_age_days=cfg.profile_max_age_days,
+        profile_max_total_mb=cfg.profile_max_total_mb,
+        recycle_after_tickets=cfg.recycle_after_tickets,
+        recycle_max_rss_mb=cfg.recycle_max_rss_mb,
+        recycle_slowdown_factor=cfg.recycle_slowdown_factor,
+        metrics=cfg.metrics,
+        metrics_interval_s=cfg.metrics_interval_s,
+        metrics_textfile=cfg.metrics_textfile,
+        retry_max_attempts=cfg.retry_max_attempts,
+        retry_base_s=cfg.retry_base_s,
+        retry_max_s=cfg.retry_max_s,
+        user_cache=cfg.user_cache,
+        user_cache_ttl_days=cfg.user_cache_ttl_days,
+        archive=cfg.archive,
+        archive_format=cfg.archive_format,
+        archive_scope=cfg.archive_scope,
+        archive_volume_mb=cfg.archive_volume_mb,
+        inventory_format=cfg.inventory_format,
+        inventory_batch_rows=cfg.inventory_batch_rows,
+        inventory_flush_s=cfg.inventory_flush_s,
+        coordination=cfg.coordination,
+        node_id=cfg.node_id,
+        lease_ttl_s=cfg.lease_ttl_s,
+        lease_tickets=cfg.lease_tickets,
     )
 
-    export_all(exporter_cfg, cfg.auth_dict)
+
+def run(config_path: str):
+    cfg = Config.load(config_path)
+    setup_logging(cfg.log_level)
+
+    from .exporter import export_all
+
+    logger.info("Iniciando exportador de tickets do Zendesk (PDF)")
+    export_all(_exporter_config(cfg), cfg.auth_dict)
+
+    if cfg.dossier:
+        montar_dossies(cfg.output_dir, workers=cfg.dossier_workers, max_paginas=cfg.dossier_max_pages)
+
+
+def retry_failed(config_path: str):
+    cfg = Config.load(config_path)
+    setup_logging(cfg.log_level)
+
+    from .exporter import export_all
+
+    logger.info("Reexportando tickets com falha em %s", cfg.output_dir)
+    export_all(_exporter_config(cfg), cfg.auth_dict, somente_falhas=True)
+
+    if cfg.dossier:
+        montar_dossies(cfg.output_dir, workers=cfg.dossier_workers, max_paginas=cfg.dossier_max_pages)
+
+
+def verify(config_path: str, workers: int = 8, check_hash: bool = True) -> int:
+    cfg = Config.load(config_path)
+    setup_logging(cfg.log_level)
+
+    logger.info("Verificando PDFs em %s", cfg.output_dir)
+    return verificar(cfg.output_dir, workers=workers, check_hash=check_hash)
+
+
+def dossier(config_path: str, workers: int | None = None, forcar: bool = False) -> int:
+    cfg = Config.load(config_path)
+    setup_logging(cfg.log_level)
+
+    logger.info("Montando dossiês em %s", cfg.output_dir / "dossies")
+    return montar_dossies(cfg.output_dir, workers=workers or cfg.dossier_workers,
+                          max_paginas=cfg.dossier_max_pages, forcar=forcar)
+
+
+def status(config_path: str, como_json: bool = False):
+    from .report import codigos_em_cache, coletar_status, imprimir_status
+
+    cfg = Config.load(config_path)
+    st = coletar_status(cfg.output_dir, codigos_em_cache(cfg.excel_codigos, cfg.output_dir))
+    if como_json:
+        print(json.dumps(st, ensure_ascii=False, indent=2))
+    else:
+        imprimir_status(st)
+
+
+def report(config_path: str, top: int = 20, como_json: bool = False):
+    from .report import coletar_report, imprimir_report
+
+    cfg = Config.load(config_path)
+    rep = coletar_report(cfg.output_dir, top=top)
+    if como_json:
+        print(json.dumps(rep, ensure_ascii=False, indent=2))
+    else:
+        imprimir_report(rep, top=top)
+
+
+def plan(config_path: str, top: int = 20, como_json: bool = False):
+    from .report import codigos_em_cache, coletar_plano, imprimir_plano
+
+    cfg = Config.load(config_path)
+    codigos = codigos_em_cache(cfg.excel_codigos, cfg.output_dir)
+    if codigos is None:
+        raise FileNotFoundError(f"Planilha não encontrada: {cfg.excel_codigos}")
+    plano = coletar_plano(cfg.output_dir, codigos, top=top)
+    if como_json:
+        print(json.dumps(plano, ensure_ascii=False, indent=2))
+        return
+    imprimir_plano(plano, {
+        "workers": cfg.workers, "engine": cfg.engine, "pipeline": cfg.pipeline,
+        "discovery": cfg.discovery, "sync": cfg.sync_mode, "coordination": cfg.coordination,
+        "throttle": cfg.throttle_mode,
+    })
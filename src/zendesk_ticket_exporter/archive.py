@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("zip", "tar", "tar.zst")
+ESCOPOS = ("assessor", "run")
+
+
+# ===================== Arquivos =====================
+class _ZipArchive:
+    # o diretório central só é gravado no fechamento: cada volume zip é escrito uma única vez
+    def __init__(self, path: Path):
+        self.path = path
+        self.zf = None
+
+    def adicionar(self, member: str, data: bytes):
+        if self.zf is None:
+            self.zf = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_STORED, allowZip64=True)
+        self.zf.writestr(zipfile.ZipInfo(member, date_time=time.localtime()[:6]), data)
+
+    def tamanho(self) -> int:
+        return self.zf.fp.tell() if self.zf is not None else 0
+
+    def close(self) -> int | None:
+        if self.zf is None:
+            return None
+        self.zf.close()
+        self.zf = None
+        return self.path.stat().st_size
+
+
+class _TarArchive:
+    # cada membro é autocontido (e, com zstd, um frame próprio): o arquivo é válido após cada escrita
+    def __init__(self, path: Path, zstd: bool):
+        self.cctx = None
+        if zstd:
+            try:
+                import zstandard
+            except ImportError as e:
+                raise RuntimeError("archive.format = 'tar.zst' requer o pacote zstandard.") from e
+            self.cctx = zstandard.ZstdCompressor(level=3)
+        self.f = open(path, "ab")
+
+    def _escrever(self, chunk: bytes):
+        self.f.write(self.cctx.compress(chunk) if self.cctx is not None else chunk)
+
+    def adicionar(self, member: str, data: bytes):
+        info = tarfile.TarInfo(member)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        pad = (-len(data)) % tarfile.BLOCKSIZE
+        self._escrever(info.tobuf(format=tarfile.PAX_FORMAT) + data + b"\0" * pad)
+
+    def commit(self) -> int:
+        self.f.flush()
+        return self.f.tell()
+
+    def tamanho(self) -> int:
+        return self.f.tell()
+
+    def close(self) -> None:
+        # marcador de fim do tar fica depois do último commit: a retomada o remove antes de anexar
+        self._escrever(b"\0" * (2 * tarfile.BLOCKSIZE))
+        self.f.close()
+
+
+# ===================== Sink =====================
+class ArchiveSink:
+    """Grava os PDFs direto em arquivos .zip / .tar / .tar.zst em vez de arquivos soltos.
+
+    `archives/index.jsonl` é um índice append-only: uma linha `add` por PDF e uma
+    linha `commit` com o tamanho do arquivo sempre que ele está íntegro no disco.
+    tar/tar.zst recebem commit a cada PDF; um zip só no fechamento do volume
+    (fim do assessor, ou `volume_bytes` no escopo "run"). Na retomada cada
+    arquivo é truncado no último commit; PDFs gravados depois dele voltam em
+    `perdidos` (e seus assessores em `assessores_perdidos`) para serem reimpressos.
+    """
+
+    def __init__(self, out_dir: Path, formato: str = "zip", escopo: str = "assessor", sufixo: str = "",
+                 volume_bytes: int = 1 << 30):
+        if formato not in FORMATOS:
+            raise ValueError(f"archive.format deve ser um de {FORMATOS}.")
+        if escopo not in ESCOPOS:
+            raise ValueError(f"archive.scope deve ser um de {ESCOPOS}.")
+        self.out_dir = out_dir
+        self.dir = out_dir / "archives"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.formato = formato
+        self.escopo = escopo
+        self.sufixo = sufixo
+        self.volume_bytes = volume_bytes
+
+        self.lock = threading.Lock()
+        self.entries: dict[str, dict] = {}
+        self.perdidos: set[int] = set()
+        self.assessores_perdidos: set[str] = set()
+        # base do nome (assessor_X / run) -> (nome do volume aberto, arquivo)
+        self._abertos: dict[str, tuple[str, object]] = {}
+
+        self.index_path = self.dir / f"index{sufixo}.jsonl"
+        self._recuperar()
+        self._f = open(self.index_path, "a", encoding="utf-8")
+
+    # ---------- retomada ----------
+    def _recuperar(self):
+        pendentes: dict[str, list[dict]] = {}
+        self._commits: dict[str, int] = {}
+        for p in sorted(self.dir.glob("index*.jsonl")):
+            with open(p, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue
+                    if e.get("op") == "add":
+                        pendentes.setdefault(e["archive"], []).append(e)
+                    elif e.get("op") == "remove":
+                        self.entries.pop(e["path"], None)
+                    elif e.get("op") == "commit":
+                        self._commits[e["archive"]] = e["size"]
+                        for a in pendentes.pop(e["archive"], []):
+                            self.entries[a["path"]] = a
+
+        for adds in pendentes.values():
+            for a in adds:
+                self._perder(a)
+
+        for nome in set(self._commits) | set(pendentes):
+            path = self.dir / nome
+            atual = path.stat().st_size if path.exists() else 0
+            if atual < self._commits.get(nome, 0):
+                # menor que o último commit: o arquivo foi danificado por fora
+                logger.warning("Arquivo %s menor que o índice; seus tickets serão reimpressos", path)
+                if path.exists():
+                    os.replace(path, path.with_name(path.name + ".corrupt"))
+                self._commits.pop(nome)
+                for k in [k for k, e in self.entries.items() if e["archive"] == nome]:
+                    self._perder(self.entries.pop(k))
+            else:
+                self._truncar(nome)
+        if self.perdidos:
+            logger.info("Arquivos: %d PDFs sem commit serão reimpressos", len(self.perdidos))
+
+    def _perder(self, entry: dict):
+        self.perdidos.add(entry["ticket_id"])
+        self.assessores_perdidos.add(Path(entry["path"]).parent.name.removeprefix("assessor_"))
+
+    def _truncar(self, nome: str):
+        # descarta o que veio depois do último commit (escrita interrompida ou marcador de fim do tar)
+        path = self.dir / nome
+        tamanho = self._commits.get(nome, 0)
+        if not path.exists() or path.stat().st_size == tamanho:
+            return
+        if tamanho == 0:
+            path.unlink()
+            return
+        with open(path, "r+b") as f:
+            f.truncate(tamanho)
+
+    # ---------- escrita ----------
+    def _base(self, out: Path) -> tuple[str, str]:
+        if self.escopo == "assessor":
+            return out.parent.name, out.name
+        return f"run{self.sufixo}", f"{out.parent.name}/{out.name}"
+
+    def _novo_volume(self, base: str) -> str:
+        if self.formato != "zip":
+            return f"{base}.{self.formato}"
+        # volumes zip com commit são imutáveis: continua num volume novo
+        n = 0
+        while (nome := f"{base}.zip" if n == 0 else f"{base}.{n:03d}.zip") in self._commits:
+            n += 1
+        return nome
+
+    def _arquivo(self, base: str):
+        aberto = self._abertos.get(base)
+        if aberto is None:
+            nome = self._novo_volume(base)
+            self._truncar(nome)
+            path = self.dir / nome
+            a = _ZipArchive(path) if self.formato == "zip" else _TarArchive(path, self.formato == "tar.zst")
+            aberto = self._abertos[base] = (nome, a)
+        return aberto
+
+    def _log(self, entry: dict):
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def _commit(self, nome: str, tamanho: int | None):
+        if tamanho is not None:
+            self._commits[nome] = tamanho
+            self._log({"op": "commit", "archive": nome, "size": tamanho})
+
+    def tem(self, out: Path) -> bool:
+        with self.lock:
+            return str(out) in self.entries
+
+    def tamanho(self, out: Path) -> int | None:
+        with self.lock:
+            e = self.entries.get(str(out))
+        return e["size"] if e else None
+
+    def invalidar(self, out: Path):
+        # sync incremental: a versão antiga continua no arquivo, a nova entra como outro membro
+        with self.lock:
+            if self.entries.pop(str(out), None) is not None:
+                self._log({"op": "remove", "path": str(out)})
+
+    def gravar(self, out: Path, ticket_id: int, data: bytes):
+        base, member = self._base(out)
+        # um único escritor por vez: gravação sequencial em poucos arquivos grandes
+        with self.lock:
+            nome, a = self._arquivo(base)
+            a.adicionar(member, data)
+            entry = {
+                "op": "add", "archive": nome, "member": member, "path": str(out), "ticket_id": ticket_id,
+                "size": len(data), "sha256": hashlib.sha256(data).hexdigest(), "mtime": time.time(),
+            }
+            self._log(entry)
+            self.entries[entry["path"]] = entry
+            if self.formato != "zip":
+                self._commit(nome, a.commit())
+
+    def concluir_assessor(self, pasta: Path):
+        # fecha o volume do assessor; no escopo "run", o zip só fecha ao atingir volume_bytes
+        base, _ = self._base(pasta / "_")
+        with self.lock:
+            aberto = self._abertos.get(base)
+            if aberto is None:
+                return
+            nome, a = aberto
+            if self.escopo == "assessor" or (self.formato == "zip" and a.tamanho() >= self.volume_bytes):
+                self._abertos.pop(base)
+                self._commit(nome, a.close())
+
+    def close(self):
+        with self.lock:
+            for nome, a in self._abertos.values():
+                self._commit(nome, a.close())
+            self._abertos.clear()
+            self._f.close()
@@ -0,0 +1,247 @@
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+from .metrics import contar, cronometro
+from .urls import ticket_print_url, ticket_view_url
+
+logger = logging.getLogger(__name__)
+
+
+def browser_ws_url(drv) -> str:
+    # o Chrome aberto pelo chromedriver já expõe o DevTools em debuggerAddress
+    addr = drv.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    with urllib.request.urlopen(f"http://{addr}/json/version", timeout=10) as r:
+        return json.loads(r.read().decode("utf-8"))["webSocketDebuggerUrl"]
+
+
+class CdpError(RuntimeError):
+    pass
+
+
+class CdpConnection:
+    """Uma conexão websocket com o browser; sessões de cada aba em modo flatten."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._waiters: list[tuple[str, str | None, asyncio.Future, object]] = []
+        self._reader = asyncio.get_running_loop().create_task(self._read())
+
+    @classmethod
+    async def open(cls, ws_url: str) -> "CdpConnection":
+        try:
+            import websockets
+        except ImportError as e:
+            raise RuntimeError("runtime.engine = 'cdp' requer o pacote websockets.") from e
+        ws = await websockets.connect(ws_url, max_size=None, ping_interval=None)
+        return cls(ws)
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                msg = json.loads(raw)
+                if "id" in msg:
+                    fut = self._pending.pop(msg["id"], None)
+                    if fut and not fut.done():
+                        if "error" in msg:
+                            fut.set_exception(CdpError(msg["error"].get("message", str(msg["error"]))))
+                        else:
+                            fut.set_result(msg.get("result", {}))
+                    continue
+                method, sid = msg.get("method"), msg.get("sessionId")
+                params = msg.get("params", {})
+                for w in list(self._waiters):
+                    if w[0] == method and w[1] == sid and not w[2].done() and (w[3] is None or w[3](params)):
+                        w[2].set_result(params)
+                        self._waiters.remove(w)
+        except Exception as e:
+            err = e
+        else:
+            err = CdpError("conexão DevTools encerrada")
+        for fut in self._pending.values():
+            if not fut.done():
+                fut.set_exception(err)
+
+    async def send(self, method: str, params: dict | None = None, session_id: str | None = None, timeout: float = 60):
+        mid = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[mid] = fut
+        msg = {"id": mid, "method": method, "params": params or {}}
+        if session_id:
+            msg["sessionId"] = session_id
+        try:
+            await self.ws.send(json.dumps(msg))
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(mid, None)
+
+    def esperar_evento(self, method: str, session_id: str | None, filtro=None) -> asyncio.Future:
+        # registrar antes de disparar o comando que gera o evento; `filtro(params)` escolhe qual evento serve
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((method, session_id, fut, filtro))
+        return fut
+
+    def descartar(self, fut: asyncio.Future):
+        self._waiters[:] = [w for w in self._waiters if w[2] is not fut]
+
+    async def close(self):
+        self._reader.cancel()
+        await self.ws.close()
+
+
+class CdpEngine:
+    """Imprime vários tickets em paralelo dentro de um único Chrome via DevTools.
+
+    Abre `concorrencia` abas no contexto padrão do browser (mesmos cookies do
+    login feito pelo Selenium), cada uma já com scripts desativados e mídia de
+    impressão emulada, e mantém até K navegações/impressões em andamento.
+    """
+
+    def __init__(self, drv, subdomain: str, print_params: dict, concorrencia: int = 4,
+                 load_timeout_s: float = 22.0, idle_timeout_s: float = 2.0, throttle=None):
+        self.ws_url = browser_ws_url(drv)
+        self.subdomain = subdomain
+        self.print_params = print_params
+        self.concorrencia = max(1, concorrencia)
+        self.load_timeout_s = load_timeout_s
+        self.idle_timeout_s = idle_timeout_s
+        self.throttle = throttle
+
+        # loop asyncio próprio numa thread: a API pública continua síncrona
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="cdp-engine", daemon=True)
+        self._thread.start()
+        self.conn: CdpConnection | None = None
+        self.sessions: list[tuple[str, str]] = []
+        self._run(self._abrir())
+
+    def _run(self, coro, timeout: float | None = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    # ---------- abas ----------
+    async def _abrir(self):
+        self.conn = await CdpConnection.open(self.ws_url)
+        for _ in range(self.concorrencia):
+            self.sessions.append(await self._nova_aba())
+
+    async def _nova_aba(self) -> tuple[str, str]:
+        target = await self.conn.send("Target.createTarget", {"url": "about:blank"})
+        tid = target["targetId"]
+        att = await self.conn.send("Target.attachToTarget", {"targetId": tid, "flatten": True})
+        sid = att["sessionId"]
+        await self.conn.send("Page.enable", session_id=sid)
+        # lifecycle: networkAlmostIdle depois do load substitui a espera fixa antes do print
+        await self.conn.send("Page.setLifecycleEventsEnabled", {"enabled": True}, session_id=sid)
+        # mesmas emulações do salvar_ticket_pdf, feitas uma vez por aba
+        await self.conn.send("Emulation.setScriptExecutionDisabled", {"value": True}, session_id=sid)
+        await self.conn.send("Emulation.setEmulatedMedia", {"media": "print"}, session_id=sid)
+        return tid, sid
+
+    async def _fechar_aba(self, target_id: str):
+        try:
+            await self.conn.send("Target.closeTarget", {"targetId": target_id}, timeout=10)
+        except Exception:
+            pass
+
+    # ---------- impressão ----------
+    async def _navegar(self, sid: str, url: str) -> bool:
+        nav: dict = {}
+        load = self.conn.esperar_evento("Page.loadEventFired", sid)
+        # só o networkAlmostIdle desta navegação (eventos atrasados da anterior têm outro loaderId)
+        ocioso = self.conn.esperar_evento(
+            "Page.lifecycleEvent", sid,
+            lambda p: p.get("name") == "networkAlmostIdle" and p.get("loaderId") == nav.get("loaderId"),
+        )
+        try:
+            nav.update(await self.conn.send("Page.navigate", {"url": url}, session_id=sid))
+            if nav.get("errorText"):
+                return False
+            await asyncio.wait_for(load, self.load_timeout_s)
+            try:
+                await asyncio.wait_for(ocioso, self.idle_timeout_s)
+            except asyncio.TimeoutError:
+                pass
+            return True
+        except asyncio.TimeoutError:
+            # mesmo comportamento do wait_document_ready: imprime o que carregou
+            return True
+        finally:
+            self.conn.descartar(load)
+            self.conn.descartar(ocioso)
+
+    async def _imprimir(self, sid: str, ticket_id: int) -> bytes:
+        with cronometro("page_load", engine="cdp"):
+            if not await self._navegar(sid, ticket_print_url(self.subdomain, ticket_id)):
+                contar("retries_total", stage="page_load")
+                await self._navegar(sid, ticket_view_url(self.subdomain, ticket_id))
+                await self._navegar(sid, ticket_print_url(self.subdomain, ticket_id))
+        with cronometro("print_to_pdf", engine="cdp"):
+            pdf = await self.conn.send("Page.printToPDF", self.print_params, session_id=sid, timeout=120)
+        with cronometro("b64decode", engine="cdp"):
+            return base64.b64decode(pdf["data"])
+
+    async def _worker(self, slot: int, fila: asyncio.Queue, on_result):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                ticket_id = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            target_id, sid = self.sessions[slot]
+            if self.throttle is not None:
+                await loop.run_in_executor(None, self.throttle.aguardar)
+            t0 = time.monotonic()
+            try:
+                res = await self._imprimir(sid, ticket_id)
+                if self.throttle is not None:
+                    self.throttle.registrar(True, time.monotonic() - t0)
+            except Exception as e:
+                res = e
+                if self.throttle is not None:
+                    self.throttle.registrar(False, time.monotonic() - t0)
+            # grava fora do loop para não segurar as outras abas
+            await loop.run_in_executor(None, on_result, ticket_id, res)
+            if isinstance(res, Exception):
+                # aba possivelmente quebrada: recria para o próximo ticket
+                await self._fechar_aba(target_id)
+                try:
+                    self.sessions[slot] = await self._nova_aba()
+                except Exception as e2:
+                    logger.warning("CDP: não consegui recriar aba %d: %s", slot, e2)
+                    return
+            if self.throttle is not None:
+                await loop.run_in_executor(None, self.throttle.depois_do_ticket)
+
+    async def _lote(self, ticket_ids: list[int], on_result):
+        fila: asyncio.Queue = asyncio.Queue()
+        for t in ticket_ids:
+            fila.put_nowait(t)
+        await asyncio.gather(*(self._worker(i, fila, on_result) for i in range(len(self.sessions))))
+        # tickets que sobraram (todas as abas caíram)
+        while not fila.empty():
+            on_result(fila.get_nowait(), CdpError("nenhuma aba CDP disponível"))
+
+    def imprimir_lote(self, ticket_ids: list[int], on_result):
+        # on_result(ticket_id, bytes | Exception) é chamado assim que cada ticket termina
+        if ticket_ids:
+            self._run(self._lote(list(ticket_ids), on_result))
+
+    def close(self):
+        async def _close():
+            for target_id, _ in self.sessions:
+                await self._fechar_aba(target_id)
+            if self.conn is not None:
+                await self.conn.close()
+        try:
+            self._run(_close(), timeout=30)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# eventos do journal: uma linha por ticket/assessor concluído
+EV_TICKET = "T"
+EV_ASSESSOR = "A"
+
+
+def journal_paths(snapshot: Path) -> tuple[Path, Path]:
+    # journal ativo + segmento em compactação (checkpoint.json -> checkpoint.journal / .journal.old)
+    base = snapshot.with_suffix(".journal")
+    return base, base.with_name(base.name + ".old")
+
+
+def _replay(path: Path, done_assessors: set, processed_tickets: set):
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return
+    # só linhas terminadas em \n: a última pode ter sido cortada por um kill
+    for raw in data.split(b"\n")[:-1]:
+        try:
+            kind, _, value = raw.decode("utf-8").partition("\t")
+            if kind == EV_TICKET:
+                processed_tickets.add(int(value))
+            elif kind == EV_ASSESSOR and value:
+                done_assessors.add(value)
+        except Exception:
+            continue
+
+
+def read_checkpoint(snapshot: Path) -> tuple[set, set]:
+    """Lê snapshot + journal sem abrir para escrita (status, outros nós)."""
+    done_assessors: set = set()
+    processed_tickets: set = set()
+    try:
+        data = json.loads(snapshot.read_text(encoding="utf-8"))
+        done_assessors.update(data.get("done_assessors", []))
+        processed_tickets.update(data.get("processed_tickets", []))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Snapshot de checkpoint ilegível (%s): %s", snapshot, e)
+    journal, old = journal_paths(snapshot)
+    _replay(old, done_assessors, processed_tickets)
+    _replay(journal, done_assessors, processed_tickets)
+    return done_assessors, processed_tickets
+
+
+class CheckpointJournal:
+    """Checkpoint com journal append-only e compactação em background.
+
+    Cada ticket/assessor concluído vira uma linha no journal; periodicamente o
+    estado é gravado num snapshot (`checkpoint.json`, mesmo formato de antes)
+    via arquivo temporário + `os.replace`, e o journal é rotacionado.
+    """
+
+    def __init__(self, snapshot: Path, reset: bool = False, compact_every: int = 5000,
+                 compact_interval_s: float = 60.0, fsync: bool = False):
+        self.snapshot = snapshot
+        self.journal, self.journal_old = journal_paths(snapshot)
+        self.compact_every = compact_every
+        self.compact_interval_s = compact_interval_s
+        self.fsync = fsync
+
+        snapshot.parent.mkdir(parents=True, exist_ok=True)
+        if reset:
+            for p in (self.journal, self.journal_old):
+                p.unlink(missing_ok=True)
+            self._write_snapshot(set(), set())
+
+        self.done_assessors, self.processed_tickets = read_checkpoint(snapshot)
+        if self.journal_old.exists():
+            # compactação interrompida: consolida antes de reabrir o journal
+            self._write_snapshot(self.done_assessors, self.processed_tickets)
+            self.journal_old.unlink()
+
+        self.lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._pendentes = 0
+        self._fd = self._open()
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="checkpoint-compact", daemon=True)
+        self._thread.start()
+
+    # ---------- escrita ----------
+    def _open(self) -> int:
+        fd = os.open(str(self.journal), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        size = os.fstat(fd).st_size
+        if size:
+            with open(self.journal, "rb") as f:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    # descarta a linha cortada para não contaminar o próximo evento
+                    f.seek(0)
+                    os.ftruncate(fd, f.read().rfind(b"\n") + 1)
+        return fd
+
+    def _append(self, kind: str, *values):
+        if not values:
+            return
+        data = "".join(f"{kind}\t{v}\n" for v in values).encode("utf-8")
+        with self.lock:
+            os.write(self._fd, data)
+            if self.fsync:
+                os.fsync(self._fd)
+            self._pendentes += len(values)
+            if self._pendentes >= self.compact_every:
+                self._wake.set()
+
+    def registrar_ticket(self, tid: int):
+        with self.lock:
+            if tid in self.processed_tickets:
+                return
+            self.processed_tickets.add(tid)
+        self._append(EV_TICKET, int(tid))
+
+    def registrar_tickets(self, tids: list[int]):
+        # lote já contabilizado em memória por quem chamou (ex.: após o flush do inventário)
+        with self.lock:
+            self.processed_tickets.update(tids)
+        self._append(EV_TICKET, *(int(t) for t in tids))
+
+    def registrar_assessor(self, cod: str):
+        with self.lock:
+            self.done_assessors.add(cod)
+        self._append(EV_ASSESSOR, cod)
+
+    def esquecer(self, tids, assessores=()):
+        # tira do próximo snapshot o que se perdeu fora do journal (ex.: archive sem commit)
+        with self.lock:
+            self.processed_tickets.difference_update(tids)
+            self.done_assessors.difference_update(assessores)
+            self._pendentes += 1
+
+    # ---------- compactação ----------
+    def _write_snapshot(self, done_assessors: set, processed_tickets: set):
+        tmp = self.snapshot.with_name(self.snapshot.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "done_assessors": sorted(done_assessors),
+            "processed_tickets": sorted(processed_tickets)
+        }, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.snapshot)
+
+    def compactar(self):
+        with self._compact_lock:
+            with self.lock:
+                if self._pendentes == 0 and not self.journal_old.exists():
+                    return
+                # rotaciona: novos eventos vão para um journal novo enquanto o snapshot é gravado
+                os.close(self._fd)
+                os.replace(self.journal, self.journal_old)
+                self._fd = self._open()
+                self._pendentes = 0
+                done = set(self.done_assessors)
+                processed = set(self.processed_tickets)
+            self._write_snapshot(done, processed)
+            self.journal_old.unlink(missing_ok=True)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.compact_interval_s)
+            self._wake.clear()
+            try:
+                self.compactar()
+            except Exception as e:
+                logger.warning("Falha ao compactar checkpoint: %s", e)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=30)
+        self.compactar()
+        with self.lock:
+            os.close(self._fd)
@@ -0,0 +1,148 @@
+import csv
+import logging
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+CODIGO_RE = re.compile(r"([A-Za-z]?\d{3,})")
+VAZIOS = {"", "nan", "none", "null"}
+
+
+# ===================== Cabeçalho / normalização =====================
+def coluna_codigo(header: Iterable) -> int | None:
+    # mesma regra de antes: "xp" + "cod"/"cód" no nome, ou exatamente "código xp"
+    for i, c in enumerate(header):
+        c = str(c if c is not None else "").strip().lower()
+        if ("xp" in c and ("cod" in c or "cód" in c)) or c in ("codigo xp", "código xp"):
+            return i
+    return None
+
+
+def normalizar(valor) -> str | None:
+    if valor is None:
+        return None
+    s = str(valor).strip()
+    if s.lower() in VAZIOS:
+        return None
+    m = CODIGO_RE.search(s)
+    return m.group(1).upper() if m else None
+
+
+# ===================== Leitores (valores da coluna, em streaming) =====================
+def _valores_xlsx(path: Path) -> Iterator:
+    from openpyxl import load_workbook
+
+    # read_only: as linhas são lidas do XML sob demanda, sem montar a planilha em memória
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        achou = False
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            col = coluna_codigo(header) if header else None
+            if col is None:
+                continue
+            achou = True
+            for row in rows:
+                if col < len(row):
+                    yield row[col]
+        if not achou:
+            cabecalhos = [[c for c in next(ws.iter_rows(max_row=1, values_only=True), ())] for ws in wb.worksheets]
+            raise ValueError(f"Não encontrei coluna de 'Código XP'. Colunas: {cabecalhos}")
+    finally:
+        wb.close()
+
+
+def _valores_xls(path: Path) -> Iterator:
+    # .xls antigo não é lido pelo openpyxl: único caso que ainda usa pandas (importado só aqui)
+    import pandas as pd
+
+    planilhas = pd.read_excel(path, sheet_name=None)
+    achou = False
+    for df in planilhas.values():
+        col = coluna_codigo(df.columns)
+        if col is not None:
+            achou = True
+            yield from df.iloc[:, col].tolist()
+    if not achou:
+        cabecalhos = [list(df.columns) for df in planilhas.values()]
+        raise ValueError(f"Não encontrei coluna de 'Código XP'. Colunas: {cabecalhos}")
+
+
+def _abrir_texto(path: Path):
+    try:
+        f = open(path, "r", encoding="utf-8-sig", newline="")
+        f.read(4096)
+        f.seek(0)
+        return f
+    except UnicodeDecodeError:
+        return open(path, "r", encoding="latin-1", newline="")
+
+
+def _valores_csv(path: Path) -> Iterator:
+    with _abrir_texto(path) as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t|")
+        except csv.Error:
+            dialeto = csv.excel
+        rows = csv.reader(f, dialeto)
+        col = coluna_codigo(next(rows, []))
+        if col is None:
+            raise ValueError(f"Não encontrei coluna de 'Código XP' em {path}")
+        for row in rows:
+            if col < len(row):
+                yield row[col]
+
+
+def _valores_txt(path: Path) -> Iterator:
+    # um código por linha; um cabeçalho sem dígitos é descartado pela normalização
+    with _abrir_texto(path) as f:
+        yield from f
+
+
+def _valores_parquet(path: Path) -> Iterator:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Planilha .parquet requer o pacote pyarrow.") from e
+
+    pf = pq.ParquetFile(path)
+    col = coluna_codigo(pf.schema_arrow.names)
+    if col is None:
+        raise ValueError(f"Não encontrei coluna de 'Código XP'. Colunas: {pf.schema_arrow.names}")
+    nome = pf.schema_arrow.names[col]
+    for batch in pf.iter_batches(columns=[nome], batch_size=10_000):
+        yield from batch.column(0).to_pylist()
+
+
+LEITORES = {
+    ".xlsx": _valores_xlsx,
+    ".xlsm": _valores_xlsx,
+    ".xls": _valores_xls,
+    ".csv": _valores_csv,
+    ".txt": _valores_txt,
+    ".parquet": _valores_parquet,
+}
+
+
+# ===================== API =====================
+def iterar_codigos(path: Path) -> Iterator[str]:
+    """Códigos normalizados e sem repetição, na ordem da planilha, lidos sob demanda."""
+    path = Path(path)
+    leitor = LEITORES.get(path.suffix.lower())
+    if leitor is None:
+        raise ValueError(f"Formato de planilha não suportado: {path.suffix} (use {', '.join(LEITORES)})")
+    vistos: set[str] = set()
+    for valor in leitor(path):
+        cod = normalizar(valor)
+        if cod and cod not in vistos:
+            vistos.add(cod)
+            yield cod
+
+
+def carregar_codigos(path: Path) -> list[str]:
+    return list(iterar_codigos(path))
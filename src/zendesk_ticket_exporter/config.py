@@ -20,12 +20,84 @@ class Config:
     headless: bool
     keep_browser_open: bool
     reset_checkpoint: bool
+    workers: int
+    engine: str
+    cdp_concurrency: int
+    pipeline: bool
+    pipeline_queue_size: int
+    prefetch: bool
+    prefetch_workers: int
+    prefetch_window: int
+
+    # descoberta de tickets
+    discovery: str
+    discovery_fallback: bool
+    api_token: str | None
+    include_ccd: bool
+
+    # sync
+    sync_mode: str
+
+    # inventário
+    inventory_format: str
+    inventory_batch_rows: int
+    inventory_flush_s: float
+
+    # coordenação multi-host
+    coordination: str
+    node_id: str | None
+    lease_ttl_s: float
+    lease_tickets: bool
+
+    # store de PDFs por conteúdo
+    store: bool
+    store_link: str
+
+    # perfis do Chrome
+    profile_reuse: bool
+    profile_max_age_days: float
+    profile_max_total_mb: int
+
+    # reciclagem do navegador
+    recycle_after_tickets: int
+    recycle_max_rss_mb: float
+    recycle_slowdown_factor: float
+
+    # métricas
+    metrics: bool
+    metrics_interval_s: float
+    metrics_textfile: Path | None
+
+    # retry de tickets com falha transitória
+    retry_max_attempts: int
+    retry_base_s: float
+    retry_max_s: float
+
+    # cache código do assessor -> id do usuário
+    user_cache: bool
+    user_cache_ttl_days: float
+
+    # saída em arquivos compactados
+    archive: bool
+    archive_format: str
+    archive_scope: str
+    archive_volume_mb: int
+
+    # dossiê por assessor
+    dossier: bool
+    dossier_workers: int
+    dossier_max_pages: int
 
     # throttle
     between_tickets_min_s: float
     between_tickets_max_s: float
     after_print_min_s: float
     after_print_max_s: float
+    throttle_mode: str
+    rate_initial_per_min: float
+    rate_min_per_min: float
+    rate_max_per_min: float
+    rate_slow_latency_s: float
 
     # limits
     max_pages: int
@@ -47,6 +119,18 @@ class Config:
         runtime = data.get("runtime", {})
         throttle = data.get("throttle", {})
         limits = data.get("limits", {})
+        prefetch = data.get("prefetch", {})
+        coordination = data.get("coordination", {})
+        discovery = data.get("discovery", {})
+        sync = data.get("sync", {})
+        inventory = data.get("inventory", {})
+        dossier = data.get("dossier", {})
+        store = data.get("store", {})
+        archive = data.get("archive", {})
+        profiles = data.get("profiles", {})
+        watchdog = data.get("watchdog", {})
+        metrics = data.get("metrics", {})
+        retry = data.get("retry", {})
         logging = data.get("logging", {"level": "INFO"})
 
         max_tickets = limits.get("max_tickets_per_assessor", None)
@@ -65,10 +149,58 @@ class Config:
             headless=bool(runtime.get("headless", False)),
             keep_browser_open=bool(runtime.get("keep_browser_open", True)),
             reset_checkpoint=bool(runtime.get("reset_checkpoint", False)),
+            workers=max(1, int(runtime.get("workers", 1))),
+            engine=str(runtime.get("engine", "selenium")).lower(),
+            cdp_concurrency=max(1, int(runtime.get("cdp_concurrency", 4))),
+            pipeline=bool(runtime.get("pipeline", False)),
+            pipeline_queue_size=max(1, int(runtime.get("queue_size", 64))),
+            prefetch=bool(prefetch.get("enabled", False)),
+            prefetch_workers=max(1, int(prefetch.get("workers", 4))),
+            prefetch_window=max(1, int(prefetch.get("window", 8))),
+            discovery=str(discovery.get("backend", "selenium")).lower(),
+            discovery_fallback=bool(discovery.get("fallback_selenium", True)),
+            api_token=auth.get("api_token") or None,
+            include_ccd=bool(discovery.get("include_ccd", True)),
+            sync_mode=str(sync.get("mode", "full")).lower(),
+            inventory_format=str(inventory.get("format", "csv")).lower(),
+            inventory_batch_rows=max(1, int(inventory.get("batch_rows", 500))),
+            inventory_flush_s=float(inventory.get("flush_interval_s", 5.0)),
+            coordination=str(coordination.get("mode", "local")).lower(),
+            node_id=coordination.get("node_id") or None,
+            lease_ttl_s=float(coordination.get("lease_ttl_s", 300)),
+            lease_tickets=bool(coordination.get("lease_tickets", False)),
+            store=bool(store.get("enabled", False)),
+            store_link=str(store.get("link", "auto")).lower(),
+            profile_reuse=bool(profiles.get("reuse", True)),
+            profile_max_age_days=float(profiles.get("max_age_days", 7)),
+            profile_max_total_mb=max(1, int(profiles.get("max_total_mb", 4096))),
+            recycle_after_tickets=max(0, int(watchdog.get("recycle_after_tickets", 500))),
+            recycle_max_rss_mb=max(0.0, float(watchdog.get("max_rss_mb", 3072))),
+            recycle_slowdown_factor=max(0.0, float(watchdog.get("slowdown_factor", 0))),
+            metrics=bool(metrics.get("enabled", False)),
+            metrics_interval_s=max(1.0, float(metrics.get("interval_s", 30))),
+            metrics_textfile=Path(metrics["textfile"]) if metrics.get("textfile") else None,
+            retry_max_attempts=max(1, int(retry.get("max_attempts", 3))),
+            retry_base_s=max(0.0, float(retry.get("base_s", 5))),
+            retry_max_s=max(0.0, float(retry.get("max_s", 120))),
+            user_cache=bool(discovery.get("user_cache", True)),
+            user_cache_ttl_days=max(0.0, float(discovery.get("user_cache_ttl_days", 30))),
+            archive=bool(archive.get("enabled", False)),
+            archive_format=str(archive.get("format", "zip")).lower(),
+            archive_scope=str(archive.get("scope", "assessor")).lower(),
+            archive_volume_mb=max(1, int(archive.get("volume_mb", 1024))),
+            dossier=bool(dossier.get("enabled", False)),
+            dossier_workers=max(1, int(dossier.get("workers", 4))),
+            dossier_max_pages=max(1, int(dossier.get("max_pages_per_volume", 5000))),
             between_tickets_min_s=float(throttle.get("between_tickets_min_s", 1.0)),
             between_tickets_max_s=float(throttle.get("between_tickets_max_s", 2.0)),
             after_print_min_s=float(throttle.get("after_print_min_s", 0.6)),
             after_print_max_s=float(throttle.get("after_print_max_s", 1.0)),
+            throttle_mode=str(throttle.get("mode", "fixed")).lower(),
+            rate_initial_per_min=float(throttle.get("initial_per_min", 30)),
+            rate_min_per_min=float(throttle.get("min_per_min", 5)),
+            rate_max_per_min=float(throttle.get("max_per_min", 120)),
+            rate_slow_latency_s=float(throttle.get("slow_latency_s", 8.0)),
             max_pages=int(limits.get("max_pages", 5000)),
             retry_create_driver=int(limits.get("retry_create_driver", 2)),
             max_tickets_per_assessor=max_tickets,
@@ -0,0 +1,140 @@
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import contar, cronometro
+from .urls import api_url
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+
+def criar_sessao_http(pool_size: int = 10, retries: int = 3) -> requests.Session:
+    # sessão com pool de conexões e retry (respeita Retry-After em 429/503)
+    sess = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.8,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    sess.headers["Accept"] = "application/json"
+    return sess
+
+
+class ApiDiscovery:
+    """Descoberta de tickets pela API REST do Zendesk (paginação por cursor).
+
+    Fluxo: busca o usuário pelo código (`users/search`) e lista os tickets
+    solicitados por ele e, opcionalmente, os que ele está em cópia (CC).
+    """
+
+    def __init__(self, subdomain: str, email: str, senha: str, api_token: str | None = None,
+                 include_ccd: bool = True, timeout_s: float = 30.0, session: requests.Session | None = None,
+                 on_throttled=None, cache=None):
+        self.subdomain = subdomain
+        self.cache = cache  # UserIdCache opcional (código -> id do usuário)
+        self.include_ccd = include_ccd
+        self.timeout_s = timeout_s
+
+        self.session = session or criar_sessao_http()
+        if on_throttled is not None:
+            # 429 da API também desacelera o controle de ritmo compartilhado
+            self.session.hooks["response"].append(
+                lambda r, *args, **kwargs: on_throttled() if r.status_code == 429 else None
+            )
+        if api_token:
+            self.session.auth = (f"{email}/token", api_token)
+        else:
+            self.session.auth = (email, senha)
+
+    # ---------- HTTP ----------
+    def _get(self, url: str, params: dict | None = None) -> dict:
+        with cronometro("api_request"):
+            r = self.session.get(url, params=params, timeout=self.timeout_s)
+        contar("api_requests_total", status=r.status_code)
+        r.raise_for_status()
+        return r.json()
+
+    def _paginar(self, path: str, chave: str, params: dict | None = None):
+        url = api_url(self.subdomain, path)
+        params = {**(params or {}), "page[size]": PAGE_SIZE}
+        while url:
+            data = self._get(url, params=params)
+            yield from data.get(chave) or []
+
+            if not (data.get("meta") or {}).get("has_more"):
+                break
+            url = (data.get("links") or {}).get("next")
+            params = None  # o link "next" já traz o cursor
+
+    # ---------- API pública ----------
+    def buscar_usuario(self, cod: str) -> int | None:
+        data = self._get(api_url(self.subdomain, "users/search.json"), params={"query": cod})
+        users = data.get("users") or []
+        if not users:
+            return None
+        return int(users[0]["id"])
+
+    def tickets_do_usuario(self, user_id: int, limite: int | None = None) -> list[dict]:
+        fontes = [f"users/{user_id}/tickets/requested.json"]
+        if self.include_ccd:
+            fontes.append(f"users/{user_id}/tickets/ccd.json")
+
+        tickets: dict[int, dict] = {}
+        for path in fontes:
+            for t in self._paginar(path, "tickets"):
+                tickets[int(t["id"])] = t
+                if limite and len(tickets) >= limite:
+                    break
+            if limite and len(tickets) >= limite:
+                break
+        return [tickets[k] for k in sorted(tickets)]
+
+    def tickets_incrementais(self, cursor: str | None = None, start_time: int | None = None) -> tuple[list[dict], str | None]:
+        # export incremental (cursor): todos os tickets alterados desde o cursor/start_time
+        url = api_url(self.subdomain, "incremental/tickets/cursor.json")
+        params = {"cursor": cursor} if cursor else {"start_time": int(start_time or 0)}
+
+        tickets: list[dict] = []
+        after = cursor
+        while True:
+            data = self._get(url, params=params)
+            tickets.extend(data.get("tickets") or [])
+            after = data.get("after_cursor") or after
+            if data.get("end_of_stream", True) or not after:
+                break
+            params = {"cursor": after}
+        return tickets, after
+
+    def descobrir(self, cod: str, limite: int | None = None) -> list[int] | None:
+        # None = código sem usuário correspondente
+        tickets = None
+        user_id = self.cache.obter(cod) if self.cache is not None else None
+        if user_id is not None:
+            try:
+                tickets = self.tickets_do_usuario(user_id, limite)
+            except requests.HTTPError as e:
+                # usuário removido/mesclado desde que entrou no cache
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                self.cache.invalidar(cod)
+        if tickets is None:
+            user_id = self.buscar_usuario(cod)
+            if user_id is None:
+                return None
+            if self.cache is not None:
+                self.cache.gravar(cod, user_id, "api")
+            tickets = self.tickets_do_usuario(user_id, limite)
+        ids = [int(t["id"]) for t in tickets]
+        return ids[:limite] if limite else ids
+
+    def close(self):
+        self.session.close()
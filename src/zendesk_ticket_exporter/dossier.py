@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_TICKET_RE = re.compile(r"^ticket_(\d+)\.pdf$")
+_ASSESSOR_RE = re.compile(r"^assessor_(.+)$")
+
+
+def tickets_da_pasta(pasta: Path) -> list[tuple[int, Path]]:
+    # só a versão atual de cada ticket (ignora ticket_{id}.v{n}.pdf do sync incremental)
+    achados = []
+    for p in pasta.iterdir():
+        m = _TICKET_RE.match(p.name)
+        if m:
+            achados.append((int(m.group(1)), p))
+    return sorted(achados)
+
+
+def impressao_digital(tickets: list[tuple[int, Path]], max_paginas: int) -> str:
+    h = hashlib.sha256(f"v1:{max_paginas}".encode())
+    for tid, p in tickets:
+        st = p.stat()
+        h.update(f"{tid}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def _salvar_estado(path: Path, estado: dict):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _carregar_estado(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# ===================== Montagem (roda no processo filho) =====================
+def _gravar_volume(writer, destino: Path):
+    # fontes/imagens repetidas entre tickets viram um objeto só
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    tmp = destino.with_suffix(".pdf.tmp")
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    os.replace(tmp, destino)
+    writer.close()
+
+
+def montar_dossie(cod: str, pasta: str, destino_dir: str, max_paginas: int) -> dict:
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise RuntimeError("dossier requer o pacote pypdf (>= 5).") from e
+
+    tickets = tickets_da_pasta(Path(pasta))
+    destino_dir = Path(destino_dir)
+    destino_dir.mkdir(parents=True, exist_ok=True)
+
+    # volumes limitados por páginas: o writer do pypdf mantém o volume inteiro em memória
+    volumes: list[Path] = []
+    writer, paginas, ruins = None, 0, []
+    for tid, p in tickets:
+        try:
+            reader = PdfReader(p)
+            n = len(reader.pages)
+        except Exception as e:
+            ruins.append(tid)
+            logger.warning("Dossiê %s: ticket %s ilegível (%s)", cod, tid, e)
+            continue
+
+        if writer is not None and paginas + n > max_paginas:
+            volumes.append(destino_dir / f"dossie_{cod}_parte{len(volumes) + 1:02d}.pdf")
+            _gravar_volume(writer, volumes[-1])
+            writer = None
+
+        if writer is None:
+            writer, paginas = PdfWriter(), 0
+            writer.add_metadata({"/Title": f"Assessor {cod}"})
+            writer.page_mode = "/UseOutlines"
+
+        # cada ticket vira uma entrada do sumário (outline) apontando para sua 1ª página
+        writer.append(reader, outline_item=f"Ticket {tid}")
+        paginas += n
+
+    if writer is not None:
+        nome = f"dossie_{cod}.pdf" if not volumes else f"dossie_{cod}_parte{len(volumes) + 1:02d}.pdf"
+        volumes.append(destino_dir / nome)
+        _gravar_volume(writer, volumes[-1])
+
+    # volumes de uma montagem anterior maior
+    if len(volumes) == 1 and volumes[0].name == f"dossie_{cod}.pdf":
+        antigos = destino_dir.glob(f"dossie_{cod}_parte*.pdf")
+    else:
+        antigos = [destino_dir / f"dossie_{cod}.pdf", *destino_dir.glob(f"dossie_{cod}_parte*.pdf")]
+    for p in antigos:
+        if p not in volumes and p.exists():
+            p.unlink()
+
+    return {"tickets": len(tickets) - len(ruins), "ilegiveis": ruins, "volumes": [str(v) for v in volumes]}
+
+
+# ===================== Estágio pós-exportação =====================
+def montar_dossies(out_dir: Path, workers: int = 4, max_paginas: int = 5000, forcar: bool = False) -> int:
+    """Gera um PDF por assessor (com sumário) em `out_dir/dossies/`.
+
+    Incremental: `dossier_state.json` guarda a impressão digital (ids, tamanho e
+    mtime dos PDFs) de cada assessor; só os que mudaram são remontados.
+    """
+    destino_dir = out_dir / "dossies"
+    estado_path = out_dir / "dossier_state.json"
+    estado = {} if forcar else _carregar_estado(estado_path)
+
+    tarefas: dict[str, tuple[Path, str]] = {}
+    for pasta in sorted(out_dir.glob("assessor_*")):
+        m = _ASSESSOR_RE.match(pasta.name)
+        if not m or not pasta.is_dir():
+            continue
+        cod = m.group(1)
+        tickets = tickets_da_pasta(pasta)
+        if not tickets:
+            continue
+        digital = impressao_digital(tickets, max_paginas)
+        if estado.get(cod, {}).get("fingerprint") != digital:
+            tarefas[cod] = (pasta, digital)
+
+    if not tarefas:
+        logger.info("Dossiês já atualizados.")
+        return 0
+
+    inicio = time.time()
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        futuros = {
+            ex.submit(montar_dossie, cod, str(pasta), str(destino_dir), max_paginas): cod
+            for cod, (pasta, _) in tarefas.items()
+        }
+        for fut in as_completed(futuros):
+            cod = futuros[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                falhas += 1
+                logger.error("Dossiê do assessor %s falhou: %s", cod, e)
+                continue
+            estado[cod] = {
+                "fingerprint": tarefas[cod][1],
+                "tickets": res["tickets"],
+                "volumes": res["volumes"],
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            # grava a cada assessor: uma interrupção não perde o que já foi montado
+            _salvar_estado(estado_path, estado)
+            logger.info("Dossiê %s: %d tickets em %d volume(s)", cod, res["tickets"], len(res["volumes"]))
+
+    logger.info("Dossiês: %d montados, %d falhas em %.1fs", len(tarefas) - falhas, falhas, time.time() - inicio)
+    return falhas
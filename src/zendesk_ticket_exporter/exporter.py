@@ -5,12 +5,14 @@ import json
 import time
 import random
 import base64
-import csv
+import socket
+import logging
+import threading
+from collections import deque
 from pathlib import Path
 from dataclasses import dataclass
 from getpass import getpass
 
-import pandas as pd
 from dotenv import load_dotenv
 
 from selenium import webdriver
@@ -19,9 +21,24 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, InvalidSessionIdException
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+
+from .checkpoint import CheckpointJournal, read_checkpoint
+from .codigos import carregar_codigos
+from .inventory import InventorySink
+from .manifest import Manifest, pdf_bytes_validos, pdf_valido
+from .metrics import METRICAS, MetricsWriter, contar, cronometro, definir
+from .profiles import aberto_pelo_chrome, despejar_perfis, perfil_nomeado
+from .rate import FixedThrottle, ZendeskRateLimited, criar_throttle
+from .retry import criar_fila_retry
+from .store import PdfStore
+from .sync import versionar_pdf
+from .usercache import UserIdCache
+from .waits import esperar, esperar_documento, esperar_elemento, esperar_por_texto, esperar_quieto, esperar_url
+from .watchdog import criar_watchdog
+from .urls import api_url, login_url, ticket_print_url, ticket_view_url, user_tickets_url
+
+logger = logging.getLogger(__name__)
 
 
 # ===================== Data classes =====================
@@ -45,41 +62,76 @@ class ExporterConfig:
     retry_create_driver: int
     max_tickets_per_assessor: int | None
 
+    workers: int = 1
 
-# ===================== Small IO helpers =====================
-def ensure_parent(p: Path):
-    p.parent.mkdir(parents=True, exist_ok=True)
+    discovery: str = "selenium"
+    discovery_fallback: bool = True
+    api_token: str | None = None
+    include_ccd: bool = True
 
+    sync_mode: str = "full"
 
-def append_csv_row(path: Path, header: list, row: list):
-    ensure_parent(path)
-    is_new = not path.exists()
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if is_new:
-            w.writerow(header)
-        w.writerow(row)
+    engine: str = "selenium"
+    cdp_concurrency: int = 4
 
+    pipeline: bool = False
+    pipeline_queue_size: int = 64
 
-def save_json(path: Path, obj: dict):
-    ensure_parent(path)
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    prefetch: bool = False
+    prefetch_workers: int = 4
+    prefetch_window: int = 8
 
+    throttle_mode: str = "fixed"
+    rate_initial_per_min: float = 30.0
+    rate_min_per_min: float = 5.0
+    rate_max_per_min: float = 120.0
+    rate_slow_latency_s: float = 8.0
 
-def load_json(path: Path) -> dict:
-    if not path.exists():
-        return {}
-    return json.loads(path.read_text(encoding="utf-8"))
+    store: bool = False
+    store_link: str = "auto"
 
+    profile_reuse: bool = True
+    profile_max_age_days: float = 7.0
+    profile_max_total_mb: int = 4096
 
-def pdf_valido(path: Path) -> bool:
-    try:
-        b = path.read_bytes()
-        if len(b) < 2048:
-            return False
-        return b.startswith(b"%PDF-")
-    except Exception:
-        return False
+    recycle_after_tickets: int = 500
+    recycle_max_rss_mb: float = 3072.0
+    recycle_slowdown_factor: float = 0.0
+
+    metrics: bool = False
+    metrics_interval_s: float = 30.0
+    metrics_textfile: Path | None = None
+
+    retry_max_attempts: int = 3
+    retry_base_s: float = 5.0
+    retry_max_s: float = 120.0
+
+    user_cache: bool = True
+    user_cache_ttl_days: float = 30.0
+
+    archive: bool = False
+    archive_format: str = "zip"
+    archive_scope: str = "assessor"
+    archive_volume_mb: int = 1024
+
+    inventory_format: str = "csv"
+    inventory_batch_rows: int = 500
+    inventory_flush_s: float = 5.0
+
+    coordination: str = "local"
+    node_id: str | None = None
+    lease_ttl_s: float = 300.0
+    lease_tickets: bool = False
+
+
+# ===================== Small IO helpers =====================
+def save_json(path: Path, obj: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
 
 
 # ===================== Config & env =====================
@@ -100,19 +152,8 @@ def get_env_or_prompt(cfg_email: str, cfg_pass: str) -> tuple[str, str]:
 
 
 def carregar_codigos_xlsx(path: Path) -> list[str]:
-    raw = pd.read_excel(path, sheet_name=None)
-    df = pd.concat(raw.values(), ignore_index=True) if isinstance(raw, dict) else raw.copy()
-    df.columns = df.columns.str.strip().str.lower()
-
-    possiveis = [c for c in df.columns if ("xp" in c and ("cod" in c or "cód" in c)) or c in ("codigo xp", "código xp")]
-    if not possiveis:
-        raise ValueError(f"Não encontrei coluna de 'Código XP'. Colunas: {list(df.columns)}")
-
-    col = possiveis[0]
-    s = df[col].astype(str).fillna("").str.strip()
-    s = s[~s.str.lower().isin(["", "nan", "none", "null"])]
-    s = s.str.extract(r"([A-Za-z]?\d{3,})", expand=False).dropna().drop_duplicates().str.upper()
-    return s.tolist()
+    # mantido por compatibilidade: aceita também .csv/.txt/.parquet (ver codigos.py)
+    return carregar_codigos(path)
 
 
 # ===================== Selenium driver =====================
@@ -159,11 +200,22 @@ def create_driver(chromedriver: Path, profile_dir: Path, headless: bool):
     return drv
 
 
-def safe_create_driver(cfg: ExporterConfig, out_dir: Path):
+def safe_create_driver(cfg: ExporterConfig, out_dir: Path, nome: str | None = None):
     profile_root = out_dir / "chrome_profiles"
     profile_root.mkdir(parents=True, exist_ok=True)
-    profile_dir = profile_root / f"profile_{int(time.time()*1000)}"
-    profile_dir.mkdir(parents=True, exist_ok=True)
+    # cada worker precisa de um perfil próprio (o Chrome trava o user-data-dir)
+    if cfg.profile_reuse:
+        # perfil nomeado: reinícios e novas execuções reaproveitam cookies e sessão. O nome leva
+        # um id estável do host (nunca host-pid): o output_dir pode ser compartilhado entre máquinas
+        nome = f"{cfg.node_id or socket.gethostname()}_{nome or 'principal'}"
+        profile_dir = perfil_nomeado(profile_root, nome)
+        if aberto_pelo_chrome(profile_dir):
+            # outro processo deste host já usa o perfil: este fica com um próprio
+            profile_dir = perfil_nomeado(profile_root, f"{nome}_{os.getpid()}")
+    else:
+        sufixo = f"_{nome}" if nome else ""
+        profile_dir = profile_root / f"profile_{int(time.time()*1000)}{sufixo}"
+        profile_dir.mkdir(parents=True, exist_ok=True)
 
     last = None
     for i in range(cfg.retry_create_driver + 1):
@@ -178,101 +230,119 @@ def safe_create_driver(cfg: ExporterConfig, out_dir: Path):
 def robust_get(drv, url, retries=5, base_sleep=0.7):
     for attempt in range(1, retries + 1):
         try:
-            drv.get(url)
+            with cronometro("page_load"):
+                drv.get(url)
             return True
         except Exception:
+            contar("retries_total", stage="page_load")
             try:
                 drv.get("about:blank")
             except Exception:
                 pass
             time.sleep(base_sleep * attempt)
+    contar("timeouts_total", stage="page_load")
     return False
 
 
-def wait_document_ready(drv, to=22):
-    end = time.time() + to
-    while time.time() < end:
+def wait_document_ready(drv, to=22, eventos=True):
+    with cronometro("document_ready"):
         try:
-            if drv.execute_script("return document.readyState") == "complete":
+            # o drv.get já espera o load: quase sempre resolve nesta primeira chamada
+            if drv.execute_script(
+                "return document.readyState === 'complete' && (!document.fonts || document.fonts.status === 'loaded');"
+            ):
                 return True
         except Exception:
             pass
-        time.sleep(0.22)
+        # a aba de impressão roda com scripts desativados (sem observers/timers): lá só resta o polling
+        if eventos and esperar_documento(drv, to):
+            return True
+        if not eventos:
+            end = time.time() + to
+            while time.time() < end:
+                try:
+                    if drv.execute_script("return document.readyState") == "complete":
+                        return True
+                except Exception:
+                    pass
+                time.sleep(0.22)
+    contar("timeouts_total", stage="document_ready")
     return False
 
 
 # ===================== Zendesk flows =====================
+def sessao_ativa(drv, subdomain: str, email: str) -> bool:
+    # perfil reaproveitado: a sessão ainda vale e é do mesmo usuário configurado?
+    try:
+        if not robust_get(drv, api_url(subdomain, "users/me.json"), retries=1):
+            return False
+        texto = drv.execute_script("return document.body ? document.body.innerText : '';") or ""
+        user = json.loads(texto).get("user") or {}
+    except Exception:
+        return False
+    return bool(user.get("id")) and (user.get("email") or "").lower() == email.strip().lower()
+
+
+def entrar(drv, cfg: ExporterConfig, email: str, senha: str):
+    if cfg.profile_reuse and sessao_ativa(drv, cfg.subdomain, email):
+        logger.info("Sessão do perfil ainda válida; login dispensado")
+        return
+    fazer_login(drv, cfg.subdomain, email, senha)
+
+
 def fazer_login(drv, subdomain: str, email: str, senha: str):
-    url_login = f"https://{subdomain}.zendesk.com/auth/v2/login/signin"
-    robust_get(drv, url_login)
-    time.sleep(1.0)
+    robust_get(drv, login_url(subdomain))
 
     email_sel = ["input[name='email']", "#user_email", "input[type='email']"]
     pass_sel = ["input[name='password']", "#user_password", "input[type='password']"]
     btn_sel = ["button[type='submit']", "button[name='commit']", "button[data-testid='sign-in-submit']"]
 
-    email_box = None
-    for sel in email_sel:
-        try:
-            email_box = WebDriverWait(drv, 8).until(EC.visibility_of_element_located((By.CSS_SELECTOR, sel)))
-            break
-        except Exception:
-            pass
+    email_box = esperar_elemento(drv, email_sel, 8)
     if not email_box:
         raise RuntimeError("Campo de e-mail não encontrado (SSO/MFA pode exigir ajuste).")
 
     email_box.clear()
     email_box.send_keys(email)
 
-    pass_box = None
-    for sel in pass_sel:
-        try:
-            pass_box = WebDriverWait(drv, 8).until(EC.visibility_of_element_located((By.CSS_SELECTOR, sel)))
-            break
-        except Exception:
-            pass
+    pass_box = esperar_elemento(drv, pass_sel, 8)
     if not pass_box:
         raise RuntimeError("Campo de senha não encontrado (SSO/MFA pode exigir ajuste).")
 
     pass_box.clear()
     pass_box.send_keys(senha)
 
-    btn = None
-    for sel in btn_sel:
-        try:
-            btn = WebDriverWait(drv, 8).until(EC.element_to_be_clickable((By.CSS_SELECTOR, sel)))
-            break
-        except Exception:
-            pass
+    btn = esperar_elemento(drv, btn_sel, 8, clicavel=True)
     if not btn:
         raise RuntimeError("Botão de login não encontrado.")
 
     btn.click()
-    time.sleep(2.0)
+    # volta assim que o redirect sai da tela de login e a página seguinte carrega
+    if not esperar(drv, "return !location.pathname.startsWith('/auth/') && document.readyState === 'complete';", 15):
+        logger.warning("Login: ainda na tela de login após 15 s (credenciais, SSO ou MFA?)")
+
+
+SEARCH_BOX = "input[data-test-id='customer-lists-search-box']"
 
 
 def abrir_people(drv):
-    WebDriverWait(drv, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "nav")))
+    if not esperar_elemento(drv, ["nav"], 20):
+        raise RuntimeError("Menu de navegação do Zendesk não carregou.")
 
     def loaded(timeout=6):
-        try:
-            WebDriverWait(drv, timeout).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input[data-test-id='customer-lists-search-box']"))
-            )
+        if esperar_elemento(drv, [SEARCH_BOX], timeout):
+            # a busca apareceu; espera a SPA terminar de montar a tela
+            esperar_quieto(drv, 250, 2)
             return True
-        except Exception:
-            return False
+        return False
 
     # tentativa rápida
     try:
-        btn_pos = WebDriverWait(drv, 5).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, "nav ul:nth-of-type(1) li:nth-of-type(3) button"))
-        )
-        drv.execute_script("arguments[0].scrollIntoView({block:'center'});", btn_pos)
-        btn_pos.click()
-        if loaded():
-            time.sleep(0.8)
-            return
+        btn_pos = esperar_elemento(drv, ["nav ul:nth-of-type(1) li:nth-of-type(3) button"], 5, clicavel=True)
+        if btn_pos:
+            drv.execute_script("arguments[0].scrollIntoView({block:'center'});", btn_pos)
+            btn_pos.click()
+            if loaded():
+                return
     except Exception:
         pass
 
@@ -280,10 +350,8 @@ def abrir_people(drv):
     for b in drv.find_elements(By.CSS_SELECTOR, "nav button, nav a[role='button'], nav a"):
         try:
             drv.execute_script("arguments[0].scrollIntoView({block:'center'});", b)
-            time.sleep(0.1)
             b.click()
             if loaded():
-                time.sleep(0.8)
                 return
         except Exception:
             continue
@@ -292,23 +360,17 @@ def abrir_people(drv):
 
 
 def find_search_input(drv):
-    candidates = [
-        (By.CSS_SELECTOR, "input[data-test-id='customer-lists-search-box']"),
-        (By.XPATH, "//input[@type='text' and (contains(@placeholder,'Pesquisar') or contains(@placeholder,'Search'))]")
-    ]
-    for how, sel in candidates:
-        try:
-            return WebDriverWait(drv, 8).until(EC.element_to_be_clickable((how, sel)))
-        except Exception:
-            pass
-    return None
+    return esperar_elemento(drv, [
+        SEARCH_BOX,
+        "input[type='text'][placeholder*='Pesquisar']",
+        "input[type='text'][placeholder*='Search']",
+    ], 8, clicavel=True)
 
 
 def clear_input_hard(drv, el):
     try:
         el.click()
         ActionChains(drv).key_down(Keys.CONTROL).send_keys("a").key_up(Keys.CONTROL).send_keys(Keys.BACK_SPACE).perform()
-        time.sleep(0.12)
     except Exception:
         pass
     try:
@@ -322,228 +384,303 @@ def clear_input_hard(drv, el):
         pass
 
 
+# resultado da busca: linhas novas na tabela ou o aviso de lista vazia
+_JS_RESULTADO_BUSCA = """
+    const linha = Array.from(document.querySelectorAll('table tbody tr')).find(vis);
+    if (linha && (linha.innerText || '').slice(0, 80) !== args[0]) return 'linhas';
+    const texto = document.body ? document.body.innerText : '';
+    if (/Nenhum|No results|sem resultados/.test(texto)) return 'vazio';
+    return null;
+"""
+
+
 def buscar_cliente(drv, termo: str) -> bool:
     campo = find_search_input(drv)
     if not campo:
         raise RuntimeError("Campo 'Pesquisar clientes' não encontrado.")
+    # linhas de uma busca anterior não contam como resultado desta
+    antes = drv.execute_script("""
+        const r = document.querySelector('table tbody tr');
+        return r ? (r.innerText || '').slice(0, 80) : '';
+    """) or ""
     clear_input_hard(drv, campo)
     campo.send_keys(termo)
     campo.send_keys(Keys.ENTER)
 
-    end = time.time() + 10
-    while time.time() < end:
-        rows = drv.find_elements(By.XPATH, "//table//tbody//tr")
-        if rows:
-            return True
-        vacios = drv.find_elements(By.XPATH, "//*[contains(.,'Nenhum') or contains(.,'No results') or contains(.,'sem resultados')]")
-        if any(v.is_displayed() for v in vacios):
-            return False
-        time.sleep(0.2)
-    return True
+    return esperar(drv, _JS_RESULTADO_BUSCA, 10, antes) != "vazio"
 
 
 def abrir_primeiro_cliente(drv) -> bool:
+    link = esperar_elemento(drv, [
+        "td[data-test-id='customer-row-cell-name'] a[href*='/users/']",
+        "table tbody a[href*='/agent/users/']",
+        "a[href*='/agent/users/']",
+    ], 15)
+    if not link:
+        return False
     try:
-        WebDriverWait(drv, 15).until(EC.presence_of_element_located((By.XPATH, "//table//tbody")))
-    except TimeoutException:
+        drv.execute_script("arguments[0].click();", link)
+    except Exception:
         return False
-
-    selectors = [
-        (By.CSS_SELECTOR, "td[data-test-id='customer-row-cell-name'] a[href*='/users/']"),
-        (By.XPATH, "//a[contains(@href,'/agent/users/')]")
-    ]
-    for how, sel in selectors:
-        try:
-            link = WebDriverWait(drv, 6).until(EC.element_to_be_clickable((how, sel)))
-            drv.execute_script("arguments[0].click();", link)
-            WebDriverWait(drv, 10).until(EC.url_contains("/agent/users/"))
-            return True
-        except Exception:
-            pass
-    return False
+    return esperar_url(drv, "/agent/users/", 10)
 
 
 def abrir_aba_tickets(drv):
-    candidates = [
-        (By.XPATH, "//a[contains(.,'Tickets')]"),
-        (By.XPATH, "//button[contains(.,'Tickets')]"),
-        (By.XPATH, "//a[contains(.,'Solicitações') or contains(.,'Requests')]"),
-        (By.XPATH, "//button[contains(.,'Solicitações') or contains(.,'Requests')]")
-    ]
-    for how, sel in candidates:
-        try:
-            el = WebDriverWait(drv, 6).until(EC.element_to_be_clickable((how, sel)))
-            drv.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
-            el.click()
-            time.sleep(0.6)
-            return
-        except Exception:
-            continue
-
-
-# ===================== Ticket collection =====================
-def get_rows_xpath():
-    return "//table//tbody//tr"
-
-
-def coletar_tickets_visiveis(drv, ids: set[int]):
-    rows = drv.find_elements(By.XPATH, get_rows_xpath())
-    for r in rows:
-        try:
-            if not r.is_displayed():
-                continue
-            tid = None
-            links = r.find_elements(By.XPATH, ".//a[contains(@href,'/tickets/')]")
-            for a in links:
-                href = a.get_attribute("href") or ""
-                m = re.search(r"/tickets/(\d+)", href)
-                if m:
-                    tid = int(m.group(1))
-                    break
-            if tid is not None:
-                ids.add(tid)
-        except Exception:
-            pass
+    aba = esperar_por_texto(drv, "a, button", [["Tickets"], ["Solicitações", "Requests"]], 6)
+    if not aba:
+        return
+    try:
+        drv.execute_script("arguments[0].scrollIntoView({block:'center'});", aba)
+        aba.click()
+    except Exception:
+        return
+    # tabela com links de tickets, ou a tela assentou sem nenhum (assessor sem tickets)
+    esperar(drv, "return document.querySelector(\"table tbody tr a[href*='/tickets/']\");", 6, quieto_ms=500)
 
 
-def get_pagination_ul(drv):
-    uls = drv.find_elements(By.XPATH, "//table//tfoot//ul | //tfoot//ul[descendant::li]")
-    for ul in uls:
-        try:
-            if ul.is_displayed():
-                return ul
-        except Exception:
-            pass
-    return None
+# caminho do perfil atual; o usuário pode ter sido removido/mesclado desde que entrou no cache
+_JS_TICKETS_DO_USUARIO = r"""
+const p = location.pathname;
+if (p !== args[0] && !p.startsWith(args[0] + '/')) return 'fora';
+if (document.querySelector("table tbody tr a[href*='/tickets/']")) return 'tabela';
+// só o título e elementos de erro/alerta: assuntos de ticket nunca contam
+const NAO_ACHOU = /\b404\b|not found|no longer exists|não encontrad|não existe/i;
+if (NAO_ACHOU.test(document.title)) return 'erro';
+for (const el of document.querySelectorAll("[role='alert'], [data-test-id*='not-found'], [data-test-id*='error']"))
+  if (vis(el) && NAO_ACHOU.test(el.innerText || '')) return 'erro';
+return null;
+"""
 
 
-def paginator_controls(ul):
-    items = ul.find_elements(By.XPATH, "./li")
-    nums = []
-    first = prev = nextb = last = None
+def user_id_da_url(url: str) -> int | None:
+    m = re.search(r"/agent/users/(\d+)", url or "")
+    return int(m.group(1)) if m else None
 
-    for li in items:
-        if not li.is_displayed():
-            continue
-        txt = (li.text or "").strip()
-        cls = li.get_attribute("class") or ""
-        try:
-            el = li.find_element(By.XPATH, ".//a|.//button")
-        except Exception:
-            el = li
-
-        if txt in ("«", "<<"):
-            first = el
-        elif txt in ("‹", "<"):
-            prev = el
-        elif txt in ("›", ">"):
-            nextb = el
-        elif txt in ("»", ">>"):
-            last = el
-        elif re.fullmatch(r"\d+", txt):
-            n = int(txt)
-            is_act = "active" in cls or "current" in cls or ((li.get_attribute("aria-current") or "") == "page")
-            nums.append((n, el, is_act))
-
-    current = None
-    for n, _, act in nums:
-        if act:
-            current = n
-            break
 
-    return {"first": first, "prev": prev, "next": nextb, "last": last, "nums": nums, "current": current}
+def abrir_tickets_do_usuario(drv, subdomain: str, user_id: int) -> bool:
+    # vai direto para a aba de tickets do perfil; False se a página não confirmar o usuário
+    if not robust_get(drv, user_tickets_url(subdomain, user_id), retries=2):
+        return False
+    r = esperar(drv, _JS_TICKETS_DO_USUARIO, 10, f"/agent/users/{user_id}", quieto_ms=800)
+    if r in ("fora", "erro"):
+        return False
+    if r != "tabela":
+        # perfil abriu sem a lista (outra aba por padrão ou assessor sem tickets)
+        abrir_aba_tickets(drv)
+    return user_id_da_url(drv.current_url) == user_id
 
 
-def click_and_wait(drv, el, timeout=15):
-    before = ""
+# ===================== Ticket collection =====================
+# Uma ida ao chromedriver por página: o script devolve, de uma vez, os ids das
+# linhas visíveis, o texto da primeira linha (para detectar a troca de página)
+# e o estado do paginador do tfoot.
+_JS_PAGINADOR = r"""
+const vis = e => !!(e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length));
+const CONTROLES = {'«': 'first', '<<': 'first', '‹': 'prev', '<': 'prev',
+                   '›': 'next', '>': 'next', '»': 'last', '>>': 'last'};
+function paginador() {
+  for (const ul of document.querySelectorAll('tfoot ul')) {
+    if (vis(ul) && ul.querySelector(':scope > li')) return ul;
+  }
+  return null;
+}
+function itens(ul) {
+  const out = [];
+  for (const li of ul.querySelectorAll(':scope > li')) {
+    if (!vis(li)) continue;
+    const el = li.querySelector('a,button') || li;
+    const txt = (li.innerText || '').trim();
+    const cls = (li.getAttribute('class') || '') + ' ' + (el.getAttribute('class') || '');
+    const aria = a => li.getAttribute(a) || el.getAttribute(a) || '';
+    out.push({
+      el: el, txt: txt, controle: CONTROLES[txt] || null,
+      numero: /^\d+$/.test(txt) ? parseInt(txt, 10) : null,
+      ativo: /active|current|selected/.test(cls) || aria('aria-current') === 'page',
+      desabilitado: /disabled/.test(cls) || aria('aria-disabled') === 'true' || el.disabled === true,
+    });
+  }
+  return out;
+}
+function estado() {
+const ids = [];
+let primeira = '';
+for (const r of document.querySelectorAll('table tbody tr')) {
+  if (!vis(r)) continue;
+  if (!primeira) primeira = (r.innerText || '').slice(0, 80);
+  for (const a of r.querySelectorAll("a[href*='/tickets/']")) {
+    const m = (a.getAttribute('href') || '').match(/\/tickets\/(\d+)/);
+    if (m) { ids.push(parseInt(m[1], 10)); break; }
+  }
+}
+const ul = paginador();
+let pag = null;
+if (ul) {
+  pag = {nums: [], atual: null, first: false, prev: false, next: false, last: false};
+  for (const it of itens(ul)) {
+    if (it.controle) pag[it.controle] = !it.desabilitado;
+    else if (it.numero !== null) {
+      pag.nums.push(it.numero);
+      if (it.ativo) pag.atual = it.numero;
+    }
+  }
+}
+return {ids: ids, primeira: primeira, paginador: pag};
+}
+"""
+
+JS_ESTADO_PAGINA = _JS_PAGINADOR + "return estado();"
+# condição para waits.esperar: a primeira linha mudou (args[0] = texto anterior)
+JS_PAGINA_TROCOU = _JS_PAGINADOR + "const e = estado(); return e.primeira && e.primeira !== args[0] ? e : null;"
+
+JS_CLICAR_PAGINADOR = _JS_PAGINADOR + r"""
+const alvo = arguments[0];
+const ul = paginador();
+if (!ul) return false;
+for (const it of itens(ul)) {
+  if (it.desabilitado) continue;
+  if (it.controle === alvo || (it.numero !== null && it.numero === alvo)) {
+    it.el.scrollIntoView({block: 'center'});
+    it.el.click();
+    return true;
+  }
+}
+return false;
+"""
+
+
+def estado_pagina(drv) -> dict:
     try:
-        row = drv.find_element(By.XPATH, get_rows_xpath())
-        before = (row.text or "")[:80]
+        return drv.execute_script(JS_ESTADO_PAGINA) or {}
     except Exception:
-        pass
+        return {}
+
+
+def ir_para(drv, alvo: int | str, antes: str, timeout=15, quieto_ms: int = 0) -> dict | None:
+    """Clica no número ou controle (`first`/`prev`/`next`/`last`) e espera a tabela trocar.
 
+    Com `quieto_ms`, desiste quando o DOM passa esse tempo parado sem a troca
+    (clique sem efeito: "próxima" na última página de um paginador que não a desabilita).
+    """
     try:
-        drv.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
-        time.sleep(0.05)
-        drv.execute_script("arguments[0].click();", el)
+        if not drv.execute_script(JS_CLICAR_PAGINADOR, alvo):
+            return None
     except Exception:
-        return False
+        return None
 
-    end = time.time() + timeout
-    while time.time() < end:
-        after = ""
-        try:
-            row = drv.find_element(By.XPATH, get_rows_xpath())
-            after = (row.text or "")[:80]
-        except Exception:
-            pass
-        if after and after != before:
-            return True
-        time.sleep(0.2)
-    return False
+    r = esperar(drv, JS_PAGINA_TROCOU, timeout, antes, quieto_ms=quieto_ms)
+    return None if not r or r.get("quieto") else r
 
 
-def goto_first_and_get_total_pages(drv):
-    ul = get_pagination_ul(drv)
-    if not ul:
-        return 1
+def ir_para_pagina(drv, estado: dict, n: int, max_passos: int = 50) -> dict:
+    # salta direto quando o número está visível; senão anda pelos controles até ele
+    for _ in range(max_passos):
+        pag = estado.get("paginador")
+        if not pag or pag.get("atual") in (None, n):
+            break
+        if n in pag["nums"]:
+            alvo = n
+        elif n < pag["atual"]:
+            alvo = "first" if n == 1 and pag.get("first") else "prev"
+        else:
+            alvo = "next"
+        novo = ir_para(drv, alvo, estado.get("primeira", ""))
+        if novo is None:
+            break
+        estado = novo
+    return estado
 
-    ctl = paginator_controls(ul)
-    if ctl["last"]:
-        click_and_wait(drv, ctl["last"])
-        time.sleep(0.2)
-        ul = get_pagination_ul(drv)
-        ctl = paginator_controls(ul)
 
-    total = max([n for (n, _, _) in ctl["nums"]], default=1)
+def proxima_pagina(pag: dict | None) -> int | str | None:
+    if not pag:
+        return None
+    atual, nums = pag.get("atual"), pag.get("nums") or []
+    if atual is not None and atual + 1 in nums:
+        return atual + 1
+    # fim da janela numerada não é fim da lista (paginador em blocos): só para
+    # quando "próxima" some ou fica desabilitada; UI que não desabilita para
+    # quando o clique não troca a página (ver coletar_ids_tickets)
+    return "next" if pag.get("next") else None
 
-    if ctl["first"]:
-        click_and_wait(drv, ctl["first"])
-    else:
-        for n, el, _ in ctl["nums"]:
-            if n == 1:
-                click_and_wait(drv, el)
-                break
 
-    return max(total, 1)
+# DOM parado por esse tempo depois de clicar em "próxima" = página não vai trocar
+PROXIMA_SEM_EFEITO_MS = 2500
 
 
 def coletar_ids_tickets(drv, limite: int | None, max_pages: int):
     ids = set()
-    total_pages = goto_first_and_get_total_pages(drv)
+    estado = ir_para_pagina(drv, estado_pagina(drv), 1)
 
     page = 1
-    while page <= total_pages and page <= max_pages:
-        if limite and len(ids) >= limite:
+    while True:
+        ids.update(estado.get("ids") or [])
+        if (limite and len(ids) >= limite) or page >= max_pages:
             break
 
-        coletar_tickets_visiveis(drv, ids)
-
-        if page == total_pages:
+        alvo = proxima_pagina(estado.get("paginador"))
+        if alvo is None:
             break
-
-        ul = get_pagination_ul(drv)
-        if not ul:
+        # "próxima" pode não ter efeito na última página: espera curta pelo DOM parado
+        novo = ir_para(drv, alvo, estado.get("primeira", ""),
+                       quieto_ms=PROXIMA_SEM_EFEITO_MS if alvo == "next" else 0)
+        if novo is None:
             break
-        ctl = paginator_controls(ul)
-        nxt = ctl.get("next")
-        if not nxt:
+        mesma = (novo.get("paginador") or {}).get("atual") == (estado.get("paginador") or {}).get("atual")
+        if mesma and not set(novo.get("ids") or []) - ids:
+            # a tabela redesenhou as mesmas linhas: não há página adiante
             break
-
-        click_and_wait(drv, nxt)
+        estado = novo
         page += 1
 
     out = sorted(ids)
     return out[:limite] if limite else out
 
 
-# ===================== PDF export =====================
-def ticket_print_url(subdomain: str, ticket_id: int) -> str:
-    return f"https://{subdomain}.zendesk.com/tickets/{ticket_id}/print"
+def descobrir_tickets_ui(drv, cod: str, limite: int | None, max_pages: int,
+                         subdomain: str | None = None, cache: UserIdCache | None = None) -> list[int] | None:
+    # caminho Selenium: People -> busca -> perfil -> aba Tickets -> paginação
+    sair_da_aba_de_impressao(drv)
+    user_id = cache.obter(cod) if cache is not None and subdomain else None
+    if user_id is not None:
+        # id conhecido: pula a busca em People e abre direto os tickets do perfil
+        with cronometro("ui_user_direct"):
+            ok = abrir_tickets_do_usuario(drv, subdomain, user_id)
+        if ok:
+            with cronometro("ui_pagination"):
+                return coletar_ids_tickets(drv, limite=limite, max_pages=max_pages)
+        logger.info("Usuário %s em cache para %s não confirmou; refazendo a busca", user_id, cod)
+        cache.invalidar(cod)
+        sair_da_aba_de_impressao(drv)
+
+    with cronometro("ui_people"):
+        abrir_people(drv)
+    with cronometro("ui_search"):
+        if not buscar_cliente(drv, cod):
+            return None
+
+    with cronometro("ui_open_profile"):
+        if not abrir_primeiro_cliente(drv):
+            raise RuntimeError("Não abriu perfil")
+    if cache is not None:
+        user_id = user_id_da_url(drv.current_url)
+        if user_id is not None:
+            cache.gravar(cod, user_id, "ui")
+
+    with cronometro("ui_tickets_tab"):
+        abrir_aba_tickets(drv)
+    with cronometro("ui_pagination"):
+        return coletar_ids_tickets(drv, limite=limite, max_pages=max_pages)
 
 
-def ticket_view_url(subdomain: str, ticket_id: int) -> str:
-    return f"https://{subdomain}.zendesk.com/agent/tickets/{ticket_id}"
+# ===================== PDF export =====================
+# parâmetros de impressão compartilhados pelos engines (Selenium e CDP direto)
+PRINT_TO_PDF_PARAMS = {
+    "printBackground": True,
+    "landscape": False,
+    "paperWidth": 8.27,
+    "paperHeight": 11.69,
+    "preferCSSPageSize": True,
+    "scale": 1.0
+}
 
 
 def fechar_abas_extras(drv, manter=1):
@@ -559,173 +696,733 @@ def fechar_abas_extras(drv, manter=1):
         pass
 
 
-def salvar_ticket_pdf(drv, subdomain: str, ticket_id: int, pasta: Path, after_print: tuple[float, float]):
-    pasta.mkdir(parents=True, exist_ok=True)
-    out = pasta / f"ticket_{ticket_id}.pdf"
-    if out.exists() and out.stat().st_size > 1024 and pdf_valido(out):
-        return out
+def pdf_ja_salvo(out: Path, ticket_id: int, manifest: Manifest | None = None, archive=None) -> bool:
+    if archive is not None:
+        return archive.tem(out)
+    if manifest is not None and manifest.tem(ticket_id, out):
+        return True
+    if manifest is not None and manifest.a_reimprimir(ticket_id):
+        # versão antiga continua no lugar até a nova ser gravada (ver gravar_pdf)
+        return False
+    if out.exists() and pdf_valido(out):
+        if manifest is not None:
+            manifest.registrar_existente(ticket_id, out)
+        return True
+    return False
 
-    fechar_abas_extras(drv, manter=1)
 
-    old = drv.window_handles[:]
-    drv.execute_script("window.open('about:blank','_blank');")
-    time.sleep(0.4)
-    for h in drv.window_handles:
-        if h not in old:
-            drv.switch_to.window(h)
-            break
+class PrintTab:
+    """Aba de impressão dedicada, reaproveitada por todos os tickets da sessão.
 
-    try:
-        drv.execute_cdp_cmd("Emulation.setScriptExecutionDisabled", {"value": True})
-    except Exception:
-        pass
+    Criada uma vez com scripts desativados e mídia `print` emulada; cada ticket
+    só navega essa aba. É recriada apenas quando some ou deixa de responder.
+    """
 
-    if not robust_get(drv, ticket_print_url(subdomain, ticket_id), retries=2):
-        robust_get(drv, ticket_view_url(subdomain, ticket_id), retries=3)
-        robust_get(drv, ticket_print_url(subdomain, ticket_id), retries=3)
+    def __init__(self, drv):
+        self.drv = drv
+        self.handle = None
+        self.principal = None
+        self.ativa = False
+        # já navegou para o Zendesk: dá para injetar HTML pré-baixado na mesma origem
+        self.na_origem = False
+        self.frame_id = None
 
-    wait_document_ready(drv, to=22)
-    time.sleep(0.2)
+    def _criar(self):
+        drv = self.drv
+        fechar_abas_extras(drv, manter=1)
+        self.principal = drv.current_window_handle
+        drv.switch_to.new_window("tab")
+        self.handle = drv.current_window_handle
+        self.ativa = True
 
+        try:
+            drv.execute_cdp_cmd("Emulation.setScriptExecutionDisabled", {"value": True})
+        except Exception:
+            pass
+        try:
+            drv.execute_cdp_cmd("Emulation.setEmulatedMedia", {"media": "print"})
+        except Exception:
+            pass
+
+    def entrar(self):
+        if self.handle is None:
+            self._criar()
+        elif not self.ativa:
+            self.drv.switch_to.window(self.handle)
+            self.ativa = True
+
+    def carregar_html(self, html: str):
+        # substitui o documento da aba sem passar pela navegação do Chrome
+        if self.frame_id is None:
+            tree = self.drv.execute_cdp_cmd("Page.getFrameTree", {})
+            self.frame_id = tree["frameTree"]["frame"]["id"]
+        self.drv.execute_cdp_cmd("Page.setDocumentContent", {"frameId": self.frame_id, "html": html})
+
+    def sair(self):
+        # volta para a aba principal (People/perfil) antes da descoberta
+        if self.ativa and self.principal:
+            try:
+                self.drv.switch_to.window(self.principal)
+            except Exception:
+                pass
+        self.ativa = False
+
+    def descartar(self):
+        try:
+            if self.handle in self.drv.window_handles:
+                self.drv.switch_to.window(self.handle)
+                self.drv.close()
+        except Exception:
+            pass
+        self.handle = None
+        self.ativa = False
+        self.na_origem = False
+        self.frame_id = None
+        try:
+            self.drv.switch_to.window(self.drv.window_handles[0])
+        except Exception:
+            pass
+
+
+def checar_rate_limit(drv):
     try:
-        drv.execute_cdp_cmd("Emulation.setEmulatedMedia", {"media": "print"})
+        titulo = drv.title or ""
     except Exception:
-        pass
+        return
+    if "429" in titulo or "Too Many Requests" in titulo:
+        raise ZendeskRateLimited(f"Zendesk limitou a taxa: {titulo[:100]}")
+
+
+def print_tab(drv) -> PrintTab:
+    # uma aba por driver; um driver recriado ganha uma aba nova
+    tab = getattr(drv, "_print_tab", None)
+    if tab is None:
+        tab = PrintTab(drv)
+        drv._print_tab = tab
+    return tab
+
 
-    pdf = drv.execute_cdp_cmd("Page.printToPDF", {
-        "printBackground": True,
-        "landscape": False,
-        "paperWidth": 8.27,
-        "paperHeight": 11.69,
-        "preferCSSPageSize": True,
-        "scale": 1.0
-    })
-    out.write_bytes(base64.b64decode(pdf["data"]))
+def sair_da_aba_de_impressao(drv):
+    tab = getattr(drv, "_print_tab", None)
+    if tab is not None:
+        tab.sair()
 
+
+def salvar_ticket_pdf(drv, subdomain: str, ticket_id: int, pasta: Path, after_print: tuple[float, float],
+                      manifest: Manifest | None = None, prefetcher=None, store=None, archive=None, sync=None):
+    out = pasta / f"ticket_{ticket_id}.pdf"
     try:
-        drv.close()
-        drv.switch_to.window(old[0])
-    except Exception:
-        pass
+        if pdf_ja_salvo(out, ticket_id, manifest, archive):
+            return out
+        return _imprimir_ticket(drv, subdomain, ticket_id, out, pasta, after_print, manifest, prefetcher, store,
+                                archive, sync)
+    finally:
+        if prefetcher is not None:
+            # obter() já liberou a vaga quando o HTML foi usado; nos demais caminhos, libera aqui
+            prefetcher.descartar(ticket_id)
+
 
-    time.sleep(random.uniform(*after_print))
-    if not pdf_valido(out):
+def _imprimir_ticket(drv, subdomain: str, ticket_id: int, out: Path, pasta: Path, after_print: tuple[float, float],
+                     manifest, prefetcher, store, archive, sync) -> Path:
+    if archive is None:
+        pasta.mkdir(parents=True, exist_ok=True)
+
+    tab = print_tab(drv)
+    for tentativa in (1, 2):
+        try:
+            tab.entrar()
+
+            html = None
+            if prefetcher is not None and tab.na_origem and tentativa == 1:
+                html = prefetcher.obter(ticket_id)
+            if html is not None:
+                with cronometro("prefetch_inject"):
+                    tab.carregar_html(html)
+            else:
+                if not robust_get(drv, ticket_print_url(subdomain, ticket_id), retries=2):
+                    robust_get(drv, ticket_view_url(subdomain, ticket_id), retries=3)
+                    robust_get(drv, ticket_print_url(subdomain, ticket_id), retries=3)
+                tab.na_origem = True
+
+            wait_document_ready(drv, to=22, eventos=False)
+            checar_rate_limit(drv)
+
+            with cronometro("print_to_pdf"):
+                pdf = drv.execute_cdp_cmd("Page.printToPDF", PRINT_TO_PDF_PARAMS)
+            break
+        except InvalidSessionIdException:
+            raise
+        except WebDriverException:
+            # aba fechada/travada: recria uma única vez
+            if tentativa == 2:
+                raise
+            contar("retries_total", stage="print_tab")
+            tab.descartar()
+
+    with cronometro("b64decode"):
+        data = base64.b64decode(pdf["data"])
+
+    with cronometro("sleep_after_print"):
+        time.sleep(random.uniform(*after_print))
+    return gravar_pdf(out, ticket_id, data, manifest, store, archive, sync)
+
+
+def gravar_pdf(out: Path, ticket_id: int, data: bytes, manifest: Manifest | None = None, store=None,
+               archive=None, sync=None) -> Path:
+    # valida em memória: não grava nem relê PDFs quebrados
+    if not pdf_bytes_validos(data):
         raise RuntimeError(f"PDF inválido: {out}")
+    destino = "archive" if archive is not None else "store" if store is not None else "file"
+    with cronometro("write", destino=destino):
+        if archive is not None:
+            # o índice do arquivo faz o papel do manifest
+            archive.gravar(out, ticket_id, data)
+        elif store is not None:
+            blob, novo = store.guardar(data)
+            if not novo:
+                logger.debug("Ticket %s: reimpressão idêntica, reaproveitando %s", ticket_id, blob.name)
+            if sync is not None:
+                versionar_pdf(sync, ticket_id, out.parent)
+            store.vincular(blob, out)
+        else:
+            # sync: a versão anterior só vira .vN depois que a nova está inteira no disco
+            tmp = out.with_name(out.name + ".tmp")
+            tmp.write_bytes(data)
+            if sync is not None:
+                versionar_pdf(sync, ticket_id, out.parent)
+            os.replace(tmp, out)
+        if manifest is not None and archive is None:
+            manifest.registrar(ticket_id, out, data)
+    contar("bytes_written_total", len(data), destino=destino)
     return out
 
 
 # ===================== Checkpoint =====================
-def load_checkpoint(path: Path, reset: bool) -> dict:
-    if reset:
-        return {}
-    return load_json(path)
+SUCCESS_HEADER = ["assessor", "ticket_id", "arquivo", "bytes"]
+FAILED_HEADER = ["assessor", "ticket_id", "erro"]
+INVENTORY_HEADER = ["assessor", "ticket_id", "arquivo", "bytes", "status"]
+
+
+class ExportState:
+    """Checkpoint e inventário da execução, compartilhados entre os workers."""
+
+    def __init__(self, out_dir: Path, reset: bool, node_id: str | None = None,
+                 lease=None, lease_tickets: bool = False, inventory_format: str = "csv",
+                 inventory_batch_rows: int = 500, inventory_flush_s: float = 5.0, store=None, archive=None):
+        # no modo multi-host cada nó grava os próprios arquivos (sufixo = node_id)
+        sufixo = f"_{node_id}" if node_id else ""
+        self.out_dir = out_dir
+        self.checkpoint_path = out_dir / f"checkpoint{sufixo}.json"
+
+        # estado carregado uma única vez: snapshot + replay do journal
+        self.journal = CheckpointJournal(self.checkpoint_path, reset=reset)
+        # cópias: o journal só recebe um ticket depois que a linha dele foi gravada no inventário
+        # (a compactação em background grava o conjunto do journal, nunca este)
+        self.done_assessors = set(self.journal.done_assessors)
+        self.processed_tickets = set(self.journal.processed_tickets)
+
+        if node_id and not reset:
+            # tickets já exportados por qualquer nó contam como processados
+            for other in out_dir.glob("checkpoint*.json"):
+                if other != self.checkpoint_path:
+                    self.processed_tickets.update(read_checkpoint(other)[1])
+
+        self.archive = archive
+        if archive is not None:
+            # PDFs que não chegaram a um commit do arquivo: reimprime mesmo se o journal os registrou
+            self.processed_tickets.difference_update(archive.perdidos)
+            self.done_assessors.difference_update(archive.assessores_perdidos)
+            self.journal.esquecer(archive.perdidos, archive.assessores_perdidos)
+
+        self.lease = lease
+        self.lease_tickets = lease_tickets and lease is not None
+        self.sync = None
+        # controle de ritmo compartilhado por todos os workers do processo
+        self.throttle = FixedThrottle((0.0, 0.0), (0.0, 0.0))
+        self.prefetcher = None
+        self.store = store
+        # sync incremental: tickets reabertos nesta execução (os links dos outros assessores são refeitos)
+        self.reabertos: set[int] = set()
+
+        self.manifest = Manifest(out_dir, sufixo=sufixo)
+
+        self.lock = threading.RLock()
+        # tickets já no buffer do inventário, aguardando o flush para entrar no journal
+        self._a_registrar: list[int] = []
+        self.inventory = InventorySink(
+            out_dir, formato=inventory_format, sufixo=sufixo, batch_rows=inventory_batch_rows,
+            flush_interval_s=inventory_flush_s, on_flush=self._registrar_no_journal,
+        )
+
+    def _registrar_no_journal(self):
+        # chamado após cada flush: o checkpoint nunca fica à frente do inventário
+        with self.lock:
+            tids, self._a_registrar = self._a_registrar, []
+        self.journal.registrar_tickets(tids)
+
+    def ticket_pendente(self, tid: int) -> bool:
+        with self.lock:
+            return tid not in self.processed_tickets
+
+    def reabrir_ticket(self, tid: int, pasta: Path):
+        # o ticket mudou desde o último sync: volta a ser impresso mesmo já constando no checkpoint
+        with self.lock:
+            self.processed_tickets.discard(tid)
+            self.reabertos.add(tid)
+        self.manifest.invalidar(tid)
+        if self.archive is not None:
+            self.archive.invalidar(pasta / f"ticket_{tid}.pdf")
+
+    def reservar_ticket(self, tid: int) -> bool:
+        ok = self.ticket_pendente(tid)
+        if ok and self.lease_tickets:
+            ok = self.lease.reivindicar_chave("ticket", str(tid))
+        if not ok and self.prefetcher is not None:
+            # não vai imprimir: o download adiantado não pode segurar a janela do prefetch
+            self.prefetcher.descartar(tid)
+        return ok
+
+    def filtrar_pendentes(self, cod: str, pasta: Path, ids: list[int]) -> list[int]:
+        # com o store, tickets já exportados em outro assessor entram nesta pasta por link
+        pendentes = []
+        for tid in ids:
+            if self.ticket_pendente(tid):
+                pendentes.append(tid)
+            elif self.store is not None:
+                self._vincular_repetido(cod, tid, pasta)
+        return pendentes
+
+    def _vincular_repetido(self, cod: str, tid: int, pasta: Path):
+        out = pasta / f"ticket_{tid}.pdf"
+        with self.lock:
+            reaberto = tid in self.reabertos
+        if out.exists() and not reaberto:
+            return
+        entry = self.manifest.obter(tid)
+        if not entry or not entry.get("sha256"):
+            return
+        try:
+            blob = self.store.caminho(entry["sha256"])
+            if not blob.exists():
+                blob = self.store.importar(Path(entry["path"]), entry["sha256"])
+            self.store.vincular(blob, out)
+        except OSError as e:
+            logger.warning("Não consegui vincular o ticket %s em %s: %s", tid, pasta, e)
+            return
+        self.inventory.escrever("all_tickets", INVENTORY_HEADER, [cod, tid, str(out), entry.get("size"), "vinculado"])
+
+    def ticket_ok(self, cod: str, tid: int, p: Path):
+        size = self.archive.tamanho(p) if self.archive is not None else p.stat().st_size
+        with self.lock:
+            self.processed_tickets.add(tid)
+        # linha antes do journal (nunca segurando self.lock: o flush chama _registrar_no_journal)
+        self.inventory.escrever("success", SUCCESS_HEADER, [cod, tid, str(p), size])
+        self.inventory.escrever("all_tickets", INVENTORY_HEADER, [cod, tid, str(p), size, "baixado_agora"])
+        with self.lock:
+            self._a_registrar.append(tid)
+        contar("tickets_total", status="ok")
+        definir("last_ticket_timestamp_seconds", time.time())
+        if self.sync is not None:
+            self.sync.registrar_export(tid, str(p))
+        if self.lease_tickets:
+            self.lease.concluir("ticket", str(tid))
+
+    def ticket_falhou(self, cod: str, tid: int, erro: str, tipo: str = "erro"):
+        # tipo: rótulo curto para a métrica de falhas (classe da exceção, "sessao_perdida", ...)
+        self.inventory.escrever("failed", FAILED_HEADER, [cod, tid, erro[:1000]])
+        if self.prefetcher is not None and tid != -1:
+            self.prefetcher.descartar(tid)
+        contar("failures_total", kind=tipo, scope="assessor" if tid == -1 else "ticket")
+        if self.lease_tickets and tid != -1:
+            self.lease.liberar("ticket", str(tid))
+
+    def assessor_concluido(self, cod: str):
+        # fronteira de checkpoint: PDFs, inventário e tickets do assessor vão para o disco antes
+        if self.archive is not None:
+            self.archive.concluir_assessor(self.out_dir / f"assessor_{cod}")
+        self.inventory.flush()
+        self.journal.registrar_assessor(cod)
+        with self.lock:
+            self.done_assessors.add(cod)
+        contar("assessors_total")
+        if self.lease is not None:
+            self.lease.concluir("assessor", cod)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+        self.inventory.close()
+        self.journal.close()
+        self.manifest.close()
+
+
+def exportar_ticket(drv, cfg: ExporterConfig, state: ExportState, cod: str, tid: int, pasta: Path):
+    """Imprime um ticket e registra o sucesso; exceções sobem para quem chamou."""
+    throttle = state.throttle
+    with cronometro("throttle_wait"):
+        throttle.aguardar()
+    t0 = time.monotonic()
+    try:
+        p = salvar_ticket_pdf(
+            drv, cfg.subdomain, tid, pasta,
+            after_print=throttle.after_print,
+            manifest=state.manifest,
+            prefetcher=state.prefetcher,
+            store=state.store,
+            archive=state.archive,
+            sync=state.sync,
+        )
+    except InvalidSessionIdException:
+        raise
+    except Exception as e:
+        throttle.registrar(False, time.monotonic() - t0, throttled=isinstance(e, ZendeskRateLimited))
+        raise
+    throttle.registrar(True, time.monotonic() - t0)
+    METRICAS.observar("ticket_seconds", time.monotonic() - t0)
+    state.ticket_ok(cod, tid, p)
+    with cronometro("sleep_between_tickets"):
+        throttle.depois_do_ticket()
+    return p
+
+
+def exportar_lote_cdp(engine, cfg: ExporterConfig, state: ExportState, cod: str, pasta: Path, ids: list[int]):
+    # engine CDP: K abas do mesmo Chrome imprimindo em paralelo
+    pendentes = []
+    for tid in ids:
+        if not state.reservar_ticket(tid):
+            continue
+        out = pasta / f"ticket_{tid}.pdf"
+        if pdf_ja_salvo(out, tid, state.manifest, state.archive):
+            state.ticket_ok(cod, tid, out)
+            continue
+        pendentes.append(tid)
+    if not pendentes:
+        return
+
+    if state.archive is None:
+        pasta.mkdir(parents=True, exist_ok=True)
+
+    retry = criar_fila_retry(cfg)
+    tentativas = dict.fromkeys(pendentes, 1)
+
+    def falhou(tid: int, e: Exception):
+        if retry.pode_repetir(e, tentativas[tid]):
+            retry.agendar(tid, tentativas[tid], e)
+            tentativas[tid] += 1
+        else:
+            state.ticket_falhou(cod, tid, str(e), tipo=type(e).__name__)
 
+    def on_result(tid: int, res):
+        if isinstance(res, Exception):
+            falhou(tid, res)
+            return
+        try:
+            p = gravar_pdf(pasta / f"ticket_{tid}.pdf", tid, res, state.manifest, state.store, state.archive,
+                           state.sync)
+            state.ticket_ok(cod, tid, p)
+        except Exception as e:
+            falhou(tid, e)
 
-def save_checkpoint(path: Path, done_assessors: set, processed_tickets: set):
-    save_json(path, {
-        "done_assessors": sorted(done_assessors),
-        "processed_tickets": sorted(processed_tickets)
-    })
+    engine.imprimir_lote(pendentes, on_result)
+    while len(retry):
+        # nova rodada com os tickets cujo backoff venceu
+        retry.aguardar()
+        engine.imprimir_lote(retry.prontos(), on_result)
 
 
 # ===================== Orchestrator =====================
-def export_all(cfg: ExporterConfig, cfg_auth: dict):
+def export_all(cfg: ExporterConfig, cfg_auth: dict, somente_falhas: bool = False):
+    # somente_falhas (retry-failed): reexporta o que está no failed.* e ainda não entrou no checkpoint
     out_dir = cfg.output_dir
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    checkpoint_path = out_dir / "checkpoint.json"
-    successcsv = out_dir / "success.csv"
-    failcsv = out_dir / "failed.csv"
-    inventorycsv = out_dir / "all_tickets.csv"
-    summaryjson = out_dir / "summary.json"
+    summaryjson = out_dir / ("summary_retry.json" if somente_falhas else "summary.json")
+
+    # combinações incompatíveis: falha antes de abrir navegador, lease ou métricas
+    if cfg.pipeline and cfg.engine == "cdp":
+        raise ValueError("runtime.pipeline requer runtime.engine = 'selenium'.")
+    if cfg.workers > 1 and cfg.engine == "cdp":
+        # o pool imprime com navegadores próprios; o engine CDP seria ignorado
+        raise ValueError("runtime.workers > 1 requer runtime.engine = 'selenium'.")
+    if cfg.archive and cfg.store:
+        raise ValueError("archive.enabled e store.enabled não podem ser usados juntos.")
+
+    falhas = None
+    if somente_falhas:
+        if cfg.coordination == "lease":
+            raise ValueError("retry-failed não suporta coordination.mode = 'lease'.")
+        from .report import falhas_de_assessor, falhas_pendentes, marcar_resolvido
+        falhas = falhas_pendentes(out_dir)
+        falhas_assessor = falhas_de_assessor(out_dir)
+        if not falhas:
+            print("[OK] Nenhuma falha pendente.")
+            return
 
     email, pwd = get_env_or_prompt(cfg_auth.get("email", ""), cfg_auth.get("password", ""))
 
-    done_assessors = set(load_checkpoint(checkpoint_path, cfg.reset_checkpoint).get("done_assessors", []))
-    processed_tickets = set(load_checkpoint(checkpoint_path, cfg.reset_checkpoint).get("processed_tickets", []))
-
-    codigos = carregar_codigos_xlsx(cfg.excel_codigos)
+    codigos = carregar_codigos(cfg.excel_codigos)
     if not codigos:
         print("Nenhum código encontrado na planilha.")
         return
 
-    drv = safe_create_driver(cfg, out_dir)
-
-    expected_map: dict[str, set[int]] = {}
+    if cfg.sync_mode == "incremental" and cfg.discovery != "api":
+        raise ValueError("sync.mode = 'incremental' requer discovery.backend = 'api'.")
 
+    # tudo que é aberto daqui em diante fecha no finally, inclusive nas saídas antecipadas
+    lease = metricas = archive = state = usuarios = api = sync = pool = engine = drv = None
     try:
-        fazer_login(drv, cfg.subdomain, email, pwd)
+        node_id = None
+        if cfg.coordination == "lease":
+            from .lease import LeaseQueue
+            node_id = cfg.node_id or default_node_id()
+            lease = LeaseQueue(out_dir / "leases.sqlite", node_id, ttl_s=cfg.lease_ttl_s)
+            lease.semear("assessor", codigos)
+            lease.start_heartbeat()
+            summaryjson = out_dir / f"summary_{node_id}.json"
+
+        METRICAS.resetar({"node": node_id} if node_id else None)
+        if cfg.metrics:
+            sufixo = f"_{node_id}" if node_id else ""
+            metricas = MetricsWriter(
+                textfile=cfg.metrics_textfile or out_dir / f"metrics{sufixo}.prom",
+                json_path=out_dir / f"metrics{sufixo}.json",
+                intervalo_s=cfg.metrics_interval_s,
+            ).start()
+
+        if cfg.archive:
+            from .archive import ArchiveSink
+            archive = ArchiveSink(out_dir, formato=cfg.archive_format, escopo=cfg.archive_scope,
+                                  sufixo=f"_{node_id}" if node_id else "",
+                                  volume_bytes=cfg.archive_volume_mb * 1024 * 1024)
+
+        state = ExportState(out_dir, cfg.reset_checkpoint and not somente_falhas, node_id=node_id,
+                            lease=lease, lease_tickets=cfg.lease_tickets,
+                            inventory_format=cfg.inventory_format,
+                            inventory_batch_rows=cfg.inventory_batch_rows,
+                            inventory_flush_s=cfg.inventory_flush_s,
+                            store=PdfStore(out_dir, modo=cfg.store_link) if cfg.store else None,
+                            archive=archive)
+        state.throttle = criar_throttle(cfg)
+        fila_codigos = lease.iterar("assessor") if lease else list(falhas) if falhas else codigos
+
+        if cfg.user_cache or (cfg.sync_mode == "incremental" and falhas is None):
+            # o sync incremental guarda os usuários conhecidos no mesmo cache
+            usuarios = UserIdCache(out_dir / "user_ids.sqlite", ttl_s=cfg.user_cache_ttl_days * 86400)
+
+        if cfg.discovery == "api":
+            from .discovery import ApiDiscovery
+            api = ApiDiscovery(cfg.subdomain, email, pwd, api_token=cfg.api_token or os.getenv("ZENDESK_API_TOKEN"),
+                               include_ccd=cfg.include_ccd, on_throttled=state.throttle.registrar_429,
+                               cache=usuarios if cfg.user_cache else None)
+
+        plano = None
+        if cfg.sync_mode == "incremental":
+            from .sync import SyncStore, concluir_sync, planejar_incremental, semear_da_saida
+            sync = SyncStore(out_dir / "sync.sqlite")
+            state.sync = sync
+            if sync.vazio() and (state.manifest.entries or state.processed_tickets):
+                # saída gerada no modo full: o que já está em disco não é reimpresso
+                n = semear_da_saida(sync, out_dir, state.manifest, state.processed_tickets)
+                logger.info("sync.sqlite semeado com %d PDFs já exportados", n)
+            if falhas is None:
+                plano, novo_cursor = planejar_incremental(sync, api, codigos, cfg.max_tickets_per_assessor, usuarios)
+            if plano is not None and not any(plano.get(cod) for cod in codigos):
+                concluir_sync(sync, novo_cursor)
+                print("[OK] Nada novo desde o último sync.")
+                return
 
-        for cod in codigos:
-            if cod in done_assessors:
-                continue
+        despejar_perfis(out_dir / "chrome_profiles", max_idade_s=cfg.profile_max_age_days * 86400,
+                        max_bytes=cfg.profile_max_total_mb * 1024 * 1024)
+        drv = safe_create_driver(cfg, out_dir)
+
+        pipeline = cfg.pipeline
+        if cfg.workers > 1 or pipeline:
+            from .pool import PrintWorkerPool
+            pool = PrintWorkerPool(cfg, state, out_dir, email, pwd,
+                                   queue_size=cfg.pipeline_queue_size if pipeline else 0)
+
+        expected_map: dict[str, set[int]] = {}
+        watchdog = criar_watchdog(cfg)
+
+        entrar(drv, cfg, email, pwd)
+        if cfg.prefetch and cfg.engine != "cdp":
+            from .prefetch import PrintPrefetcher
+            state.prefetcher = PrintPrefetcher(cfg.subdomain, workers=cfg.prefetch_workers,
+                                               janela=cfg.prefetch_window)
+
+        def abrir_engine():
+            from .cdp import CdpEngine
+            return CdpEngine(
+                drv, cfg.subdomain, PRINT_TO_PDF_PARAMS, concorrencia=cfg.cdp_concurrency,
+                throttle=state.throttle,
+            )
 
-            try:
-                abrir_people(drv)
-                if not buscar_cliente(drv, cod):
-                    done_assessors.add(cod)
-                    save_checkpoint(checkpoint_path, done_assessors, processed_tickets)
+        def reciclar(motivo: str):
+            # fecha e recria o navegador principal (e as abas CDP, que vivem nele)
+            nonlocal drv, engine
+            if engine:
+                engine.close()
+            watchdog.reciclar(drv, motivo)
+            drv = safe_create_driver(cfg, out_dir)
+            entrar(drv, cfg, email, pwd)
+            if engine:
+                engine = abrir_engine()
+
+        def verificar_navegador():
+            motivo = watchdog.verificar(drv)
+            if motivo:
+                reciclar(motivo)
+
+        if pool:
+            pool.start()
+        elif cfg.engine == "cdp":
+            engine = abrir_engine()
+
+        def pular(cod: str) -> bool:
+            if plano is not None:
+                # incremental: só assessores com algo alterado desde o último sync
+                return not plano.get(cod)
+            if falhas is not None:
+                return False
+            return cod in state.done_assessors and not lease
+
+        def descobrir(cod: str) -> list[int] | None:
+            verificar_navegador()
+            if falhas is None:
+                return descobrir_assessor(cod)
+            if falhas[cod] is not None:
+                # retry-failed: lista vinda do failed.*, sem descoberta
+                return falhas[cod]
+            # retry-failed de uma descoberta que falhou: se der certo agora, a falha sai da lista
+            ids = descobrir_assessor(cod)
+            marcar_resolvido(out_dir, cod, falhas_assessor[cod])
+            return ids
+
+        def descobrir_assessor(cod: str) -> list[int] | None:
+            if plano is not None:
+                ids = plano[cod]
+                for tid in ids:
+                    if sync.reimprimir(tid):
+                        state.reabrir_ticket(tid, out_dir / f"assessor_{cod}")
+                return ids
+            if api is not None:
+                try:
+                    with cronometro("discovery", source="api"):
+                        return api.descobrir(cod, limite=cfg.max_tickets_per_assessor)
+                except Exception as e:
+                    if not cfg.discovery_fallback:
+                        raise
+                    contar("retries_total", stage="discovery_fallback")
+                    logger.warning("API falhou para %s (%s); usando a interface", cod, e)
+            with cronometro("discovery", source="ui"):
+                return descobrir_tickets_ui(drv, cod, cfg.max_tickets_per_assessor, cfg.max_pages,
+                                            subdomain=cfg.subdomain,
+                                            cache=usuarios if cfg.user_cache else None)
+
+        def preparar(cod: str, pendentes: list[int]):
+            if state.prefetcher is not None:
+                # cookies renovados a cada assessor (a sessão do Zendesk pode rotacioná-los)
+                state.prefetcher.copiar_cookies(drv)
+                state.prefetcher.agendar(pendentes)
+
+        if pipeline:
+            from .pipeline import ExportPipeline
+            expected_map = ExportPipeline(pool, state, out_dir, fila_codigos, pular, descobrir, preparar,
+                                          queue_size=cfg.pipeline_queue_size).run()
+        else:
+            for cod in fila_codigos:
+                if pular(cod):
                     continue
 
-                if not abrir_primeiro_cliente(drv):
-                    append_csv_row(failcsv, ["assessor", "ticket_id", "erro"], [cod, -1, "Não abriu perfil"])
-                    done_assessors.add(cod)
-                    save_checkpoint(checkpoint_path, done_assessors, processed_tickets)
-                    continue
+                try:
+                    ids = descobrir(cod)
+
+                    if ids is None:
+                        state.assessor_concluido(cod)
+                        continue
 
-                abrir_aba_tickets(drv)
+                    expected_map[cod] = set(ids)
 
-                ids = coletar_ids_tickets(drv, limite=cfg.max_tickets_per_assessor, max_pages=cfg.max_pages)
-                expected_map[cod] = set(ids)
+                    pasta = out_dir / f"assessor_{cod}"
 
-                pasta = out_dir / f"assessor_{cod}"
+                    pendentes = state.filtrar_pendentes(cod, pasta, ids)
+                    preparar(cod, pendentes)
 
-                for tid in ids:
-                    if tid in processed_tickets:
+                    if pool:
+                        pool.exportar_lote(cod, pasta, pendentes)
+                        state.assessor_concluido(cod)
+                        continue
+
+                    if engine:
+                        exportar_lote_cdp(engine, cfg, state, cod, pasta, pendentes)
+                        watchdog.tickets += len(pendentes)
+                        state.assessor_concluido(cod)
                         continue
 
+                    fila = deque((tid, 1) for tid in pendentes)
+                    retry = criar_fila_retry(cfg)
                     try:
-                        p = salvar_ticket_pdf(
-                            drv, cfg.subdomain, tid, pasta,
-                            after_print=(cfg.after_print_min_s, cfg.after_print_max_s)
-                        )
-                        processed_tickets.add(tid)
-
-                        append_csv_row(successcsv, ["assessor", "ticket_id", "arquivo", "bytes"],
-                                       [cod, tid, str(p), p.stat().st_size])
-                        append_csv_row(inventorycsv, ["assessor", "ticket_id", "arquivo", "bytes", "status"],
-                                       [cod, tid, str(p), p.stat().st_size, "baixado_agora"])
-
-                        if (len(processed_tickets) % 10) == 0:
-                            save_checkpoint(checkpoint_path, done_assessors, processed_tickets)
-
-                        time.sleep(random.uniform(cfg.between_tickets_min_s, cfg.between_tickets_max_s))
-
-                    except InvalidSessionIdException:
-                        try:
-                            drv.quit()
-                        except Exception:
-                            pass
-                        drv = safe_create_driver(cfg, out_dir)
-                        fazer_login(drv, cfg.subdomain, email, pwd)
+                        while fila or len(retry):
+                            # retries vencidos passam na frente; sem fila, espera o próximo vencer
+                            item = retry.pronto() or (fila.popleft() if fila else None)
+                            if item is None:
+                                retry.aguardar()
+                                continue
+                            tid, tentativa = item
+                            if not state.reservar_ticket(tid):
+                                continue
+
+                            t0 = time.monotonic()
+                            try:
+                                exportar_ticket(drv, cfg, state, cod, tid, pasta)
+
+                            except InvalidSessionIdException as e:
+                                if state.lease_tickets:
+                                    lease.liberar("ticket", str(tid))
+                                # o ticket que estava sendo impresso volta sem espera
+                                if retry.pode_repetir(e, tentativa):
+                                    retry.agendar((tid, tentativa + 1), tentativa, e)
+                                else:
+                                    state.ticket_falhou(cod, tid, "Sessão do navegador perdida", tipo="sessao_perdida")
+                                reciclar("sessão perdida")
+                                continue
+
+                            except Exception as e:
+                                if retry.pode_repetir(e, tentativa):
+                                    retry.agendar((tid, tentativa + 1), tentativa, e)
+                                else:
+                                    state.ticket_falhou(cod, tid, str(e), tipo=type(e).__name__)
+                                time.sleep(0.8)
+
+                            # entre um ticket e outro: nada em andamento no navegador
+                            watchdog.registrar(time.monotonic() - t0)
+                            verificar_navegador()
 
                     except Exception as e:
-                        append_csv_row(failcsv, ["assessor", "ticket_id", "erro"], [cod, tid, str(e)[:1000]])
-                        time.sleep(0.8)
+                        # navegador não voltou: o que faltava vai para o failed.csv, ticket a ticket,
+                        # para o retry-failed não precisar redescobrir o assessor
+                        logger.error("Assessor %s interrompido: %s", cod, e)
+                        for tid, _ in [*fila, *retry.drenar()]:
+                            state.ticket_falhou(cod, tid, f"Interrompido: {e}", tipo="interrompido")
+
+                    state.assessor_concluido(cod)
 
-                done_assessors.add(cod)
-                save_checkpoint(checkpoint_path, done_assessors, processed_tickets)
+                except Exception as e:
+                    state.ticket_falhou(cod, -1, str(e), tipo=type(e).__name__)
+                    state.assessor_concluido(cod)
+                    continue
 
-            except Exception as e:
-                append_csv_row(failcsv, ["assessor", "ticket_id", "erro"], [cod, -1, str(e)[:1000]])
-                done_assessors.add(cod)
-                save_checkpoint(checkpoint_path, done_assessors, processed_tickets)
-                continue
+        if plano is not None:
+            concluir_sync(sync, novo_cursor)
 
         summary = {
+            "node_id": node_id,
+            "sync_mode": cfg.sync_mode,
+            "retry_failed": somente_falhas,
             "total_assessors": len(codigos),
             "total_expected_tickets": sum(len(v) for v in expected_map.values()),
-            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "stages": METRICAS.snapshot()["histograms"],
         }
         save_json(summaryjson, summary)
 
@@ -734,7 +1431,28 @@ def export_all(cfg: ExporterConfig, cfg_auth: dict):
             input("Pressione Enter para fechar o navegador...")
 
     finally:
-        try:
-            drv.quit()
-        except Exception:
-            pass
+        if state and state.prefetcher:
+            state.prefetcher.close()
+        if engine:
+            engine.close()
+        if sync:
+            sync.close()
+        if api:
+            api.close()
+        if usuarios is not None:
+            usuarios.close()
+        if pool:
+            pool.close()
+        if lease:
+            lease.close()
+        if state:
+            state.close()
+        elif archive:
+            archive.close()
+        if metricas:
+            metricas.close()
+        if drv:
+            try:
+                drv.quit()
+            except Exception:
+                pass
@@ -0,0 +1,140 @@
+import csv
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "jsonl", "parquet")
+
+
+class _CsvWriter:
+    def __init__(self, path: Path, header: list):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not path.exists() or path.stat().st_size == 0
+        self.f = open(path, "a", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        if is_new:
+            self.w.writerow(header)
+
+    def write(self, rows: list[list]):
+        self.w.writerows(rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path: Path, header: list):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.header = header
+        self.f = open(path, "a", encoding="utf-8")
+
+    def write(self, rows: list[list]):
+        self.f.write("".join(json.dumps(dict(zip(self.header, r)), ensure_ascii=False) + "\n" for r in rows))
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class _ParquetWriter:
+    # Parquet não aceita append: cada flush vira um part-file dentro de <nome>.parquet/
+    def __init__(self, path: Path, header: list):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("inventory.format = 'parquet' requer o pacote pyarrow.") from e
+        self.pa, self.pq = pa, pq
+        self.dir = path
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.header = header
+        self.seq = 0
+
+    def write(self, rows: list[list]):
+        cols = {h: [r[i] for r in rows] for i, h in enumerate(self.header)}
+        table = self.pa.table(cols)
+        self.seq += 1
+        self.pq.write_table(table, self.dir / f"part-{int(time.time() * 1000)}-{self.seq:05d}.parquet")
+
+    def close(self):
+        pass
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+class InventorySink:
+    """Escrita bufferizada de success/failed/all_tickets.
+
+    Mantém os arquivos abertos, acumula linhas e grava em lote quando o buffer
+    chega a `batch_rows`, a cada `flush_interval_s` e em cada `flush()` explícito
+    (fim de assessor / encerramento).
+    """
+
+    def __init__(self, out_dir: Path, formato: str = "csv", sufixo: str = "", batch_rows: int = 500,
+                 flush_interval_s: float = 5.0, on_flush: Callable[[], None] | None = None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de inventário inválido: {formato} (use {', '.join(FORMATOS)})")
+        self.out_dir = out_dir
+        self.formato = formato
+        self.sufixo = sufixo
+        self.batch_rows = batch_rows
+        self.flush_interval_s = flush_interval_s
+        self.on_flush = on_flush
+
+        self.lock = threading.RLock()
+        self._writers: dict[str, object] = {}
+        self._headers: dict[str, list] = {}
+        self._buffers: dict[str, list] = {}
+        self._pendentes = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="inventory-flush", daemon=True)
+        self._thread.start()
+
+    def path(self, nome: str) -> Path:
+        return self.out_dir / f"{nome}{self.sufixo}.{self.formato}"
+
+    def escrever(self, nome: str, header: list, row: list):
+        with self.lock:
+            self._headers.setdefault(nome, header)
+            self._buffers.setdefault(nome, []).append(row)
+            self._pendentes += 1
+            if self._pendentes >= self.batch_rows:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            for nome, rows in self._buffers.items():
+                if not rows:
+                    continue
+                w = self._writers.get(nome)
+                if w is None:
+                    w = self._writers[nome] = WRITERS[self.formato](self.path(nome), self._headers[nome])
+                w.write(rows)
+                self._buffers[nome] = []
+            self._pendentes = 0
+            if self.on_flush is not None:
+                self.on_flush()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Falha ao gravar inventário: %s", e)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=10)
+        with self.lock:
+            self.flush()
+            for w in self._writers.values():
+                w.close()
+            self._writers.clear()
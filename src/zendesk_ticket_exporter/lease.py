@@ -0,0 +1,185 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = "pendente"
+EM_USO = "em_uso"
+CONCLUIDO = "concluido"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    kind        TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pendente',
+    owner       TEXT,
+    expires_at  REAL NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS leases_status ON leases (kind, status, expires_at);
+"""
+
+
+class LeaseQueue:
+    """Fila de trabalho em SQLite com leases (expiração + heartbeat) para vários hosts.
+
+    Pensada para um `output_dir` em filesystem compartilhado: cada nó reivindica
+    assessores (ou tickets) com um lease que precisa ser renovado; se o nó cair,
+    o lease expira e a chave volta para a fila.
+    """
+
+    def __init__(self, db_path: Path, node_id: str, ttl_s: float = 300.0):
+        self.db_path = db_path
+        self.node_id = node_id
+        self.ttl_s = ttl_s
+
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._hb: threading.Thread | None = None
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    # ---------- conexão ----------
+    def _conn(self) -> sqlite3.Connection:
+        # uma conexão por thread; sem WAL porque o banco pode estar em rede (SMB/NFS)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout = 60000")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    # ---------- operações ----------
+    def semear(self, kind: str, chaves: Iterable[str]):
+        now = time.time()
+        conn = self._tx()
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO leases (kind, key, updated_at) VALUES (?, ?, ?)",
+                ((kind, str(k), now) for k in chaves),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reivindicar(self, kind: str) -> str | None:
+        # pega a próxima chave pendente ou com lease expirado
+        now = time.time()
+        conn = self._tx()
+        try:
+            row = conn.execute(
+                "SELECT key FROM leases WHERE kind = ? AND "
+                "(status = ? OR (status = ? AND expires_at < ?)) ORDER BY rowid LIMIT 1",
+                (kind, PENDENTE, EM_USO, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            self._marcar_em_uso(conn, kind, row[0], now)
+            conn.execute("COMMIT")
+            return row[0]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def reivindicar_chave(self, kind: str, chave: str) -> bool:
+        # lease de uma chave específica (cria a linha se ainda não existir)
+        now = time.time()
+        conn = self._tx()
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO leases (kind, key, updated_at) VALUES (?, ?, ?)",
+                (kind, str(chave), now),
+            )
+            row = conn.execute(
+                "SELECT status, owner, expires_at FROM leases WHERE kind = ? AND key = ?",
+                (kind, str(chave)),
+            ).fetchone()
+            status, owner, expires_at = row
+            livre = status == PENDENTE or (status == EM_USO and (owner == self.node_id or expires_at < now))
+            if livre:
+                self._marcar_em_uso(conn, kind, str(chave), now)
+            conn.execute("COMMIT")
+            return livre
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _marcar_em_uso(self, conn, kind: str, chave: str, now: float):
+        conn.execute(
+            "UPDATE leases SET status = ?, owner = ?, expires_at = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE kind = ? AND key = ?",
+            (EM_USO, self.node_id, now + self.ttl_s, now, kind, chave),
+        )
+
+    def concluir(self, kind: str, chave: str):
+        self._finalizar(kind, chave, CONCLUIDO)
+
+    def liberar(self, kind: str, chave: str):
+        self._finalizar(kind, chave, PENDENTE)
+
+    def _finalizar(self, kind: str, chave: str, status: str):
+        self._conn().execute(
+            "UPDATE leases SET status = ?, expires_at = 0, updated_at = ? "
+            "WHERE kind = ? AND key = ? AND owner = ?",
+            (status, time.time(), kind, str(chave), self.node_id),
+        )
+
+    def renovar(self):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE leases SET expires_at = ?, updated_at = ? WHERE status = ? AND owner = ?",
+            (now + self.ttl_s, now, EM_USO, self.node_id),
+        )
+
+    def concluidos(self, kind: str) -> set[str]:
+        rows = self._conn().execute(
+            "SELECT key FROM leases WHERE kind = ? AND status = ?", (kind, CONCLUIDO)
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def iterar(self, kind: str) -> Iterator[str]:
+        while not self._stop.is_set():
+            chave = self.reivindicar(kind)
+            if chave is None:
+                return
+            yield chave
+
+    # ---------- heartbeat ----------
+    def start_heartbeat(self):
+        if self._hb is not None:
+            return
+        self._stop.clear()
+        self._hb = threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True)
+        self._hb.start()
+
+    def _heartbeat(self):
+        intervalo = max(self.ttl_s / 3.0, 1.0)
+        while not self._stop.wait(intervalo):
+            try:
+                self.renovar()
+            except Exception as e:
+                logger.warning("Falha ao renovar leases (%s): %s", self.node_id, e)
+
+    def close(self):
+        self._stop.set()
+        if self._hb is not None:
+            self._hb.join(timeout=5)
+            self._hb = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,184 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MIN_PDF_BYTES = 2048
+TRAILER_WINDOW = 1024
+CHUNK = 1024 * 1024
+
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+# ===================== Validação =====================
+def pdf_bytes_validos(data: bytes) -> bool:
+    return len(data) >= MIN_PDF_BYTES and data.startswith(b"%PDF-") and b"%%EOF" in data[-TRAILER_WINDOW:]
+
+
+def pdf_valido(path: Path) -> bool:
+    # lê só o cabeçalho e o final do arquivo, sem carregar o PDF inteiro
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MIN_PDF_BYTES:
+                return False
+            if f.read(5) != b"%PDF-":
+                return False
+            f.seek(max(size - TRAILER_WINDOW, 0))
+            return b"%%EOF" in f.read()
+    except Exception:
+        return False
+
+
+def contar_paginas(data: bytes) -> int:
+    return len(_PAGE_RE.findall(data))
+
+
+def sha256_arquivo(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ===================== Manifest =====================
+class Manifest:
+    """Índice append-only dos PDFs gravados (manifest.jsonl).
+
+    Uma linha por PDF salvo: ticket_id, path, size, mtime, sha256 e páginas.
+    Na retomada o índice em memória substitui exists/stat/leitura do PDF.
+    """
+
+    def __init__(self, out_dir: Path, sufixo: str = ""):
+        self.path = out_dir / f"manifest{sufixo}.jsonl"
+        self.lock = threading.Lock()
+        self.entries: dict[int, dict] = {}
+        # sync incremental: o PDF em disco é de uma versão antiga e precisa ser reimpresso
+        self.reimprimir: set[int] = set()
+
+        # todos os manifests do diretório (um por nó no modo multi-host)
+        for p in sorted(out_dir.glob("manifest*.jsonl")):
+            self.entries.update(carregar_manifest(p))
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def tem(self, tid: int, path: Path) -> bool:
+        with self.lock:
+            e = self.entries.get(tid)
+        return e is not None and e["path"] == str(path)
+
+    def obter(self, tid: int) -> dict | None:
+        with self.lock:
+            return self.entries.get(tid)
+
+    def _append(self, entry: dict):
+        with self.lock:
+            self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._f.flush()
+            if entry.get("removed"):
+                self.entries.pop(entry["ticket_id"], None)
+            else:
+                self.entries[entry["ticket_id"]] = entry
+                self.reimprimir.discard(entry["ticket_id"])
+
+    def registrar(self, tid: int, path: Path, data: bytes):
+        self._append({
+            "ticket_id": tid,
+            "path": str(path),
+            "size": len(data),
+            "mtime": path.stat().st_mtime,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "pages": contar_paginas(data),
+        })
+
+    def registrar_existente(self, tid: int, path: Path):
+        # PDFs de execuções anteriores ao manifest: indexa na primeira vez que aparecem
+        self.registrar(tid, path, path.read_bytes())
+
+    def invalidar(self, tid: int):
+        with self.lock:
+            self.reimprimir.add(tid)
+        if tid in self.entries:
+            self._append({"ticket_id": tid, "removed": True})
+
+    def a_reimprimir(self, tid: int) -> bool:
+        with self.lock:
+            return tid in self.reimprimir
+
+    def close(self):
+        with self.lock:
+            self._f.close()
+
+
+def carregar_manifest(path: Path) -> dict[int, dict]:
+    entries: dict[int, dict] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                if e.get("removed"):
+                    entries.pop(e["ticket_id"], None)
+                else:
+                    entries[e["ticket_id"]] = e
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+# ===================== Verify =====================
+def verificar_pdf(entry: dict, check_hash: bool) -> str | None:
+    path = Path(entry["path"])
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return "ausente"
+    if "size" in entry and st.st_size != entry["size"]:
+        return f"tamanho {st.st_size} != {entry['size']}"
+    if not pdf_valido(path):
+        return "cabeçalho/trailer inválido"
+    if check_hash and entry.get("sha256") and sha256_arquivo(path) != entry["sha256"]:
+        return "sha256 divergente"
+    return None
+
+
+def verificar(out_dir: Path, workers: int = 8, check_hash: bool = True) -> int:
+    entries: dict[int, dict] = {}
+    for p in sorted(out_dir.glob("manifest*.jsonl")):
+        entries.update(carregar_manifest(p))
+
+    # PDFs soltos que não estão no manifest também são checados (sem tamanho/hash)
+    indexados = {e["path"] for e in entries.values()}
+    extras = [{"ticket_id": None, "path": str(p)}
+              for p in out_dir.glob("assessor_*/ticket_*.pdf") if str(p) not in indexados]
+    todos = list(entries.values()) + extras
+
+    inicio = time.time()
+    ruins: list[tuple[dict, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        for entry, erro in zip(todos, ex.map(lambda e: verificar_pdf(e, check_hash), todos)):
+            if erro:
+                ruins.append((entry, erro))
+
+    report = out_dir / "verify_report.csv"
+    with open(report, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ticket_id", "arquivo", "erro"])
+        for entry, erro in ruins:
+            w.writerow([entry.get("ticket_id"), entry["path"], erro])
+
+    logger.info("Verificados %d PDFs (%d fora do manifest) em %.1fs: %d com problema -> %s",
+                len(todos), len(extras), time.time() - inicio, len(ruins), report)
+    return len(ruins)
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PREFIXO = "zendesk_exporter_"
+# limites em segundos: de um execute_script rápido até um printToPDF de ticket enorme
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+# ===================== Séries =====================
+class Histograma:
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)
+        self.soma = 0.0
+        self.n = 0
+
+    def observar(self, v: float):
+        i = 0
+        while i < len(self.buckets) and v > self.buckets[i]:
+            i += 1
+        self.contagens[i] += 1
+        self.soma += v
+        self.n += 1
+
+    def quantil(self, q: float) -> float | None:
+        # interpolação linear dentro do bucket, como o histogram_quantile do Prometheus
+        if not self.n:
+            return None
+        alvo = q * self.n
+        acumulado = 0
+        for i, c in enumerate(self.contagens):
+            if acumulado + c >= alvo and c:
+                inicio = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return inicio
+                return inicio + (self.buckets[i] - inicio) * (alvo - acumulado) / c
+            acumulado += c
+        return self.buckets[-1]
+
+
+def _chave(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _labels_prom(chave: tuple, extra: tuple = ()) -> str:
+    pares = [*chave, *extra]
+    if not pares:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pares) + "}"
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+# ===================== Registro =====================
+class Metricas:
+    """Contadores, gauges e histogramas por nome + labels, seguros entre threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contadores: dict[str, dict[tuple, float]] = {}
+        self.gauges: dict[str, dict[tuple, float]] = {}
+        self.histogramas: dict[str, dict[tuple, Histograma]] = {}
+        self.ajuda: dict[str, str] = {}
+        self.labels_fixos: dict[str, str] = {}
+        self.inicio = time.time()
+
+    def contar(self, nome: str, valor: float = 1, **labels):
+        with self.lock:
+            serie = self.contadores.setdefault(nome, {})
+            k = _chave(labels)
+            serie[k] = serie.get(k, 0) + valor
+
+    def definir(self, nome: str, valor: float, **labels):
+        with self.lock:
+            self.gauges.setdefault(nome, {})[_chave(labels)] = valor
+
+    def observar(self, nome: str, segundos: float, **labels):
+        with self.lock:
+            serie = self.histogramas.setdefault(nome, {})
+            k = _chave(labels)
+            h = serie.get(k)
+            if h is None:
+                h = serie[k] = Histograma()
+            h.observar(segundos)
+
+    @contextmanager
+    def cronometro(self, etapa: str, **labels):
+        # latência da etapa no histograma stage_seconds, tenha ela terminado bem ou não
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observar("stage_seconds", time.monotonic() - t0, stage=etapa, **labels)
+
+    def resetar(self, labels_fixos: dict | None = None):
+        with self.lock:
+            self.contadores.clear()
+            self.gauges.clear()
+            self.histogramas.clear()
+            self.labels_fixos = {k: str(v) for k, v in (labels_fixos or {}).items()}
+            self.inicio = time.time()
+
+    # ---------- exportação ----------
+    def snapshot(self) -> dict:
+        with self.lock:
+            etapas = {}
+            for nome, serie in self.histogramas.items():
+                for k, h in serie.items():
+                    etapas[f"{nome}{_labels_prom(k)}"] = {
+                        "count": h.n, "sum_s": round(h.soma, 3),
+                        "avg_s": round(h.soma / h.n, 4) if h.n else None,
+                        "p50_s": _arred(h.quantil(0.5)), "p95_s": _arred(h.quantil(0.95)),
+                    }
+            return {
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "uptime_s": round(time.time() - self.inicio, 1),
+                "labels": dict(self.labels_fixos),
+                "counters": {f"{n}{_labels_prom(k)}": v for n, s in self.contadores.items() for k, v in s.items()},
+                "gauges": {f"{n}{_labels_prom(k)}": v for n, s in self.gauges.items() for k, v in s.items()},
+                "histograms": etapas,
+            }
+
+    def prometheus(self) -> str:
+        fixos = tuple(sorted(self.labels_fixos.items()))
+        linhas = []
+        with self.lock:
+            for tipo, grupo in (("counter", self.contadores), ("gauge", self.gauges)):
+                for nome, serie in sorted(grupo.items()):
+                    linhas.append(f"# TYPE {PREFIXO}{nome} {tipo}")
+                    for k, v in sorted(serie.items()):
+                        linhas.append(f"{PREFIXO}{nome}{_labels_prom(k, fixos)} {_num(v)}")
+            for nome, serie in sorted(self.histogramas.items()):
+                linhas.append(f"# TYPE {PREFIXO}{nome} histogram")
+                for k, h in sorted(serie.items()):
+                    acumulado = 0
+                    for limite, c in zip((*h.buckets, "+Inf"), h.contagens):
+                        acumulado += c
+                        le = (("le", limite if isinstance(limite, str) else _num(limite)),)
+                        linhas.append(f"{PREFIXO}{nome}_bucket{_labels_prom(k, fixos + le)} {acumulado}")
+                    linhas.append(f"{PREFIXO}{nome}_sum{_labels_prom(k, fixos)} {_num(round(h.soma, 6))}")
+                    linhas.append(f"{PREFIXO}{nome}_count{_labels_prom(k, fixos)} {h.n}")
+        return "\n".join(linhas) + "\n"
+
+
+def _arred(v: float | None) -> float | None:
+    return round(v, 4) if v is not None else None
+
+
+# registro do processo: as etapas ficam espalhadas por vários módulos e threads
+METRICAS = Metricas()
+contar = METRICAS.contar
+definir = METRICAS.definir
+observar = METRICAS.observar
+cronometro = METRICAS.cronometro
+
+
+# ===================== Escrita periódica =====================
+def _gravar_atomico(path: Path, texto: str):
+    # o textfile collector do node-exporter nunca pode ler um arquivo pela metade
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(texto, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class MetricsWriter:
+    """Grava a cada `intervalo_s` o textfile Prometheus e o snapshot JSON das métricas."""
+
+    def __init__(self, textfile: Path | None, json_path: Path | None, intervalo_s: float = 30.0,
+                 registro: Metricas = METRICAS):
+        self.textfile = textfile
+        self.json_path = json_path
+        self.intervalo_s = max(1.0, intervalo_s)
+        self.registro = registro
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def gravar(self):
+        self.registro.definir("last_write_timestamp_seconds", time.time())
+        try:
+            if self.textfile is not None:
+                _gravar_atomico(self.textfile, self.registro.prometheus())
+            if self.json_path is not None:
+                _gravar_atomico(self.json_path, json.dumps(self.registro.snapshot(), ensure_ascii=False, indent=2))
+        except OSError as e:
+            logger.warning("Não consegui gravar as métricas: %s", e)
+
+    def _loop(self):
+        while not self._stop.wait(self.intervalo_s):
+            self.gravar()
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self.gravar()
@@ -0,0 +1,110 @@
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()
+
+
+class ExportPipeline:
+    """Carga de códigos -> descoberta -> exportação -> inventário, ligados por filas limitadas.
+
+    A descoberta do próximo assessor roda no navegador principal enquanto os
+    workers do pool imprimem os PDFs do anterior. `fila_codigos` e a fila do
+    pool são limitadas: se a impressão atrasa, a descoberta para de avançar e
+    a memória fica estável. O inventário continua no buffer do InventorySink.
+    """
+
+    def __init__(self, pool, state, out_dir: Path, codigos: Iterable[str],
+                 pular: Callable[[str], bool],
+                 descobrir: Callable[[str], list[int] | None],
+                 preparar: Callable[[str, list[int]], None] | None = None,
+                 queue_size: int = 64):
+        self.pool = pool
+        self.state = state
+        self.out_dir = out_dir
+        self.codigos = codigos
+        self.pular = pular
+        self.descobrir = descobrir
+        self.preparar = preparar
+
+        # poucos códigos adiantados: no modo lease cada um é um assessor reivindicado
+        self.fila_codigos: queue.Queue = queue.Queue(maxsize=max(1, min(queue_size, 4)))
+        self.expected: dict[str, set[int]] = {}
+        self._erros: list[BaseException] = []
+        self._stop = threading.Event()
+
+    # ---------- estágio 1: carga dos códigos ----------
+    def _carregar(self):
+        try:
+            for cod in self.codigos:
+                if self._stop.is_set():
+                    break
+                if self.pular(cod):
+                    continue
+                self._put(cod)
+        except BaseException as e:
+            self._erros.append(e)
+        finally:
+            self._put(_FIM)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.fila_codigos.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    # ---------- estágio 2: descoberta (thread chamadora, dona do navegador principal) ----------
+    def _concluir(self, cod: str):
+        try:
+            self.state.assessor_concluido(cod)
+        except BaseException as e:
+            logger.error("Falha ao concluir assessor %s: %s", cod, e)
+            self._erros.append(e)
+
+    def _descobrir_e_submeter(self, cod: str):
+        try:
+            ids = self.descobrir(cod)
+            if ids is None:
+                self.state.assessor_concluido(cod)
+                return
+
+            self.expected[cod] = set(ids)
+            pasta = self.out_dir / f"assessor_{cod}"
+            pendentes = self.state.filtrar_pendentes(cod, pasta, ids)
+            if self.preparar is not None:
+                self.preparar(cod, pendentes)
+
+            # submeter bloqueia quando a fila do pool está cheia (backpressure)
+            for tid in pendentes:
+                self.pool.submeter(cod, tid, pasta)
+        except Exception as e:
+            self.state.ticket_falhou(cod, -1, str(e), tipo=type(e).__name__)
+        # conclui quando o último ticket submetido terminar (ou já, se nenhum)
+        self.pool.ao_concluir_assessor(cod, lambda: self._concluir(cod))
+
+    def run(self) -> dict[str, set[int]]:
+        loader = threading.Thread(target=self._carregar, name="pipeline-codigos", daemon=True)
+        loader.start()
+        try:
+            while True:
+                cod = self.fila_codigos.get()
+                if cod is _FIM:
+                    break
+                self._descobrir_e_submeter(cod)
+                if self._erros:
+                    break
+            # estágio 3: espera os workers drenarem a fila
+            self.pool.aguardar_tudo()
+        finally:
+            self._stop.set()
+            loader.join(timeout=5)
+
+        if self._erros:
+            raise self._erros[0]
+        return self.expected
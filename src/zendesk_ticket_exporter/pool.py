@@ -0,0 +1,199 @@
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from selenium.common.exceptions import InvalidSessionIdException
+
+from .retry import criar_fila_retry
+from .watchdog import criar_watchdog
+from .exporter import (
+    ExporterConfig,
+    ExportState,
+    entrar,
+    exportar_ticket,
+    safe_create_driver,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PrintWorkerPool:
+    """N navegadores independentes consumindo tickets de uma fila comum.
+
+    A fila é limitada (`queue_size`): quem submete bloqueia quando os workers
+    estão atrasados. Tickets com falha transitória vão para uma fila de retry à
+    parte (backoff exponencial), que nunca bloqueia os workers.
+    """
+
+    def __init__(self, cfg: ExporterConfig, state: ExportState, out_dir: Path, email: str, pwd: str,
+                 queue_size: int = 0):
+        self.cfg = cfg
+        self.state = state
+        self.out_dir = out_dir
+        self.email = email
+        self.pwd = pwd
+
+        self.fila: queue.Queue = queue.Queue(maxsize=max(0, queue_size))
+        self.retry = criar_fila_retry(cfg)
+        self.threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+
+        # tickets em aberto por assessor + callbacks de "assessor terminou"
+        self._cond = threading.Condition()
+        self._pendentes: dict[str, int] = {}
+        self._ao_esvaziar: dict[str, Callable[[], None]] = {}
+
+    # ---------- ciclo de vida ----------
+    def start(self):
+        for i in range(self.cfg.workers):
+            t = threading.Thread(target=self._worker, args=(f"w{i}",), name=f"print-w{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def submeter(self, cod: str, tid: int, pasta: Path):
+        with self._cond:
+            self._pendentes[cod] = self._pendentes.get(cod, 0) + 1
+        self.fila.put((cod, tid, pasta, 1))
+
+    def ao_concluir_assessor(self, cod: str, callback: Callable[[], None]):
+        # chamado depois de submeter todos os tickets do assessor
+        with self._cond:
+            if self._pendentes.get(cod, 0) > 0:
+                self._ao_esvaziar[cod] = callback
+                return
+            self._pendentes.pop(cod, None)
+        callback()
+
+    def exportar_lote(self, cod: str, pasta: Path, ids: list[int]):
+        # bloqueia até todos os tickets do assessor terminarem (ok ou falha)
+        for tid in ids:
+            if self.state.ticket_pendente(tid):
+                self.submeter(cod, tid, pasta)
+        with self._cond:
+            while self._pendentes.get(cod, 0) > 0:
+                self._cond.wait()
+            self._pendentes.pop(cod, None)
+
+    def aguardar_tudo(self):
+        with self._cond:
+            while any(n > 0 for n in self._pendentes.values()):
+                self._cond.wait()
+
+    def _item_finalizado(self, cod: str):
+        callback = None
+        with self._cond:
+            self._pendentes[cod] -= 1
+            if self._pendentes[cod] <= 0:
+                callback = self._ao_esvaziar.pop(cod, None)
+                if callback is not None:
+                    self._pendentes.pop(cod, None)
+                self._cond.notify_all()
+        if callback is not None:
+            callback()
+
+    def close(self):
+        self._stop.set()
+        for t in self.threads:
+            t.join(timeout=30)
+        self.threads.clear()
+
+    # ---------- worker ----------
+    def _novo_driver(self, nome: str):
+        for tentativa in range(1, self.cfg.retry_create_driver + 2):
+            drv = None
+            try:
+                drv = safe_create_driver(self.cfg, self.out_dir, nome=nome)
+                entrar(drv, self.cfg, self.email, self.pwd)
+                return drv
+            except Exception as e:
+                logger.warning("[%s] falha ao criar navegador (tentativa %d): %s", nome, tentativa, e)
+                if drv is not None:
+                    try:
+                        drv.quit()
+                    except Exception:
+                        pass
+                time.sleep(2.0 * tentativa)
+        return None
+
+    def _proximo(self):
+        item = self.retry.pronto()
+        if item is not None:
+            return item
+        try:
+            return self.fila.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    def _worker(self, nome: str):
+        drv = self._novo_driver(nome)
+        watchdog = criar_watchdog(self.cfg, nome)
+
+        while True:
+            item = self._proximo()
+            if item is None:
+                if self._stop.is_set():
+                    break
+                continue
+
+            cod, tid, pasta, tentativa = item
+            finalizado = True
+            try:
+                if drv is None:
+                    drv = self._novo_driver(nome)
+                    watchdog.resetar()
+                if drv is None:
+                    # sem navegador não dá para imprimir; registra e segue drenando a fila
+                    self.state.ticket_falhou(cod, tid, f"[{nome}] navegador indisponível",
+                                             tipo="navegador_indisponivel")
+                    continue
+
+                if not self.state.reservar_ticket(tid):
+                    continue
+
+                t0 = time.monotonic()
+                try:
+                    exportar_ticket(drv, self.cfg, self.state, cod, tid, pasta)
+                finally:
+                    watchdog.registrar(time.monotonic() - t0)
+
+            except InvalidSessionIdException as e:
+                logger.warning("[%s] sessão inválida no ticket %s; recriando navegador", nome, tid)
+                try:
+                    drv.quit()
+                except Exception:
+                    pass
+                drv = None
+                if self.retry.pode_repetir(e, tentativa):
+                    # mantém o lease do ticket: a nova tentativa é deste mesmo nó
+                    self.retry.agendar((cod, tid, pasta, tentativa + 1), tentativa, e)
+                    finalizado = False
+                else:
+                    self.state.ticket_falhou(cod, tid, "Sessão do navegador perdida", tipo="sessao_perdida")
+
+            except Exception as e:
+                if self.retry.pode_repetir(e, tentativa):
+                    self.retry.agendar((cod, tid, pasta, tentativa + 1), tentativa, e)
+                    finalizado = False
+                else:
+                    self.state.ticket_falhou(cod, tid, str(e), tipo=type(e).__name__)
+                time.sleep(0.8)
+
+            finally:
+                if finalizado:
+                    self._item_finalizado(cod)
+
+            # entre um ticket e outro: recicla o navegador deste worker se passou dos limites
+            if drv is not None:
+                motivo = watchdog.verificar(drv)
+                if motivo:
+                    watchdog.reciclar(drv, motivo)
+                    drv = None
+
+        if drv is not None:
+            try:
+                drv.quit()
+            except Exception:
+                pass
@@ -0,0 +1,103 @@
+import logging
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .discovery import criar_sessao_http
+from .urls import ticket_print_url
+
+logger = logging.getLogger(__name__)
+
+_HEAD_RE = re.compile(r"<head[^>]*>", re.IGNORECASE)
+
+
+def com_base_href(html: str, url: str) -> str:
+    # links relativos do HTML baixado continuam resolvendo para o Zendesk
+    tag = f'<base href="{url}">'
+    m = _HEAD_RE.search(html)
+    if m:
+        return html[:m.end()] + tag + html[m.end():]
+    return tag + html
+
+
+class PrintPrefetcher:
+    """Baixa por HTTP o HTML das páginas de impressão dos próximos tickets.
+
+    Usa os cookies da sessão autenticada do Selenium num cliente HTTP com pool
+    de conexões; o navegador recebe o HTML pronto e só precisa imprimir.
+    Mantém no máximo `janela` downloads adiantados para a memória ficar estável.
+    """
+
+    def __init__(self, subdomain: str, workers: int = 4, janela: int = 8, timeout_s: float = 30.0):
+        self.subdomain = subdomain
+        self.janela = max(1, janela)
+        self.timeout_s = timeout_s
+
+        self.session = criar_sessao_http(pool_size=workers, retries=1)
+        self.session.headers["Accept"] = "text/html"
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+
+        self.lock = threading.Lock()
+        self.fila: deque[int] = deque()
+        self.futuros: dict[int, Future] = {}
+
+    def copiar_cookies(self, drv):
+        for c in drv.get_cookies():
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+
+    def agendar(self, ticket_ids: list[int]):
+        with self.lock:
+            self.fila.extend(t for t in ticket_ids if t not in self.futuros)
+            self._completar()
+
+    def _completar(self):
+        while self.fila and len(self.futuros) < self.janela:
+            tid = self.fila.popleft()
+            if tid not in self.futuros:
+                self.futuros[tid] = self.pool.submit(self._baixar, tid)
+
+    def _baixar(self, ticket_id: int) -> str | None:
+        url = ticket_print_url(self.subdomain, ticket_id)
+        r = self.session.get(url, timeout=self.timeout_s)
+        # redirecionou para o login ou erro: o navegador faz a navegação normal
+        if r.status_code != 200 or "/auth/" in r.url or "text/html" not in r.headers.get("Content-Type", ""):
+            return None
+        return com_base_href(r.text, url)
+
+    def obter(self, ticket_id: int) -> str | None:
+        with self.lock:
+            fut = self.futuros.pop(ticket_id, None)
+            try:
+                self.fila.remove(ticket_id)
+            except ValueError:
+                pass
+            self._completar()
+        if fut is None:
+            return None
+        try:
+            return fut.result(timeout=self.timeout_s)
+        except Exception as e:
+            logger.debug("Prefetch do ticket %s falhou: %s", ticket_id, e)
+            return None
+
+    def descartar(self, ticket_id: int):
+        # ticket que não vai usar o HTML (já salvo, sem reserva, falhou): libera a vaga na janela
+        with self.lock:
+            fut = self.futuros.pop(ticket_id, None)
+            try:
+                self.fila.remove(ticket_id)
+            except ValueError:
+                pass
+            self._completar()
+        if fut is not None:
+            fut.cancel()
+
+    def close(self):
+        with self.lock:
+            self.fila.clear()
+            for fut in self.futuros.values():
+                fut.cancel()
+            self.futuros.clear()
+        self.pool.shutdown(wait=False)
+        self.session.close()
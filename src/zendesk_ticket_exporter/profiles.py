@@ -0,0 +1,118 @@
+import logging
+import os
+import re
+import shutil
+import socket
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MARCADOR = ".ultimo_uso"
+# perfis do formato antigo (um por inicialização, nunca reaproveitados)
+_LEGADO_RE = re.compile(r"^profile_\d{10,}")
+# caches do Chrome: podem ser apagados sem perder cookies/sessão
+CACHES = ("Default/Cache", "Default/Code Cache", "Default/GPUCache", "Default/Service Worker/CacheStorage",
+          "GrShaderCache", "ShaderCache", "GraphiteDawnCache")
+
+
+def perfil_nomeado(root: Path, nome: str) -> Path:
+    # mesmo nome -> mesmo diretório entre execuções e reinícios do navegador
+    nome = re.sub(r"[^A-Za-z0-9_.-]", "_", nome)
+    d = root / f"perfil_{nome}"
+    d.mkdir(parents=True, exist_ok=True)
+    (d / MARCADOR).touch()
+    return d
+
+
+def ultimo_uso(d: Path) -> float:
+    try:
+        return (d / MARCADOR).stat().st_mtime
+    except FileNotFoundError:
+        return d.stat().st_mtime
+
+
+def _processo_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def aberto_pelo_chrome(d: Path) -> bool:
+    # SingletonLock (Linux/macOS, symlink) ou lockfile (Windows) existem enquanto o Chrome usa o perfil
+    lock = d / "SingletonLock"
+    if os.path.lexists(lock):
+        # alvo do symlink: "<host>-<pid>"; lock de um Chrome morto neste mesmo host não conta
+        try:
+            host, _, pid = os.readlink(lock).rpartition("-")
+        except OSError:
+            return True
+        return not (host == socket.gethostname() and pid.isdigit() and not _processo_vivo(int(pid)))
+    return (d / "lockfile").exists()
+
+
+def tamanho_dir(d: Path) -> int:
+    total = 0
+    for base, _, files in os.walk(d):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(base, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _remover(d: Path) -> bool:
+    try:
+        shutil.rmtree(d)
+        return True
+    except OSError as e:
+        # perfil aberto por outro processo (Windows trava os arquivos): fica para a próxima
+        logger.debug("Não removi o perfil %s: %s", d, e)
+        return False
+
+
+def despejar_perfis(root: Path, max_idade_s: float, max_bytes: int, em_uso: set[str] | None = None,
+                    legado_idade_s: float = 600.0) -> int:
+    """Remove perfis parados há mais de `max_idade_s` e, se o total passar de
+    `max_bytes`, limpa caches e depois remove os menos usados recentemente."""
+    if not root.exists():
+        return 0
+    em_uso = em_uso or set()
+    agora = time.time()
+    removidos = 0
+
+    vivos: list[tuple[float, Path]] = []
+    for d in root.iterdir():
+        if not d.is_dir() or d.name in em_uso or aberto_pelo_chrome(d):
+            continue
+        uso = ultimo_uso(d)
+        legado = bool(_LEGADO_RE.match(d.name))
+        if agora - uso > (legado_idade_s if legado else max_idade_s):
+            removidos += _remover(d)
+        else:
+            vivos.append((uso, d))
+
+    tamanhos = {d: tamanho_dir(d) for _, d in vivos}
+    total = sum(tamanhos.values()) + sum(tamanho_dir(root / n) for n in em_uso if (root / n).exists())
+    if total > max_bytes:
+        for uso, d in sorted(vivos):
+            for c in CACHES:
+                shutil.rmtree(d / c, ignore_errors=True)
+            novo = tamanho_dir(d)
+            total -= tamanhos[d] - novo
+            tamanhos[d] = novo
+        for uso, d in sorted(vivos):
+            if total <= max_bytes:
+                break
+            if _remover(d):
+                removidos += 1
+                total -= tamanhos[d]
+
+    if removidos:
+        logger.info("Perfis do Chrome: %d removidos (%.0f MB restantes)", removidos, total / 1e6)
+    return removidos
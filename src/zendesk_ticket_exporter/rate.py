@@ -0,0 +1,117 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ZendeskRateLimited(RuntimeError):
+    """Zendesk respondeu 429 / "Too Many Requests"."""
+
+
+class FixedThrottle:
+    """Comportamento original: esperas aleatórias fixas após o print e entre tickets."""
+
+    def __init__(self, between: tuple[float, float], after_print: tuple[float, float]):
+        self.between = between
+        self.after_print = after_print
+
+    def aguardar(self):
+        pass
+
+    def registrar(self, ok: bool, latencia_s: float, throttled: bool = False):
+        pass
+
+    def registrar_429(self):
+        pass
+
+    def depois_do_ticket(self):
+        time.sleep(random.uniform(*self.between))
+
+
+class AdaptiveThrottle:
+    """Token bucket com taxa ajustada por AIMD, compartilhado por todos os workers.
+
+    Cada ticket consome um token. Prints rápidos aumentam a taxa de forma aditiva;
+    loads lentos, falhas de PDF ou 429 a reduzem de forma multiplicativa.
+    """
+
+    after_print = (0.0, 0.0)
+
+    def __init__(self, rate_per_min: float = 30.0, min_per_min: float = 5.0, max_per_min: float = 120.0,
+                 step_per_min: float = 2.0, decrease: float = 0.7, slow_latency_s: float = 8.0,
+                 burst: float = 2.0, log_interval_s: float = 30.0):
+        self.rate = rate_per_min / 60.0
+        self.min_rate = min_per_min / 60.0
+        self.max_rate = max_per_min / 60.0
+        self.step = step_per_min / 60.0
+        self.decrease = decrease
+        self.slow_latency_s = slow_latency_s
+        self.burst = burst
+        self.log_interval_s = log_interval_s
+
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.cooldown_until = 0.0
+        self._last_log = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def aguardar(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                espera = max(self.cooldown_until - now, 0.0)
+                if espera == 0.0 and self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                if espera == 0.0:
+                    espera = (1.0 - self.tokens) / self.rate
+            time.sleep(min(espera, 5.0))
+
+    def registrar(self, ok: bool, latencia_s: float, throttled: bool = False):
+        with self.lock:
+            antes = self.rate
+            if throttled:
+                self.rate = max(self.min_rate, self.rate * self.decrease * self.decrease)
+                # 429: pausa curta para todos os workers antes de retomar
+                self.cooldown_until = time.monotonic() + min(60.0, 1.0 / self.rate)
+            elif not ok or latencia_s > self.slow_latency_s:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.step)
+
+            now = time.monotonic()
+            if self.rate < antes * 0.9 or now - self._last_log >= self.log_interval_s:
+                self._last_log = now
+                logger.info("Taxa atual: %.1f tickets/min (%s, %.1fs)", self.rate * 60,
+                            "429" if throttled else ("ok" if ok else "falha"), latencia_s)
+
+    def registrar_429(self):
+        self.registrar(False, 0.0, throttled=True)
+
+    def depois_do_ticket(self):
+        pass
+
+    @property
+    def por_minuto(self) -> float:
+        return self.rate * 60
+
+
+def criar_throttle(cfg):
+    if cfg.throttle_mode == "adaptive":
+        return AdaptiveThrottle(
+            rate_per_min=cfg.rate_initial_per_min,
+            min_per_min=cfg.rate_min_per_min,
+            max_per_min=cfg.rate_max_per_min,
+            slow_latency_s=cfg.rate_slow_latency_s,
+        )
+    return FixedThrottle(
+        between=(cfg.between_tickets_min_s, cfg.between_tickets_max_s),
+        after_print=(cfg.after_print_min_s, cfg.after_print_max_s),
+    )
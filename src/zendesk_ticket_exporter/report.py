@@ -0,0 +1,345 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from pathlib import Path
+
+from .checkpoint import read_checkpoint
+
+# Leitura do estado de uma execução (em andamento ou não) só com a stdlib:
+# nada de selenium/pandas, para o status poder ser consultado a cada poucos segundos.
+
+JANELA_S = 600
+TAIL_BYTES = 1 << 20
+
+
+# ===================== Fontes =====================
+def _checkpoints(out_dir: Path) -> tuple[set, set]:
+    snapshots = {p for p in out_dir.glob("checkpoint*.json")}
+    snapshots |= {p.with_suffix(".json") for p in out_dir.glob("checkpoint*.journal")}
+    done, processed = set(), set()
+    for snap in sorted(snapshots):
+        d, t = read_checkpoint(snap)
+        done |= d
+        processed |= t
+    return done, processed
+
+
+def _linhas_jsonl(data: bytes) -> list[dict]:
+    out = []
+    for raw in data.split(b"\n"):
+        try:
+            out.append(json.loads(raw))
+        except ValueError:
+            continue
+    return out
+
+
+def _bordas(path: Path) -> tuple[dict | None, list[dict]]:
+    # primeira linha + final do arquivo: suficiente para a taxa sem ler o índice inteiro
+    with open(path, "rb") as f:
+        primeira = _linhas_jsonl(f.readline())
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(size - TAIL_BYTES, 0))
+        cauda = _linhas_jsonl(f.read())
+    return (primeira[0] if primeira else None), cauda
+
+
+def _gravacoes(out_dir: Path) -> tuple[list[float], float | None]:
+    # mtimes dos PDFs gravados (manifest ou índice de archives), recentes + o mais antigo
+    recentes, inicio = [], None
+    for p in [*out_dir.glob("manifest*.jsonl"), *(out_dir / "archives").glob("index*.jsonl")]:
+        primeira, cauda = _bordas(p)
+        if primeira and primeira.get("mtime"):
+            inicio = primeira["mtime"] if inicio is None else min(inicio, primeira["mtime"])
+        recentes += [e["mtime"] for e in cauda if e.get("mtime") and not e.get("removed")]
+    return recentes, inicio
+
+
+def _linhas_inventario(out_dir: Path, nome: str):
+    for p in sorted(out_dir.glob(f"{nome}*.csv")):
+        with open(p, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    for p in sorted(out_dir.glob(f"{nome}*.jsonl")):
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def _sqlite_ro(path: Path):
+    return sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True, timeout=5)
+
+
+def _leases(out_dir: Path) -> dict | None:
+    db = out_dir / "leases.sqlite"
+    if not db.exists():
+        return None
+    with closing(_sqlite_ro(db)) as conn:
+        rows = conn.execute("SELECT kind, status, COUNT(*) FROM leases GROUP BY kind, status").fetchall()
+    res: dict = {}
+    for kind, status, n in rows:
+        res.setdefault(kind, {})[status] = n
+    return res
+
+
+def _sync_pendentes(out_dir: Path) -> int | None:
+    db = out_dir / "sync.sqlite"
+    if not db.exists():
+        return None
+    with closing(_sqlite_ro(db)) as conn:
+        return conn.execute("SELECT COUNT(*) FROM tickets WHERE status = 'pendente'").fetchone()[0]
+
+
+def codigos_em_cache(excel: Path, out_dir: Path) -> list[str] | None:
+    # a planilha só é relida quando muda (tamanho/mtime): o status continua barato
+    try:
+        st = excel.stat()
+    except FileNotFoundError:
+        return None
+    chave = f"{excel.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+    cache = out_dir / ".codigos_cache.json"
+    try:
+        data = json.loads(cache.read_text(encoding="utf-8"))
+        if data.get("chave") == chave:
+            return data["codigos"]
+    except (FileNotFoundError, ValueError):
+        pass
+    from .codigos import carregar_codigos
+    codigos = carregar_codigos(excel)
+    if out_dir.exists():
+        cache.write_text(json.dumps({"chave": chave, "codigos": codigos}), encoding="utf-8")
+    return codigos
+
+
+# ===================== Status =====================
+def coletar_status(out_dir: Path, codigos: list[str] | None = None) -> dict:
+    agora = time.time()
+    done, processed = _checkpoints(out_dir)
+
+    falhas = falhas_assessor = 0
+    for row in _linhas_inventario(out_dir, "failed"):
+        if str(row.get("ticket_id")) == "-1":
+            falhas_assessor += 1
+        else:
+            falhas += 1
+
+    recentes, inicio = _gravacoes(out_dir)
+    na_janela = [t for t in recentes if t >= agora - JANELA_S]
+    taxa_recente = len(na_janela) / (JANELA_S / 60) if na_janela else 0.0
+    ultima = max(recentes) if recentes else None
+    taxa_media = None
+    if inicio and ultima and ultima > inicio:
+        taxa_media = len(processed) / ((ultima - inicio) / 60)
+
+    st = {
+        "output_dir": str(out_dir),
+        "assessores_concluidos": len(done),
+        "tickets_exportados": len(processed),
+        "tickets_com_falha": falhas,
+        "assessores_com_falha": falhas_assessor,
+        "tickets_por_min_10min": round(taxa_recente, 2),
+        "tickets_por_min_media": round(taxa_media, 2) if taxa_media else None,
+        "ultima_gravacao": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ultima)) if ultima else None,
+        "segundos_desde_ultima": round(agora - ultima, 1) if ultima else None,
+        "leases": _leases(out_dir),
+        "sync_pendentes": _sync_pendentes(out_dir),
+    }
+
+    if codigos is not None:
+        pendentes = [c for c in codigos if c not in done]
+        st["assessores_total"] = len(codigos)
+        st["assessores_pendentes"] = len(pendentes)
+        concluidos = len(codigos) - len(pendentes)
+        if concluidos and pendentes:
+            # estimativa: média de tickets por assessor concluído
+            estimativa = round(len(processed) / concluidos * len(pendentes))
+            st["tickets_restantes_estimados"] = estimativa
+            taxa = taxa_recente or taxa_media
+            st["eta_min"] = round(estimativa / taxa, 1) if taxa else None
+
+    resumos = {}
+    for p in sorted(out_dir.glob("summary*.json")):
+        try:
+            resumos[p.name] = json.loads(p.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+    st["summaries"] = resumos
+    return st
+
+
+def imprimir_status(st: dict):
+    total = st.get("assessores_total")
+    linha = f"Assessores: {st['assessores_concluidos']}"
+    if total is not None:
+        pct = 100.0 * (total - st["assessores_pendentes"]) / total if total else 100.0
+        linha += f"/{total} ({pct:.1f}%), pendentes {st['assessores_pendentes']}"
+    print(linha)
+    print(f"Tickets: {st['tickets_exportados']} exportados, {st['tickets_com_falha']} falhas"
+          f" (+{st['assessores_com_falha']} falhas de assessor)")
+    print(f"Ritmo: {st['tickets_por_min_10min']} tickets/min (10 min)"
+          + (f", média {st['tickets_por_min_media']}" if st["tickets_por_min_media"] else ""))
+    if st.get("tickets_restantes_estimados") is not None:
+        eta = st.get("eta_min")
+        print(f"Restante: ~{st['tickets_restantes_estimados']} tickets"
+              + (f", ETA ~{eta:.0f} min" if eta else ""))
+    if st["ultima_gravacao"]:
+        print(f"Última gravação: {st['ultima_gravacao']} (há {st['segundos_desde_ultima']:.0f}s)")
+    if st["leases"]:
+        for kind, cont in st["leases"].items():
+            print(f"Leases {kind}: " + ", ".join(f"{k}={v}" for k, v in sorted(cont.items())))
+    if st["sync_pendentes"] is not None:
+        print(f"Sync: {st['sync_pendentes']} tickets pendentes")
+
+
+# ===================== Report =====================
+def coletar_report(out_dir: Path, top: int = 20) -> dict:
+    por_assessor: dict[str, dict] = {}
+    for row in _linhas_inventario(out_dir, "success"):
+        a = por_assessor.setdefault(row["assessor"], {"ok": 0, "falhas": 0, "bytes": 0})
+        a["ok"] += 1
+        try:
+            a["bytes"] += int(row.get("bytes") or 0)
+        except ValueError:
+            pass
+
+    erros: Counter = Counter()
+    for row in _linhas_inventario(out_dir, "failed"):
+        a = por_assessor.setdefault(row["assessor"], {"ok": 0, "falhas": 0, "bytes": 0})
+        a["falhas"] += 1
+        # primeira linha, truncada: agrupa stacktraces e mensagens longas do Selenium
+        msg = (row.get("erro") or "").strip()
+        erros[msg.splitlines()[0][:120] if msg else "(sem mensagem)"] += 1
+
+    return {
+        "assessores": por_assessor,
+        "erros_mais_comuns": erros.most_common(top),
+        "total_bytes": sum(a["bytes"] for a in por_assessor.values()),
+    }
+
+
+def imprimir_report(rep: dict, top: int = 20):
+    assessores = rep["assessores"]
+    print(f"{'assessor':<14}{'ok':>8}{'falhas':>8}{'MB':>10}")
+    ordem = sorted(assessores.items(), key=lambda kv: (-kv[1]["falhas"], kv[0]))
+    for cod, a in ordem[:top]:
+        print(f"{cod:<14}{a['ok']:>8}{a['falhas']:>8}{a['bytes'] / 1e6:>10.1f}")
+    if len(ordem) > top:
+        print(f"... mais {len(ordem) - top} assessores")
+    print(f"Total: {sum(a['ok'] for a in assessores.values())} PDFs, {rep['total_bytes'] / 1e6:.1f} MB")
+    if rep["erros_mais_comuns"]:
+        print("\nErros mais comuns:")
+        for msg, n in rep["erros_mais_comuns"]:
+            print(f"{n:>7}  {msg}")
+
+
+# ===================== Retry de falhas =====================
+# falhas de assessor (ticket_id -1) já resolvidas por um retry-failed; o nome não pode começar
+# com "failed", senão entraria na leitura do inventário
+RESOLVIDOS = "resolvidos_retry.jsonl"
+
+
+def _falhas(out_dir: Path) -> tuple[dict[str, dict[int, None]], Counter]:
+    # tickets com falha por assessor (na ordem do arquivo) e linhas -1 por assessor
+    tickets: dict[str, dict[int, None]] = {}
+    de_assessor: Counter = Counter()
+    for row in _linhas_inventario(out_dir, "failed"):
+        cod = str(row.get("assessor") or "")
+        try:
+            tid = int(row.get("ticket_id"))
+        except (TypeError, ValueError):
+            continue
+        if not cod:
+            continue
+        if tid == -1:
+            de_assessor[cod] += 1
+        else:
+            tickets.setdefault(cod, {})[tid] = None
+    return tickets, de_assessor
+
+
+def _resolvidos(out_dir: Path) -> dict[str, int]:
+    # assessor -> quantas linhas -1 dele já estavam no failed.* quando a redescoberta deu certo
+    res: dict[str, int] = {}
+    try:
+        with open(out_dir / RESOLVIDOS, "r", encoding="utf-8") as f:
+            for e in _linhas_jsonl(f.read().encode("utf-8")):
+                res[e["assessor"]] = max(res.get(e["assessor"], 0), int(e["falhas"]))
+    except FileNotFoundError:
+        pass
+    return res
+
+
+def falhas_de_assessor(out_dir: Path) -> Counter:
+    return _falhas(out_dir)[1]
+
+
+def marcar_resolvido(out_dir: Path, cod: str, falhas: int):
+    # uma falha -1 nova (depois desta marca) volta a contar
+    with open(out_dir / RESOLVIDOS, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"assessor": cod, "falhas": falhas, "ts": time.time()}, ensure_ascii=False) + "\n")
+
+
+def falhas_pendentes(out_dir: Path) -> dict[str, list[int] | None]:
+    """Lista de trabalho do retry-failed: tickets do failed.* que ainda não estão no checkpoint.
+
+    Chave = assessor. None = a descoberta do assessor falhou (linha com
+    ticket_id -1) e nenhum retry-failed a refez desde então: não há lista de
+    tickets e ele passa pela descoberta de novo.
+    """
+    _, processed = _checkpoints(out_dir)
+    tickets, de_assessor = _falhas(out_dir)
+    resolvidos = _resolvidos(out_dir)
+    falhas: dict[str, list[int] | None] = {}
+    for cod, n in de_assessor.items():
+        if n > resolvidos.get(cod, 0):
+            falhas[cod] = None
+    for cod, ids in tickets.items():
+        if cod in falhas:
+            continue
+        faltam = [tid for tid in ids if tid not in processed]
+        if faltam:
+            falhas[cod] = faltam
+    return falhas
+
+
+# ===================== Plan =====================
+def coletar_plano(out_dir: Path, codigos: list[str], top: int = 20) -> dict:
+    done, processed = _checkpoints(out_dir)
+    pendentes = [c for c in codigos if c not in done]
+    return {
+        "assessores_total": len(codigos),
+        "assessores_concluidos": len(codigos) - len(pendentes),
+        "assessores_pendentes": len(pendentes),
+        "proximos": pendentes[:top],
+        "tickets_ja_exportados": len(processed),
+        "falhas_pendentes": falhas_pendentes(out_dir),
+        "leases": _leases(out_dir),
+        "sync_pendentes": _sync_pendentes(out_dir),
+    }
+
+
+def imprimir_plano(plano: dict, runtime: dict):
+    print(f"Assessores na planilha: {plano['assessores_total']}")
+    print(f"Já concluídos: {plano['assessores_concluidos']}; a processar: {plano['assessores_pendentes']}")
+    print(f"Tickets já exportados (serão pulados): {plano['tickets_ja_exportados']}")
+    if plano["proximos"]:
+        print("Próximos: " + ", ".join(plano["proximos"])
+              + (" ..." if plano["assessores_pendentes"] > len(plano["proximos"]) else ""))
+    falhas = plano["falhas_pendentes"]
+    if falhas:
+        tickets = sum(len(ids) for ids in falhas.values() if ids is not None)
+        redescobrir = sum(1 for ids in falhas.values() if ids is None)
+        print(f"Falhas para o retry-failed: {tickets} tickets"
+              + (f", {redescobrir} assessores a redescobrir" if redescobrir else ""))
+    if plano["leases"]:
+        for kind, cont in plano["leases"].items():
+            print(f"Leases {kind}: " + ", ".join(f"{k}={v}" for k, v in sorted(cont.items())))
+    if plano["sync_pendentes"] is not None:
+        print(f"Sync: {plano['sync_pendentes']} tickets pendentes de reexportação")
+    print("Execução: " + ", ".join(f"{k}={v}" for k, v in runtime.items()))
@@ -0,0 +1,97 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+import requests
+from selenium.common.exceptions import InvalidSessionIdException
+
+from .metrics import contar
+
+TRANSITORIA = "transitoria"
+PERMANENTE = "permanente"
+
+
+def classificar(erro: BaseException) -> str:
+    # rede, timeouts, WebDriver/CDP, 429, 5xx e PDF truncado costumam passar sozinhos
+    if isinstance(erro, requests.HTTPError) and erro.response is not None:
+        status = erro.response.status_code
+        # 401/403/404...: credencial, permissão ou recurso inexistente não mudam com o tempo
+        return TRANSITORIA if status == 429 or status >= 500 else PERMANENTE
+    if isinstance(erro, (ConnectionError, TimeoutError, requests.RequestException)):
+        return TRANSITORIA
+    if isinstance(erro, (OSError, LookupError, TypeError, ValueError, AttributeError)):
+        # disco cheio, sem permissão ou bug: repetir na mesma execução não resolve
+        return PERMANENTE
+    return TRANSITORIA
+
+
+class FilaRetry:
+    """Itens aguardando nova tentativa, liberados por horário (backoff exponencial com jitter).
+
+    Falhas transitórias voltam até `max_tentativas`; as permanentes vão direto
+    para o failed.csv. Queda de sessão volta sem espera (o navegador já foi
+    recriado). Segura entre threads: os workers do pool compartilham uma fila.
+    """
+
+    def __init__(self, max_tentativas: int = 3, base_s: float = 5.0, max_s: float = 120.0):
+        self.max_tentativas = max(1, max_tentativas)
+        self.base_s = base_s
+        self.max_s = max_s
+        self.lock = threading.Lock()
+        self._heap: list[tuple[float, int, object]] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._heap)
+
+    def pode_repetir(self, erro: BaseException, tentativa: int) -> bool:
+        # tentativa: a que acabou de falhar (1 = primeira)
+        return tentativa < self.max_tentativas and classificar(erro) == TRANSITORIA
+
+    def atraso(self, tentativa: int) -> float:
+        teto = min(self.max_s, self.base_s * 2 ** (tentativa - 1))
+        return random.uniform(teto / 2, teto)
+
+    def agendar(self, item, tentativa: int, erro: BaseException | None = None):
+        imediato = isinstance(erro, InvalidSessionIdException)
+        contar("retries_total", stage="session" if imediato else "backoff")
+        quando = time.monotonic() + (0.0 if imediato else self.atraso(tentativa))
+        with self.lock:
+            heapq.heappush(self._heap, (quando, next(self._seq), item))
+
+    def pronto(self):
+        # próximo item cujo horário já chegou (None se nenhum)
+        with self.lock:
+            if self._heap and self._heap[0][0] <= time.monotonic():
+                return heapq.heappop(self._heap)[2]
+        return None
+
+    def prontos(self) -> list:
+        itens = []
+        while (item := self.pronto()) is not None:
+            itens.append(item)
+        return itens
+
+    def aguardar(self, limite_s: float | None = None):
+        # dorme até o próximo item vencer (ou `limite_s`)
+        with self.lock:
+            if not self._heap:
+                return
+            espera = self._heap[0][0] - time.monotonic()
+        if limite_s is not None:
+            espera = min(espera, limite_s)
+        if espera > 0:
+            time.sleep(espera)
+
+    def drenar(self) -> list:
+        with self.lock:
+            itens = [item for _, _, item in sorted(self._heap)]
+            self._heap.clear()
+        return itens
+
+
+def criar_fila_retry(cfg) -> FilaRetry:
+    return FilaRetry(cfg.retry_max_attempts, base_s=cfg.retry_base_s, max_s=cfg.retry_max_s)
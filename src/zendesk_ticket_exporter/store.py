@@ -0,0 +1,96 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# ioctl(FICLONE) do Linux: cópia copy-on-write (btrfs, xfs, overlay com reflink)
+FICLONE = 0x40049409
+
+MODOS_LINK = ("auto", "hardlink", "reflink", "copy")
+
+
+def _reflink(origem: Path, destino: Path):
+    import fcntl
+    with open(origem, "rb") as src, open(destino, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+class PdfStore:
+    """Armazena cada PDF uma vez em `store/{sha[:2]}/{sha}.pdf`.
+
+    As pastas dos assessores recebem hardlinks (ou reflinks) para o blob, então
+    o mesmo ticket aparece em todos os assessores sem duplicar espaço em disco.
+    """
+
+    def __init__(self, out_dir: Path, modo: str = "auto"):
+        if modo not in MODOS_LINK:
+            raise ValueError(f"store.link deve ser um de {MODOS_LINK}.")
+        self.dir = out_dir / "store"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.modo = modo
+
+    def caminho(self, sha: str) -> Path:
+        return self.dir / sha[:2] / f"{sha}.pdf"
+
+    def guardar(self, data: bytes) -> tuple[Path, bool]:
+        # (blob, novo): reimpressões idênticas são detectadas antes de gravar
+        sha = hashlib.sha256(data).hexdigest()
+        blob = self.caminho(sha)
+        if blob.exists():
+            return blob, False
+        blob.parent.mkdir(exist_ok=True)
+        tmp = blob.with_name(f"{blob.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+        return blob, True
+
+    def importar(self, path: Path, sha: str) -> Path:
+        # PDF gravado antes do store: o próprio arquivo vira o blob
+        blob = self.caminho(sha)
+        if not blob.exists():
+            blob.parent.mkdir(exist_ok=True)
+            self._linkar(path, blob)
+        return blob
+
+    def vincular(self, blob: Path, destino: Path):
+        try:
+            if destino.exists() and os.path.samefile(blob, destino):
+                return
+        except OSError:
+            pass
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # link num nome temporário + rename: o destino nunca fica pela metade
+        tmp = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+        self._linkar(blob, tmp)
+        os.replace(tmp, destino)
+
+    def _linkar(self, origem: Path, destino: Path):
+        if self.modo in ("auto", "hardlink"):
+            try:
+                os.link(origem, destino)
+                return
+            except OSError as e:
+                if self.modo == "hardlink":
+                    raise
+                # outro filesystem ou limite de links: tenta as alternativas
+                logger.debug("hardlink falhou (%s): %s", errno.errorcode.get(e.errno, e.errno), destino)
+        if self.modo in ("auto", "reflink"):
+            try:
+                _reflink(origem, destino)
+                return
+            except (OSError, ImportError):
+                try:
+                    destino.unlink()
+                except FileNotFoundError:
+                    pass
+                if self.modo == "reflink":
+                    raise
+        shutil.copyfile(origem, destino)
@@ -0,0 +1,244 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# margem de segurança ao iniciar o feed incremental (relógio do servidor x local)
+MARGEM_INICIO_S = 300
+
+_PDF_RE = re.compile(r"ticket_(\d+)\.pdf")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id   INTEGER NOT NULL,
+    assessor    TEXT NOT NULL,
+    updated_at  TEXT,
+    path        TEXT,
+    status      TEXT NOT NULL DEFAULT 'pendente',
+    version     INTEGER NOT NULL DEFAULT 0,
+    exported_at REAL,
+    PRIMARY KEY (ticket_id, assessor)
+);
+CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status);
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT
+);
+"""
+
+
+class SyncStore:
+    """Estado do modo incremental: `updated_at` de cada ticket exportado
+    (uma linha por ticket e assessor) e o cursor do export incremental da API."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), timeout=60, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    # ---------- tickets ----------
+    def vazio(self) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM tickets LIMIT 1").fetchone() is None
+
+    def semear(self, linhas: list[tuple[int, str, str, str, float]]):
+        # (ticket_id, assessor, updated_at, path, exported_at) de PDFs já gravados
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tickets (ticket_id, assessor, updated_at, path, status, version, exported_at) "
+                "VALUES (?, ?, ?, ?, 'ok', 1, ?)",
+                linhas,
+            )
+
+    def precisa_exportar(self, tid: int, cod: str, updated_at: str | None) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT updated_at, status FROM tickets WHERE ticket_id = ? AND assessor = ?", (tid, cod)
+            ).fetchone()
+        if row is None or row[1] != "ok":
+            return True
+        # timestamps ISO-8601 em UTC comparam corretamente como string
+        return bool(updated_at) and (row[0] or "") < updated_at
+
+    def marcar_pendente(self, tid: int, cod: str, updated_at: str | None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO tickets (ticket_id, assessor, updated_at, status) VALUES (?, ?, ?, 'pendente') "
+                "ON CONFLICT(ticket_id, assessor) DO UPDATE SET "
+                "updated_at = excluded.updated_at, status = 'pendente'",
+                (tid, cod, updated_at),
+            )
+
+    def reimprimir(self, tid: int) -> bool:
+        # o conteúdo mudou desde o último export; um assessor novo num ticket inalterado só recebe o link
+        with self.lock:
+            ok, ultimo = self.conn.execute(
+                "SELECT MAX(CASE WHEN status = 'ok' THEN updated_at END), MAX(updated_at) "
+                "FROM tickets WHERE ticket_id = ?", (tid,)
+            ).fetchone()
+        return ok is None or (ultimo or "") > ok
+
+    def registrar_export(self, tid: int, path: str):
+        # um PDF por ticket: todos os assessores dele passam a apontar para a versão nova
+        with self.lock, self.conn:
+            versao = self.conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM tickets WHERE ticket_id = ?", (tid,)
+            ).fetchone()[0]
+            self.conn.execute(
+                "UPDATE tickets SET status = 'ok', path = ?, version = ?, exported_at = ? WHERE ticket_id = ?",
+                (path, versao + 1, time.time(), tid),
+            )
+
+    def concluir_vinculos(self):
+        # assessores que receberam o PDF por link (ou já o tinham): a versão exportada cobre o updated_at deles
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE tickets SET status = 'ok' WHERE status = 'pendente' AND updated_at <= "
+                "(SELECT MAX(t.updated_at) FROM tickets t WHERE t.ticket_id = tickets.ticket_id AND t.status = 'ok')"
+            )
+
+    def pendentes(self) -> dict[str, list[int]]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT assessor, ticket_id FROM tickets WHERE status = 'pendente' ORDER BY assessor, ticket_id"
+            ).fetchall()
+        plano: dict[str, list[int]] = {}
+        for cod, tid in rows:
+            plano.setdefault(cod, []).append(tid)
+        return plano
+
+    def ultimo_export(self, tid: int) -> tuple[str | None, int]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT path, version FROM tickets WHERE ticket_id = ? AND path IS NOT NULL "
+                "ORDER BY version DESC, exported_at DESC LIMIT 1", (tid,)
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    # ---------- cursor ----------
+    def get_meta(self, key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str | None):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def versionar_pdf(store: SyncStore, tid: int, pasta: Path) -> Path | None:
+    # preserva o PDF anterior como ticket_{id}.v{n}.pdf; chamado com a reimpressão já pronta para gravar
+    atual = pasta / f"ticket_{tid}.pdf"
+    path, versao = store.ultimo_export(tid)
+    if path:
+        atual = Path(path)
+    if versao < 1 or not atual.exists():
+        return None
+    destino = atual.with_name(f"ticket_{tid}.v{versao}.pdf")
+    if destino.exists():
+        # a reimpressão anterior foi gravada mas não registrada: o arquivo atual já não é a versão n
+        return None
+    atual.replace(destino)
+    return destino
+
+
+def planejar_incremental(store: SyncStore, api, codigos: list[str], limite: int | None,
+                         usuarios) -> tuple[dict[str, list[int]], dict]:
+    """Monta a lista de tickets novos/alterados por assessor.
+
+    Códigos ainda desconhecidos passam pela descoberta completa; os demais só
+    recebem o que veio no export incremental desde o último cursor.
+    Retorna o plano e o estado do cursor a ser gravado ao fim da execução.
+    `usuarios` é o UserIdCache; um código cuja entrada expirou passa de novo
+    pela descoberta completa.
+    """
+    inicio = int(time.time()) - MARGEM_INICIO_S
+    cursor = store.get_meta("after_cursor")
+    start_time = store.get_meta("start_time")
+    tem_feed = bool(cursor or start_time)
+    conhecidos = usuarios.todos() if tem_feed else {}
+
+    novos = 0
+    for cod in codigos:
+        if cod in conhecidos:
+            continue
+        user_id = api.buscar_usuario(cod)
+        if user_id is None:
+            continue
+        usuarios.gravar(cod, user_id, "api")
+        for t in api.tickets_do_usuario(user_id, limite):
+            tid = int(t["id"])
+            if store.precisa_exportar(tid, cod, t.get("updated_at")):
+                store.marcar_pendente(tid, cod, t.get("updated_at"))
+                novos += 1
+
+    novo_cursor = {"start_time": str(inicio), "after_cursor": None}
+    if tem_feed:
+        ativos = set(codigos)
+        por_usuario: dict[int, list[str]] = {}
+        for cod, uid in conhecidos.items():
+            if cod in ativos:
+                por_usuario.setdefault(uid, []).append(cod)
+        if cursor:
+            tickets, after = api.tickets_incrementais(cursor=cursor)
+        else:
+            tickets, after = api.tickets_incrementais(start_time=int(start_time))
+        for t in tickets:
+            envolvidos = [t.get("requester_id")] + list(t.get("collaborator_ids") or []) + list(t.get("email_cc_ids") or [])
+            # ticket compartilhado: todos os assessores envolvidos entram no plano
+            cods = {cod for uid in envolvidos for cod in por_usuario.get(uid, ())}
+            tid = int(t["id"])
+            for cod in sorted(cods):
+                if store.precisa_exportar(tid, cod, t.get("updated_at")):
+                    store.marcar_pendente(tid, cod, t.get("updated_at"))
+                    novos += 1
+        if after or cursor:
+            novo_cursor = {"start_time": None, "after_cursor": after or cursor}
+
+    logger.info("Sync incremental: %d tickets novos/alterados", novos)
+    return store.pendentes(), novo_cursor
+
+
+def semear_da_saida(store: SyncStore, out_dir: Path, manifest, processados: set[int]) -> int:
+    """Primeiro sync sobre uma saída do modo full: os PDFs já gravados contam
+    como exportados na data do arquivo, e o plano só traz o que mudou depois."""
+    linhas: dict[tuple[int, str], tuple[str, float]] = {}
+    with manifest.lock:
+        entries = list(manifest.entries.items())
+    for tid, e in entries:
+        pasta = Path(e["path"]).parent.name
+        if pasta.startswith("assessor_") and e.get("mtime"):
+            linhas[(tid, pasta[len("assessor_"):])] = (e["path"], e["mtime"])
+    # tickets do checkpoint sem manifest e links dos tickets compartilhados entre assessores
+    conhecidos = processados | {tid for tid, _ in entries}
+    for p in out_dir.glob("assessor_*/ticket_*.pdf"):
+        m = _PDF_RE.fullmatch(p.name)
+        if not m or int(m.group(1)) not in conhecidos:
+            continue
+        chave = (int(m.group(1)), p.parent.name[len("assessor_"):])
+        if chave not in linhas:
+            try:
+                linhas[chave] = (str(p), p.stat().st_mtime)
+            except OSError:
+                continue
+    store.semear([
+        (tid, cod, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(mtime)), path, mtime)
+        for (tid, cod), (path, mtime) in linhas.items()
+    ])
+    return len(linhas)
+
+
+def concluir_sync(store: SyncStore, novo_cursor: dict):
+    # só avança o cursor depois que a execução terminou
+    store.concluir_vinculos()
+    for key, value in novo_cursor.items():
+        store.set_meta(key, value)
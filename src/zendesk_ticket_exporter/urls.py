@@ -0,0 +1,26 @@
+def base_url(subdomain: str) -> str:
+    # aceita também uma URL completa (ex.: servidor local de testes/benchmark)
+    sub = subdomain.strip().rstrip("/")
+    if "://" in sub:
+        return sub
+    return f"https://{sub}.zendesk.com"
+
+
+def login_url(subdomain: str) -> str:
+    return f"{base_url(subdomain)}/auth/v2/login/signin"
+
+
+def ticket_print_url(subdomain: str, ticket_id: int) -> str:
+    return f"{base_url(subdomain)}/tickets/{ticket_id}/print"
+
+
+def ticket_view_url(subdomain: str, ticket_id: int) -> str:
+    return f"{base_url(subdomain)}/agent/tickets/{ticket_id}"
+
+
+def user_tickets_url(subdomain: str, user_id: int) -> str:
+    return f"{base_url(subdomain)}/agent/users/{user_id}/requested_tickets"
+
+
+def api_url(subdomain: str, path: str) -> str:
+    return f"{base_url(subdomain)}/api/v2/{path.lstrip('/')}"
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .metrics import contar
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    assessor      TEXT PRIMARY KEY,
+    user_id       INTEGER NOT NULL,
+    fonte         TEXT,
+    atualizado_em REAL NOT NULL
+);
+"""
+
+
+class UserIdCache:
+    """Mapa persistente código do assessor -> id do usuário no Zendesk.
+
+    Evita a busca em People (ou `users/search` na API) a cada execução. Uma
+    entrada vale por `ttl_s` segundos; quem usa o id e não encontra o usuário
+    chama `invalidar` e refaz a busca.
+    """
+
+    def __init__(self, db_path: Path, ttl_s: float = 30 * 86400):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), timeout=60, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def obter(self, cod: str) -> int | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT user_id, atualizado_em FROM usuarios WHERE assessor = ?", (cod,)
+            ).fetchone()
+        if row is None or (self.ttl_s and time.time() - row[1] > self.ttl_s):
+            contar("user_cache_total", resultado="miss")
+            return None
+        contar("user_cache_total", resultado="hit")
+        return int(row[0])
+
+    def todos(self) -> dict[str, int]:
+        # entradas ainda válidas (sync incremental: códigos que já têm usuário conhecido)
+        limite = time.time() - self.ttl_s if self.ttl_s else 0
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT assessor, user_id FROM usuarios WHERE atualizado_em >= ?", (limite,)
+            ).fetchall()
+        return {cod: int(uid) for cod, uid in rows}
+
+    def gravar(self, cod: str, user_id: int, fonte: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO usuarios (assessor, user_id, fonte, atualizado_em) VALUES (?, ?, ?, ?)",
+                (cod, int(user_id), fonte, time.time()),
+            )
+
+    def invalidar(self, cod: str):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM usuarios WHERE assessor = ?", (cod,))
+        contar("user_cache_total", resultado="invalidado")
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
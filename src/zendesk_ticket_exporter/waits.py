@@ -0,0 +1,107 @@
+import time
+
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+
+# cada chamada assíncrona fica abaixo do script timeout do driver (10 s, ver create_driver)
+FATIA_S = 8.0
+
+# A condição é reavaliada a cada mutação do DOM e nos eventos de carregamento;
+# nada de polling. `/*COND*/` recebe o corpo de uma função JS de `args`.
+_JS_ESPERAR = r"""
+const args = arguments[0], ms = arguments[1], quietoMs = arguments[2];
+const done = arguments[arguments.length - 1];
+const vis = e => !!(e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length));
+const cond = (args) => { /*COND*/ };
+let fim = false, limite = null, quieto = null;
+const obs = new MutationObserver(() => { checar(); rearmar(); });
+function encerrar(v) {
+  if (fim) return;
+  fim = true;
+  obs.disconnect();
+  clearTimeout(limite);
+  clearTimeout(quieto);
+  document.removeEventListener('readystatechange', checar);
+  window.removeEventListener('load', checar);
+  done(v);
+}
+function checar() {
+  if (fim) return;
+  let v = null;
+  try { v = cond(args); } catch (e) {}
+  if (v) encerrar(v);
+}
+function rearmar() {
+  if (!quietoMs || fim) return;
+  clearTimeout(quieto);
+  quieto = setTimeout(() => encerrar({quieto: true}), quietoMs);
+}
+obs.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+document.addEventListener('readystatechange', checar);
+window.addEventListener('load', checar);
+limite = setTimeout(() => encerrar(null), ms);
+checar();
+rearmar();
+"""
+
+
+def esperar(drv, condicao: str, timeout: float, *args, quieto_ms: int = 0):
+    """Espera `condicao` devolver algo verdadeiro e retorna esse valor (None no timeout).
+
+    Com `quieto_ms`, também retorna `{"quieto": True}` quando o DOM passa esse
+    tempo sem mudar. Se a página navegar no meio da espera o script morre com o
+    documento; a espera recomeça no documento novo até esgotar o timeout.
+    """
+    script = _JS_ESPERAR.replace("/*COND*/", condicao)
+    fim = time.monotonic() + timeout
+    while True:
+        restante = fim - time.monotonic()
+        if restante <= 0:
+            return None
+        try:
+            r = drv.execute_async_script(script, list(args), int(min(restante, FATIA_S) * 1000), quieto_ms)
+        except InvalidSessionIdException:
+            raise
+        except WebDriverException:
+            # documento descarregado durante a espera (navegação, redirect do login)
+            time.sleep(0.1)
+            continue
+        if r:
+            return r
+
+
+# ===================== Esperas prontas =====================
+def esperar_elemento(drv, seletores: list[str], timeout: float, clicavel: bool = False):
+    # primeiro elemento visível (e habilitado, se `clicavel`) entre os seletores CSS, na ordem dada
+    return esperar(drv, """
+        for (const sel of args[0])
+            for (const el of document.querySelectorAll(sel))
+                if (vis(el) && !(args[1] && el.disabled)) return el;
+        return null;
+    """, timeout, list(seletores), clicavel)
+
+
+def esperar_por_texto(drv, seletor: str, grupos: list[list[str]], timeout: float):
+    # elemento visível cujo texto contém algum termo; grupos anteriores têm prioridade
+    return esperar(drv, """
+        const els = Array.from(document.querySelectorAll(args[0])).filter(vis);
+        for (const termos of args[1])
+            for (const el of els)
+                if (termos.some(t => (el.innerText || '').includes(t))) return el;
+        return null;
+    """, timeout, seletor, grupos)
+
+
+def esperar_documento(drv, timeout: float) -> bool:
+    # load concluído e fontes prontas; a checagem inicial resolve sem esperar quando já carregou
+    return bool(esperar(drv, """
+        return document.readyState === 'complete' && (!document.fonts || document.fonts.status === 'loaded');
+    """, timeout))
+
+
+def esperar_url(drv, trecho: str, timeout: float, contem: bool = True) -> bool:
+    return bool(esperar(drv, "return location.href.includes(args[0]) === args[1];", timeout, trecho, contem))
+
+
+def esperar_quieto(drv, quieto_ms: int, timeout: float) -> bool:
+    # o DOM parou de mudar (renderização da SPA assentou)
+    return bool(esperar(drv, "return null;", timeout, quieto_ms=quieto_ms))
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+from collections import deque
+
+from .metrics import contar, definir
+
+logger = logging.getLogger(__name__)
+
+
+# ===================== RSS =====================
+def _rss_psutil(pid: int) -> int | None:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        raiz = psutil.Process(pid)
+        total = 0
+        for p in [raiz, *raiz.children(recursive=True)]:
+            try:
+                total += p.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+def _rss_proc(pid: int) -> int | None:
+    # sem psutil: árvore de processos montada a partir de /proc/<pid>/stat (Linux)
+    if not os.path.isdir("/proc"):
+        return None
+    filhos: dict[int, list[int]] = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat", "rb") as f:
+                campos = f.read().rsplit(b")", 1)[1].split()
+            filhos.setdefault(int(campos[1]), []).append(int(nome))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    pagina = os.sysconf("SC_PAGE_SIZE")
+    total, pilha = 0, [pid]
+    while pilha:
+        p = pilha.pop()
+        try:
+            with open(f"/proc/{p}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * pagina
+        except (OSError, IndexError, ValueError):
+            continue
+        pilha.extend(filhos.get(p, []))
+    return total
+
+
+def rss_arvore(pid: int) -> int | None:
+    """RSS somado do processo e de todos os descendentes (chromedriver -> chrome -> renderers)."""
+    rss = _rss_psutil(pid)
+    return rss if rss is not None else _rss_proc(pid)
+
+
+def pid_do_driver(drv) -> int | None:
+    try:
+        return drv.service.process.pid
+    except AttributeError:
+        return None
+
+
+# ===================== Watchdog =====================
+class DriverWatchdog:
+    """Decide, entre um ticket e outro, quando reciclar o navegador.
+
+    Motivos: `max_tickets` tickets impressos, RSS do Chrome (com os processos
+    filhos) acima de `max_rss_mb`, ou tempo médio por ticket `fator_lentidao`
+    vezes maior que no início da sessão. Zero desativa cada critério.
+    """
+
+    def __init__(self, max_tickets: int = 500, max_rss_mb: float = 3072, fator_lentidao: float = 0.0,
+                 checar_a_cada: int = 5, nome: str = "principal"):
+        self.max_tickets = max_tickets
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.fator_lentidao = fator_lentidao
+        self.checar_a_cada = max(1, checar_a_cada)
+        self.nome = nome
+        self.resetar()
+
+    def resetar(self):
+        self.tickets = 0
+        self.inicio = time.monotonic()
+        self.base: list[float] = []
+        self.recentes: deque[float] = deque(maxlen=10)
+        self.ultimo_rss: int | None = None
+        # contagem de tickets na última medição de RSS (o CDP soma lotes inteiros de uma vez)
+        self.tickets_na_medicao = 0
+
+    def registrar(self, duracao_s: float):
+        self.tickets += 1
+        if len(self.base) < 10:
+            self.base.append(duracao_s)
+        self.recentes.append(duracao_s)
+
+    def verificar(self, drv) -> str | None:
+        if self.max_tickets and self.tickets >= self.max_tickets:
+            return f"{self.tickets} tickets"
+
+        if self.max_rss and self.tickets - self.tickets_na_medicao >= self.checar_a_cada:
+            self.tickets_na_medicao = self.tickets
+            pid = pid_do_driver(drv)
+            self.ultimo_rss = rss_arvore(pid) if pid else None
+            if self.ultimo_rss is not None:
+                definir("browser_rss_bytes", self.ultimo_rss, browser=self.nome)
+            if self.ultimo_rss is not None and self.ultimo_rss >= self.max_rss:
+                return f"RSS {self.ultimo_rss / 1e6:.0f} MB"
+
+        if self.fator_lentidao and len(self.base) >= 10 and len(self.recentes) >= 10:
+            media_base = sum(self.base) / len(self.base)
+            media = sum(self.recentes) / len(self.recentes)
+            if media_base > 0 and media >= media_base * self.fator_lentidao:
+                return f"{media:.1f}s/ticket (início {media_base:.1f}s)"
+        return None
+
+    def reciclar(self, drv, motivo: str):
+        logger.info("[%s] Reciclando navegador (%s) após %d tickets em %.0f min",
+                    self.nome, motivo, self.tickets, (time.monotonic() - self.inicio) / 60)
+        contar("driver_recycles_total", browser=self.nome)
+        try:
+            drv.quit()
+        except Exception:
+            pass
+        self.resetar()
+
+
+def criar_watchdog(cfg, nome: str = "principal") -> DriverWatchdog:
+    return DriverWatchdog(
+        max_tickets=cfg.recycle_after_tickets,
+        max_rss_mb=cfg.recycle_max_rss_mb,
+        fator_lentidao=cfg.recycle_slowdown_factor,
+        nome=nome,
+    )